@@ -0,0 +1,289 @@
+### Code for running the visualisations for many chats in parallel ###
+
+# Import packages
+import argparse
+import glob
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import matplotlib
+
+# Import modules
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import Logger
+from wa_analysis.visualisation import registry
+
+# Setup logger
+logger = Logger().get_logger()
+
+SUMMARY_NAME = "batch_summary.json"
+STORE_PREFIX = "store:"
+DEFAULT_PLOTS = registry.names()
+
+
+def plot_functions(plots: List[str]) -> Dict[str, Callable[..., Any]]:
+    """
+    Geef de plotfuncties van de gekozen visualisaties.
+
+    De visualisaties worden pas hier geïmporteerd, nadat de worker de
+    Agg-backend van matplotlib heeft gekozen.
+
+    Args:
+        plots: Namen van de visualisaties
+
+    Returns:
+        Dict[str, Callable[..., Any]]: Naam van de visualisatie en de plotfunctie
+    """
+    return {name: registry.load(name, "plot") for name in plots}
+
+
+def init_worker(log_queue: Optional[Any] = None) -> None:
+    """
+    Initialiseer een workerproces: geen schermen, alleen bestanden.
+
+    Args:
+        log_queue: Queue van Logger().worker_queue(); de worker logt dan via
+            het hoofdproces in plaats van zelf naar het logbestand te schrijven
+    """
+    from wa_analysis.data_loading.cache import enable_copy_on_write
+
+    matplotlib.use("Agg")
+    if log_queue is not None:
+        Logger.configure_worker(log_queue)
+    enable_copy_on_write()
+
+
+def chat_name(source: str) -> str:
+    """Naam van een chat, gebruikt voor de outputmap."""
+    if source.startswith(STORE_PREFIX):
+        return source[len(STORE_PREFIX) :]
+    return Path(source).stem
+
+
+def resolve_sources(patterns: List[str], config: Dict[str, Any]) -> List[str]:
+    """
+    Zet paden en glob-patronen om naar een lijst met datasets.
+
+    Relatieve patronen worden eerst in de processed-folder gezocht. Met
+    'store:' worden alle chats uit de DatasetStore gebruikt, met 'store:<naam>'
+    een enkele chat.
+
+    Args:
+        patterns: Paden, glob-patronen of store-verwijzingen
+        config: Configuratie uit config.toml
+
+    Returns:
+        List[str]: Absolute paden of 'store:<naam>' per chat
+    """
+    from wa_analysis.data_loading.store import DatasetStore
+
+    processed = Path(config["processed"]).resolve()
+    sources: List[str] = []
+    for pattern in patterns:
+        if pattern == STORE_PREFIX:
+            sources.extend(STORE_PREFIX + chat for chat in DatasetStore(config).chats())
+        elif pattern.startswith(STORE_PREFIX):
+            sources.append(pattern)
+        else:
+            matches = sorted(glob.glob(str(processed / pattern))) or sorted(
+                glob.glob(pattern)
+            )
+            if not matches:
+                logger.warning(f"Geen datasets gevonden voor: {pattern}")
+            sources.extend(str(Path(match).resolve()) for match in matches)
+    return list(dict.fromkeys(sources))
+
+
+def process_chat(source: str, output_root: str, plots: List[str]) -> Dict[str, Any]:
+    """
+    Voer laden, verrijken en alle plots uit voor één chat.
+
+    Draait in een workerproces. Fouten worden per plot opgevangen, zodat één
+    mislukte visualisatie de rest van de chat niet tegenhoudt.
+
+    Args:
+        source: Pad naar de dataset of 'store:<naam>'
+        output_root: Map waaronder per chat een outputmap komt
+        plots: Namen van de visualisaties
+
+    Returns:
+        Dict[str, Any]: Resultaat met succes en tijden per plot
+    """
+    import matplotlib.pyplot as plt
+
+    from wa_analysis.data_loading.cache import DatasetCache
+
+    name = chat_name(source)
+    output_folder = Path(output_root) / name
+    start_time = datetime.now()
+    result: Dict[str, Any] = {
+        "chat": name,
+        "source": source,
+        "pid": os.getpid(),
+        "plots": {},
+    }
+    logger.info(f"Start batchverwerking van chat {name}")
+
+    try:
+        config = ConfigLoader().config
+        if source.startswith(STORE_PREFIX):
+            altered_df = DatasetCache().get_enriched(config=config, chats=[name])
+        else:
+            altered_df = DatasetCache().get_enriched(config=config, datafile=source)
+        result["rows"] = len(altered_df)
+        result["load_seconds"] = (datetime.now() - start_time).total_seconds()
+
+        functions = plot_functions(plots)
+        for plot in plots:
+            plot_start = datetime.now()
+            try:
+                functions[plot](altered_df, output_folder=output_folder)
+                result["plots"][plot] = {"success": True}
+            except Exception as e:
+                logger.error(f"Fout in visualisatie {plot} voor chat {name}: {e}")
+                result["plots"][plot] = {"success": False, "error": str(e)}
+            finally:
+                plt.close("all")
+            result["plots"][plot]["seconds"] = (
+                datetime.now() - plot_start
+            ).total_seconds()
+
+        result["success"] = all(plot["success"] for plot in result["plots"].values())
+
+    except Exception as e:
+        logger.error(f"Fout bij batchverwerking van chat {name}: {e}")
+        result["success"] = False
+        result["error"] = str(e)
+        result["traceback"] = traceback.format_exc()
+
+    result["seconds"] = (datetime.now() - start_time).total_seconds()
+    return result
+
+
+def run_batch(
+    patterns: List[str],
+    workers: Optional[int] = None,
+    output_folder: Optional[Path] = None,
+    plots: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Verwerk een lijst datasets parallel in een process pool.
+
+    Args:
+        patterns: Paden, glob-patronen of store-verwijzingen (zie resolve_sources)
+        workers: Aantal workerprocessen (standaard [batch] workers of het aantal cores)
+        output_folder: Map voor de plots per chat en de samenvatting
+        plots: Namen van de visualisaties (standaard [batch] plots)
+
+    Returns:
+        Dict[str, Any]: Samenvatting met per chat het resultaat
+    """
+    config = ConfigLoader().config
+    batch_config: Dict[str, Any] = config.get("batch", {})
+    workers = workers or batch_config.get("workers") or os.cpu_count() or 1
+    output_root = Path(
+        output_folder or batch_config.get("output_folder", "img/batch")
+    ).resolve()
+    plots = plots or batch_config.get("plots", DEFAULT_PLOTS)
+
+    unknown = [plot for plot in plots if plot not in DEFAULT_PLOTS]
+    if unknown:
+        raise ValueError(f"Onbekende visualisaties: {unknown}")
+
+    sources = resolve_sources(patterns, config)
+    names = [chat_name(source) for source in sources]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        # Elke chat krijgt een eigen outputmap, dus namen moeten uniek zijn
+        raise ValueError(f"Meerdere datasets met dezelfde naam: {duplicates}")
+    logger.info(
+        f"Start batch met {len(sources)} chats, {workers} workers, plots: {plots}"
+    )
+    output_root.mkdir(parents=True, exist_ok=True)
+    start_time = datetime.now()
+
+    results: List[Dict[str, Any]] = []
+    with (
+        Logger().worker_queue() as log_queue,
+        ProcessPoolExecutor(
+            max_workers=min(workers, max(len(sources), 1)),
+            initializer=init_worker,
+            initargs=(log_queue,),
+        ) as executor,
+    ):
+        futures = {
+            executor.submit(process_chat, source, str(output_root), plots): source
+            for source in sources
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Bijvoorbeeld een worker die is gecrasht
+                result = {
+                    "chat": chat_name(futures[future]),
+                    "source": futures[future],
+                    "success": False,
+                    "error": str(e),
+                }
+            status = "succesvol" if result["success"] else "mislukt"
+            logger.info(
+                f"Chat {result['chat']} {status} "
+                f"in {result.get('seconds', 0):.2f} seconden"
+            )
+            results.append(result)
+
+    results.sort(key=lambda result: result["chat"])
+    success_count = sum(result["success"] for result in results)
+    summary: Dict[str, Any] = {
+        "started": start_time.isoformat(timespec="seconds"),
+        "seconds": (datetime.now() - start_time).total_seconds(),
+        "workers": workers,
+        "plots": plots,
+        "chats": len(results),
+        "succeeded": success_count,
+        "failed": len(results) - success_count,
+        "results": results,
+    }
+
+    summary_path = output_root / SUMMARY_NAME
+    with summary_path.open("w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    logger.info(
+        f"Batch voltooid: {success_count}/{len(results)} chats succesvol "
+        f"in {summary['seconds']:.2f} seconden, samenvatting in {summary_path}"
+    )
+    table = "\n".join(
+        f"{result['chat']:<30} {'OK' if result['success'] else 'FOUT':<5} "
+        f"{result.get('seconds', 0):>8.2f}s"
+        for result in results
+    )
+    logger.info(f"Resultaat per chat:\n{table}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Maak de visualisaties voor meerdere chats tegelijk."
+    )
+    parser.add_argument(
+        "datasets",
+        nargs="+",
+        help="Paden of glob-patronen in de processed-folder, of 'store:' / 'store:<naam>'",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--plots", nargs="+", default=None)
+    args = parser.parse_args()
+
+    summary = run_batch(args.datasets, args.workers, args.output, args.plots)
+
+    # Stel juiste exit code in
+    sys.exit(0 if summary["failed"] == 0 else 1)
@@ -0,0 +1,401 @@
+### Benchmarks of the hot paths per stage, compared against a stored baseline ###
+
+# Import packages
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Import modules
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.data_loading.generator import ChatGenerator
+from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import Profiler
+
+# Setup logger
+logger = Logger().get_logger()
+
+BENCHMARK_FILE = "bench.parq"
+ROLE_FILE = "Roles.json"
+
+
+class BenchmarkData:
+    """
+    Synthetische dataset van een bepaalde grootte, met de tussenresultaten.
+
+    De chat en Roles.json komen uit de ChatGenerator met een vaste seed, zodat
+    elke run dezelfde data meet. De tussenresultaten (verrijkt, met rollen,
+    reacties, corpus) worden één keer met de echte code berekend en dienen als
+    invoer voor de stappen erna; ze tellen niet mee in de gemeten tijd.
+    """
+
+    def __init__(
+        self, config: Dict[str, Any], rows: int, folder: Path, max_parts: int
+    ) -> None:
+        logger.info(f"Initialiseren van BenchmarkData met {rows} berichten")
+        self.rows = rows
+        self.max_parts = max_parts
+        self.folder = Path(folder)
+
+        # Eigen kopie van de configuratie die naar de tijdelijke map wijst;
+        # zonder cache, zodat elke stap echt rekent
+        self.config = {
+            **config,
+            "processed": str(self.folder),
+            "raw": str(self.folder),
+            "current": BENCHMARK_FILE,
+            "cache": {**config.get("cache", {}), "enabled": False},
+        }
+        self.datafile = BENCHMARK_FILE
+        self.role_file = self.folder / ROLE_FILE
+
+        generator = ChatGenerator(self.config)
+        generator.generate(rows, self.folder / BENCHMARK_FILE)
+        generator.write_roles(self.role_file)
+
+    @cached_property
+    def enriched(self) -> pd.DataFrame:
+        """Uitvoer van DataProcessor.add_columns."""
+        from wa_analysis.data_loading.processor import DataProcessor
+
+        return DataProcessor(self.config, self.datafile).add_columns()
+
+    @cached_property
+    def merged(self) -> pd.DataFrame:
+        """Uitvoer van Merger.merge_dataframes."""
+        from wa_analysis.data_loading.merger import Merger
+
+        return Merger(self.config, self.enriched, self.role_file).get_processed_data()
+
+    @cached_property
+    def reactions(self) -> pd.DataFrame:
+        """Uitvoer van ReactionsAdder.process_data op de data met rollen."""
+        from wa_analysis.data_loading.reactions import ReactionsAdder
+
+        return ReactionsAdder(self.config, self.merged).process_data()[0]
+
+    @cached_property
+    def parts(self) -> List[str]:
+        """
+        Tekstfragmenten uit Clustering._create_corpus, hooguit max_parts.
+
+        fit en reduce_dims zijn kwadratisch in het aantal fragmenten; zonder
+        grens zou de grootste dataset de hele suite bepalen.
+        """
+        corpus = _clustering(self.enriched)._create_corpus()
+        parts = [part for texts in corpus.values() for part in texts]
+        return parts[: self.max_parts]
+
+    @cached_property
+    def distance(self) -> np.ndarray:
+        """Afstandsmatrix uit TextClustering.fit."""
+        from wa_analysis.data_analysis.model import TextClustering
+
+        return TextClustering().fit(self.parts)
+
+
+def _clustering(df: pd.DataFrame) -> Any:
+    """Clustering zonder __init__, dat zelf al _create_corpus aanroept."""
+    from wa_analysis.visualisation.clustering import Clustering
+
+    clustering = Clustering.__new__(Clustering)
+    clustering.df = df
+    return clustering
+
+
+def bench_load_data(data: BenchmarkData) -> Callable[[], Any]:
+    """BaseDataLoader.load_data"""
+    from wa_analysis.data_loading.dataloader import BaseDataLoader
+
+    loader = BaseDataLoader(data.config)
+    loader.datafile = data.datafile
+    return loader.load_data
+
+
+def bench_add_columns(data: BenchmarkData) -> Callable[[], Any]:
+    """DataProcessor.add_columns"""
+    from wa_analysis.data_loading.processor import DataProcessor
+
+    return DataProcessor(data.config, data.datafile).add_columns
+
+
+def bench_merge_dataframes(data: BenchmarkData) -> Callable[[], Any]:
+    """Merger.merge_dataframes"""
+    from wa_analysis.data_loading.merger import Merger
+
+    return Merger(data.config, data.enriched, data.role_file).merge_dataframes
+
+
+def bench_process_data(data: BenchmarkData) -> Callable[[], Any]:
+    """ReactionsAdder.process_data"""
+    from wa_analysis.data_loading.reactions import ReactionsAdder
+
+    return ReactionsAdder(data.config, data.merged).process_data
+
+
+def bench_prepare_data(data: BenchmarkData) -> Callable[[], Any]:
+    """Replier.prepare_data"""
+    from wa_analysis.settings.settings import PlotSettings
+    from wa_analysis.visualisation.relationships import Replier
+
+    return Replier(PlotSettings("relationships"), data.reactions).prepare_data
+
+
+def bench_create_corpus(data: BenchmarkData) -> Callable[[], Any]:
+    """Clustering._create_corpus"""
+    return _clustering(data.enriched)._create_corpus
+
+
+def bench_fit(data: BenchmarkData) -> Callable[[], Any]:
+    """TextClustering.fit"""
+    from wa_analysis.data_analysis.model import TextClustering
+
+    parts = data.parts
+    return lambda: TextClustering().fit(parts)
+
+
+def bench_reduce_dims(data: BenchmarkData) -> Callable[[], Any]:
+    """TextClustering.reduce_dims (t-SNE, zoals in de clustering)"""
+    from wa_analysis.data_analysis.model import TextClustering
+
+    distance = data.distance
+    return lambda: TextClustering().reduce_dims(distance, method="tSNE")
+
+
+# Per stap een functie die (ongemeten) de invoer klaarzet en de te meten
+# aanroep teruggeeft. Wordt per herhaling opnieuw aangeroepen, omdat
+# sommige stappen hun object aanpassen.
+STAGES: Dict[str, Callable[[BenchmarkData], Callable[[], Any]]] = {
+    "load_data": bench_load_data,
+    "add_columns": bench_add_columns,
+    "merge_dataframes": bench_merge_dataframes,
+    "process_data": bench_process_data,
+    "prepare_data": bench_prepare_data,
+    "create_corpus": bench_create_corpus,
+    "fit": bench_fit,
+    "reduce_dims": bench_reduce_dims,
+}
+
+
+def time_stage(data: BenchmarkData, stage: str, repeats: int) -> Dict[str, Any]:
+    """
+    Meet één stap een aantal keer.
+
+    Args:
+        data: Dataset met tussenresultaten
+        stage: Naam van de stap in STAGES
+        repeats: Aantal metingen
+
+    Returns:
+        Dict[str, Any]: Snelste en mediane tijd in seconden, en alle metingen
+    """
+    timings: List[float] = []
+    for _ in range(repeats):
+        func = STAGES[stage](data)
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "timings": timings,
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    stages: Optional[List[str]] = None,
+    repeats: int = 3,
+    max_parts: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Meet alle stappen voor elke datasetgrootte.
+
+    Args:
+        sizes: Aantallen berichten
+        stages: Namen van de stappen (standaard alle, zie STAGES)
+        repeats: Aantal metingen per stap
+        max_parts: Maximaal aantal tekstfragmenten voor fit en reduce_dims
+
+    Returns:
+        Dict[str, Any]: Resultaten per grootte en stap, met metadata
+    """
+    stages = stages or list(STAGES)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Onbekende stappen: {unknown}. Kies uit: {list(STAGES)}")
+
+    # De profielmetingen (en tracemalloc) zouden de tijden vertekenen
+    Profiler().enabled = False
+    config = ConfigLoader().config
+    results: Dict[str, Dict[str, Any]] = {}
+    for rows in sizes:
+        with tempfile.TemporaryDirectory(prefix="wa_benchmark_") as folder:
+            data = BenchmarkData(config, rows, Path(folder), max_parts)
+            results[str(rows)] = {}
+            for stage in stages:
+                logger.info(f"Benchmark {stage} met {rows} berichten")
+                results[str(rows)][stage] = time_stage(data, stage, repeats)
+                logger.info(
+                    f"Benchmark {stage} met {rows} berichten: "
+                    f"{results[str(rows)][stage]['min']:.4f} seconden"
+                )
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "max_parts": max_parts,
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_seconds: float,
+) -> List[Dict[str, Any]]:
+    """
+    Vergelijk de snelste tijden met de baseline.
+
+    Een stap is een regressie als hij meer dan threshold (fractie) trager is
+    én het verschil groter is dan min_seconds, zodat ruis bij heel snelle
+    stappen geen fout geeft.
+
+    Args:
+        current: Resultaat van run_benchmarks
+        baseline: Eerder opgeslagen resultaat
+        threshold: Toegestane vertraging, bijvoorbeeld 0.25 voor 25%
+        min_seconds: Kleinste verschil in seconden dat als regressie telt
+
+    Returns:
+        List[Dict[str, Any]]: Per grootte en stap de vergelijking
+    """
+    rows: List[Dict[str, Any]] = []
+    for size, stages in current["results"].items():
+        for stage, result in stages.items():
+            reference = baseline.get("results", {}).get(size, {}).get(stage)
+            row: Dict[str, Any] = {
+                "size": size,
+                "stage": stage,
+                "seconds": result["min"],
+                "baseline": reference["min"] if reference else None,
+                "change": None,
+                "regression": False,
+            }
+            if reference:
+                row["change"] = result["min"] / reference["min"] - 1
+                row["regression"] = (
+                    row["change"] > threshold
+                    and result["min"] - reference["min"] > min_seconds
+                )
+            rows.append(row)
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """De vergelijking als tabel."""
+    lines = [
+        f"{'rijen':>10}  {'stap':<18} {'seconden':>10} {'baseline':>10} "
+        f"{'verschil':>9}  status"
+    ]
+    for row in rows:
+        baseline = f"{row['baseline']:.4f}" if row["baseline"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        status = "REGRESSIE" if row["regression"] else "OK"
+        lines.append(
+            f"{row['size']:>10}  {row['stage']:<18} {row['seconds']:>10.4f} "
+            f"{baseline:>10} {change:>9}  {status}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering benchmark.py")
+    try:
+        config_loader = ConfigLoader()
+        benchmark_config: Dict[str, Any] = config_loader.config.get("benchmark", {})
+        folder = config_loader.root / benchmark_config.get("folder", "benchmarks")
+
+        parser = argparse.ArgumentParser(
+            description="Meet de hot paths per stap en vergelijk met de baseline."
+        )
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=benchmark_config.get("sizes", [10_000, 100_000]),
+        )
+        parser.add_argument(
+            "--stages", nargs="+", default=None, help=f"Standaard alle: {list(STAGES)}"
+        )
+        parser.add_argument(
+            "--repeats", type=int, default=benchmark_config.get("repeats", 3)
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=benchmark_config.get("threshold", 0.25)
+        )
+        parser.add_argument("--baseline", type=Path, default=folder / "baseline.json")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Sla deze run op als nieuwe baseline",
+        )
+        args = parser.parse_args()
+
+        current = run_benchmarks(
+            args.sizes,
+            args.stages,
+            args.repeats,
+            benchmark_config.get("max_parts", 1000),
+        )
+        folder.mkdir(parents=True, exist_ok=True)
+        with (folder / "latest.json").open("w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+        baseline: Dict[str, Any] = {}
+        if args.baseline.exists():
+            with args.baseline.open("r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        else:
+            logger.warning(f"Geen baseline gevonden: {args.baseline}")
+
+        comparison = compare(
+            current,
+            baseline,
+            args.threshold,
+            benchmark_config.get("min_seconds", 0.005),
+        )
+        regressions = [row for row in comparison if row["regression"]]
+        log = logger.error if regressions else logger.info
+        log(f"Vergelijking met de baseline:\n{format_comparison(comparison)}")
+
+        if args.save_baseline:
+            args.baseline.parent.mkdir(parents=True, exist_ok=True)
+            with args.baseline.open("w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+            logger.info(f"Baseline opgeslagen in {args.baseline}")
+
+        if regressions and not args.save_baseline:
+            logger.error(
+                f"Einde uitvoering benchmark.py - {len(regressions)} regressies "
+                f"boven {args.threshold:.0%}"
+            )
+            sys.exit(1)
+        logger.info("Einde uitvoering benchmark.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering benchmark.py - Fout: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,151 @@
+### Attribute a message to every author who posted shortly before it ###
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from wa_analysis.settings.app_config import get_app_config
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+# Aantal paren dat per blok wordt uitgevouwen
+PAIR_BLOCK = 5_000_000
+
+
+def _block_pairs(
+    authors: np.ndarray, start: np.ndarray, positions: np.ndarray, low: int, high: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Paren (bericht, eerder bericht van een andere auteur) voor berichten low..high.
+
+    Per bericht staan de eerdere berichten van recent naar oud; van elke
+    auteur blijft alleen het meest recente bericht over.
+    """
+    lengths = positions[low:high] - start[low:high]
+    reply = np.repeat(positions[low:high], lengths)
+    step = np.arange(len(reply)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    source = (reply - 1 - step).astype(reply.dtype)
+
+    # Alleen andere (bekende) auteurs, en elke auteur één keer per bericht
+    other = (authors[source] != authors[reply]) & (authors[source] >= 0)
+    reply, source = reply[other], source[other]
+    pair_key = reply.astype("int64") * (authors.max() + 1) + authors[source]
+    first = ~pd.Series(pair_key).duplicated().to_numpy()
+    return reply[first], source[first]
+
+
+def reply_candidates(
+    df: pd.DataFrame,
+    window_minutes: Optional[float] = None,
+    max_messages: Optional[int] = None,
+    half_life_minutes: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Zoek per bericht de andere auteurs die binnen het venster ervoor schreven.
+
+    Elke auteur die in de window_minutes voor een bericht iets plaatste (en
+    niet de schrijver zelf is) telt als kandidaat waarop gereageerd wordt,
+    hoogstens één keer per bericht, met zijn meest recente bericht. Er wordt
+    nooit verder teruggekeken dan max_messages berichten. De venstergrenzen
+    komen uit np.searchsorted op de gesorteerde tijden; de paren worden met
+    np.repeat uitgevouwen, zonder lussen over berichten. Bij een chatkolom
+    blijft het venster binnen de chat.
+
+    Het gewicht is 1, of met half_life_minutes 0.5 ** (minuten / halfwaardetijd),
+    zodat recente berichten zwaarder wegen. share is het gewicht gedeeld door
+    de som van de gewichten van het bericht: samen telt elk bericht dan als
+    één reactie.
+
+    Args:
+        df: Berichten met timestamp en author, eventueel met chat
+        window_minutes: Lengte van het venster (standaard [attribution])
+        max_messages: Maximaal aantal berichten terug (standaard [attribution])
+        half_life_minutes: Halfwaardetijd van het gewicht (standaard
+            [attribution], None voor gelijke gewichten)
+
+    Returns:
+        pd.DataFrame: Per paar de index van het bericht (reply), de schrijver
+            (author), de kandidaat (candidate), de index van het bericht van de
+            kandidaat (source), de tijd ertussen in minuten, weight en share;
+            per bericht staat de meest recente kandidaat bovenaan
+    """
+    settings = get_app_config().attribution
+    window_minutes = window_minutes or settings.window_minutes
+    max_messages = max_messages or settings.max_messages
+    if half_life_minutes is None:
+        half_life_minutes = settings.half_life_minutes
+
+    try:
+        # Minuten vanaf het begin; per chat een eigen blok op de tijdas, zo
+        # ver uit elkaar dat een venster nooit in een andere chat valt
+        minutes = (
+            (df["timestamp"] - df["timestamp"].min()).dt.total_seconds() / 60
+        ).to_numpy()
+        if "chat" in df:
+            chat_codes, _ = pd.factorize(df["chat"])
+            minutes = minutes + chat_codes * (np.nanmax(minutes) + window_minutes + 1)
+        # Posities passen bijna altijd in int32; dat halveert het geheugen van de paren
+        index_type = np.int32 if len(minutes) < np.iinfo(np.int32).max else np.int64
+        order = np.argsort(minutes, kind="stable").astype(index_type)
+        times = minutes[order]
+        author_codes, _ = pd.factorize(df["author"])
+        authors = author_codes[order]
+
+        # Venster [t - window, t) per bericht, begrensd op max_messages terug
+        positions = np.arange(len(times), dtype=index_type)
+        start = np.searchsorted(times, times - window_minutes, side="left")
+        start = np.maximum(start, positions - max_messages).astype(index_type)
+        lengths = positions - start
+
+        # De paren worden per blok berichten uitgevouwen, zodat het geheugen
+        # begrensd blijft op ongeveer PAIR_BLOCK paren tegelijk
+        ends = np.cumsum(lengths)
+        cuts = np.searchsorted(
+            ends, np.arange(PAIR_BLOCK, ends[-1] if len(ends) else 0, PAIR_BLOCK)
+        )
+        bounds = np.unique(np.concatenate([[0], cuts, [len(times)]]))
+        replies = [np.empty(0, dtype=index_type)]
+        sources = [np.empty(0, dtype=index_type)]
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            reply, source = _block_pairs(authors, start, positions, low, high)
+            replies.append(reply)
+            sources.append(source)
+        reply, source = np.concatenate(replies), np.concatenate(sources)
+        del replies, sources
+
+        elapsed = times[reply] - times[source]
+        if half_life_minutes:
+            weight = np.power(0.5, elapsed / half_life_minutes)
+        else:
+            weight = np.ones(len(reply))
+        share = weight / np.bincount(reply, weights=weight, minlength=len(times))[reply]
+
+        reply_rows, source_rows = order[reply], order[source]
+        del reply, source
+        candidates = pd.DataFrame(
+            {
+                "reply": df.index.to_numpy()[reply_rows],
+                "author": df["author"].take(reply_rows).array,
+                "candidate": df["author"].take(source_rows).array,
+                "source": df.index.to_numpy()[source_rows],
+                "minutes": elapsed,
+                "weight": weight,
+                "share": share,
+            }
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s kandidaten voor %s berichten (venster %s minuten)",
+                len(candidates),
+                candidates["reply"].nunique(),
+                window_minutes,
+            )
+        return candidates
+
+    except Exception as e:
+        logger.error(f"Fout bij het zoeken van reactiekandidaten: {str(e)}")
+        raise
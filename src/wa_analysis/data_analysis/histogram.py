@@ -0,0 +1,215 @@
+### Fixed-edge histogram whose counts can be added across chunks, chats and periods ###
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class Histogram:
+    """
+    Histogram met vaste bingrenzen.
+
+    Bins zijn rechts gesloten, net als pd.cut: bin i bevat waarden met
+    edges[i] < waarde <= edges[i + 1]. Waarden op of onder de eerste grens
+    tellen als underflow, waarden boven de laatste grens als overflow en NaN
+    als missing; die tellen niet mee in total. Omdat de grenzen niet van de
+    data afhangen, geven histogrammen van losse delen opgeteld hetzelfde
+    resultaat als één histogram over alle data.
+    """
+
+    def __init__(
+        self, edges: Sequence[float], counts: Optional[Sequence[int]] = None
+    ) -> None:
+        """
+        Args:
+            edges: Oplopende bingrenzen, het laatste mag inf zijn
+            counts: Tellingen per bin (standaard nul)
+        """
+        self.edges: np.ndarray = np.asarray(edges, dtype="float64")
+        if self.edges.ndim != 1 or len(self.edges) < 2:
+            raise ValueError("Een histogram heeft minstens twee grenzen nodig")
+        if np.isnan(self.edges).any() or (np.diff(self.edges) <= 0).any():
+            raise ValueError(f"Bingrenzen moeten strikt oplopen: {list(edges)}")
+
+        self.counts: np.ndarray = (
+            np.zeros(len(self.edges) - 1, dtype="int64")
+            if counts is None
+            else np.asarray(counts, dtype="int64").copy()
+        )
+        if len(self.counts) != len(self.edges) - 1:
+            raise ValueError(
+                f"{len(self.counts)} tellingen voor {len(self.edges) - 1} bins"
+            )
+        self.underflow: int = 0
+        self.overflow: int = 0
+        self.missing: int = 0
+
+    @classmethod
+    def log_spaced(
+        cls, start: float, stop: float, bins: int, open_ended: bool = True
+    ) -> "Histogram":
+        """
+        Maak een leeg histogram met logaritmisch verdeelde grenzen.
+
+        De eerste bin begint bij 0, zodat ook waarden onder start worden geteld.
+
+        Args:
+            start: Eerste grens groter dan 0
+            stop: Laatste eindige grens
+            bins: Aantal logaritmische bins tussen start en stop
+            open_ended: Voeg een laatste bin tot inf toe
+
+        Returns:
+            Histogram: Leeg histogram
+        """
+        if start <= 0 or stop <= start or bins < 1:
+            raise ValueError(
+                "Logaritmische grenzen vragen 0 < start < stop en bins >= 1"
+            )
+        edges = [0.0, *np.geomspace(start, stop, bins + 1)]
+        if open_ended:
+            edges.append(np.inf)
+        return cls(edges)
+
+    def bin_codes(self, values: Any) -> np.ndarray:
+        """
+        Geef per waarde de index van de bin, of -1 buiten de grenzen en bij NaN.
+
+        Args:
+            values: Waarden (array, Series of lijst)
+
+        Returns:
+            np.ndarray: Bin-index per waarde
+        """
+        values = np.asarray(values, dtype="float64")
+        codes = np.searchsorted(self.edges, values, side="left") - 1
+        outside = (codes < 0) | (codes >= len(self.counts)) | np.isnan(values)
+        codes[outside] = -1
+        return codes
+
+    def add(self, values: Any) -> "Histogram":
+        """
+        Tel waarden op bij dit histogram.
+
+        Args:
+            values: Waarden (array, Series of lijst)
+
+        Returns:
+            Histogram: Dit histogram, zodat aanroepen te ketenen zijn
+        """
+        values = np.asarray(values, dtype="float64")
+        nan = np.isnan(values)
+        codes = np.searchsorted(self.edges, values[~nan], side="left") - 1
+        self.missing += int(nan.sum())
+        self.underflow += int((codes < 0).sum())
+        self.overflow += int((codes >= len(self.counts)).sum())
+        inside = codes[(codes >= 0) & (codes < len(self.counts))]
+        self.counts += np.bincount(inside, minlength=len(self.counts))
+        return self
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """
+        Tel een ander histogram met dezelfde grenzen op bij dit histogram.
+
+        Args:
+            other: Histogram met identieke grenzen
+
+        Returns:
+            Histogram: Dit histogram
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError(
+                "Alleen histogrammen met dezelfde grenzen zijn op te tellen"
+            )
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.missing += other.missing
+        return self
+
+    def copy(self) -> "Histogram":
+        """Geef een onafhankelijke kopie."""
+        return Histogram(self.edges).merge(self)
+
+    def __add__(self, other: "Histogram") -> "Histogram":
+        return self.copy().merge(other)
+
+    def __radd__(self, other: Any) -> "Histogram":
+        # Zodat sum(histogrammen) werkt, dat begint bij 0
+        if isinstance(other, int) and other == 0:
+            return self.copy()
+        return NotImplemented
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Histogram):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    @property
+    def total(self) -> int:
+        """Aantal waarden binnen de grenzen."""
+        return int(self.counts.sum())
+
+    @property
+    def intervals(self) -> pd.IntervalIndex:
+        """De bins als rechts gesloten intervallen."""
+        return pd.IntervalIndex.from_breaks(self.edges, closed="right")
+
+    def to_series(self) -> pd.Series:
+        """Tellingen per bin, geïndexeerd op de intervallen."""
+        return pd.Series(self.counts, index=self.intervals, name="count")
+
+    def percentages(self) -> pd.Series:
+        """Fractie van total per bin."""
+        return self.to_series() / self.total
+
+    def cumulative(self) -> pd.Series:
+        """Cumulatieve fractie van total per bin."""
+        return self.percentages().cumsum()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Histogram als dictionary, bijvoorbeeld voor JSON."""
+        return {
+            "edges": [float(edge) for edge in self.edges],
+            "counts": [int(count) for count in self.counts],
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+            "missing": self.missing,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        """
+        Maak een histogram uit to_dict().
+
+        Args:
+            data: Dictionary met edges, counts en de tellingen buiten de grenzen
+
+        Returns:
+            Histogram: Het histogram
+        """
+        histogram = cls(data["edges"], data["counts"])
+        histogram.underflow = int(data.get("underflow", 0))
+        histogram.overflow = int(data.get("overflow", 0))
+        histogram.missing = int(data.get("missing", 0))
+        return histogram
+
+
+def merge_histograms(histograms: Iterable[Histogram]) -> Histogram:
+    """
+    Tel histogrammen met dezelfde grenzen op tot een nieuw histogram.
+
+    Args:
+        histograms: Histogrammen, bijvoorbeeld per chunk of per chat
+
+    Returns:
+        Histogram: De som
+    """
+    histograms: List[Histogram] = list(histograms)
+    if not histograms:
+        raise ValueError("Geen histogrammen om samen te voegen")
+    merged = histograms[0].copy()
+    for histogram in histograms[1:]:
+        merged.merge(histogram)
+    return merged
@@ -6,6 +6,8 @@ from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.manifold import TSNE
 from sklearn.metrics.pairwise import manhattan_distances
 
+from wa_analysis.settings.profiler import profiled
+
 
 class TextClustering:
     def __init__(self):
@@ -30,6 +32,7 @@ class TextClustering:
             parts = parts[:k]
         return parts
 
+    @profiled("fit")
     def fit(self, parts: list[str]) -> np.ndarray:
         x = self.vectorizer.fit_transform(parts)
         logger.info(f"Vectorized text into shape {x.shape}")
@@ -37,13 +40,16 @@ class TextClustering:
         distance = manhattan_distances(x, x)
         return distance
 
+    @profiled("reduce_dims")
     def reduce_dims(self, distance: np.ndarray, method: str = "PCA") -> np.ndarray:
         if method == "PCA":
             logger.info("Using PCA")
             model = PCA(n_components=2)
         else:
-            logger.info("Using t-SNE")
-            model = TSNE(n_components=2)
+            # t-SNE needs perplexity < n_samples; the default 30 fails on few parts
+            perplexity = min(30.0, len(distance) - 1)
+            logger.info(f"Using t-SNE with perplexity {perplexity}")
+            model = TSNE(n_components=2, perplexity=perplexity)
         x = model.fit_transform(distance)
         return x
 
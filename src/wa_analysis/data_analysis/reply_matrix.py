@@ -0,0 +1,161 @@
+### Who-replies-to-whom matrices counted with bincount on integer codes ###
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Boven dit aantal cellen wordt niet meer dicht geteld maar via np.unique
+DENSE_LIMIT = 10_000_000
+
+
+def label_codes(
+    values: pd.Series, labels: Optional[pd.Index] = None
+) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Zet waarden om naar gehele codes, -1 voor NaN of een onbekend label.
+
+    Een categorische kolom levert zijn codes zonder te hashen; andere kolommen
+    worden gesorteerd gefactoriseerd, in dezelfde volgorde als pivot_table.
+
+    Args:
+        values: Kolom met labels
+        labels: Vaste labels (standaard de categorieën of de gesorteerde waarden)
+
+    Returns:
+        Tuple[np.ndarray, pd.Index]: Code per rij en de labels bij de codes
+    """
+    if labels is not None:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Codes van de categorieën vertalen is goedkoper dan alle rijen
+            mapping = np.append(labels.get_indexer(values.cat.categories), -1)
+            # Code -1 (NaN) wijst naar de -1 achteraan de mapping
+            return mapping[values.cat.codes.to_numpy()], labels
+        return labels.get_indexer(values), labels
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype("int64"), pd.CategoricalIndex(
+            values.cat.categories, dtype=values.dtype
+        )
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, pd.Index(uniques)
+
+
+def _valid_pairs(
+    rows: pd.Series,
+    columns: pd.Series,
+    mask: Optional[pd.Series],
+    weights: Optional[pd.Series],
+    row_labels: Optional[pd.Index],
+    column_labels: Optional[pd.Index],
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray], pd.Index, pd.Index]:
+    """Codes (en gewichten) van de paren waarin beide labels bekend zijn en mask waar is."""
+    row_codes, row_labels = label_codes(rows, row_labels)
+    column_codes, column_labels = label_codes(columns, column_labels)
+    valid = (row_codes >= 0) & (column_codes >= 0)
+    if mask is not None:
+        valid &= np.asarray(mask, dtype=bool)
+    if weights is not None:
+        weights = np.asarray(weights, dtype="float64")[valid]
+    return row_codes[valid], column_codes[valid], weights, row_labels, column_labels
+
+
+def reply_counts(
+    rows: pd.Series,
+    columns: pd.Series,
+    mask: Optional[pd.Series] = None,
+    observed: bool = True,
+    weights: Optional[pd.Series] = None,
+) -> pd.DataFrame:
+    """
+    Tel paren (rij, kolom) in een dichte matrix met één np.bincount.
+
+    Geeft hetzelfde als pivot_table(index=rows, columns=columns,
+    aggfunc="count", fill_value=0, observed=True): rijen met NaN in een van
+    beide kolommen tellen niet mee en met observed blijven alleen labels over
+    die in een geteld paar voorkomen.
+
+    Args:
+        rows: Label per bericht voor de rijen, bijvoorbeeld Position
+        columns: Label per bericht voor de kolommen, bijvoorbeeld prev_position
+        mask: Alleen berichten waar dit waar is tellen mee
+        observed: Laat labels zonder getelde paren weg
+        weights: Gewicht per bericht in plaats van 1 (geeft een float-matrix)
+
+    Returns:
+        pd.DataFrame: Aantal per paar, rijen en kolommen benoemd naar de invoer
+    """
+    row_codes, column_codes, weights, row_labels, column_labels = _valid_pairs(
+        rows, columns, mask, weights, None, None
+    )
+    width = len(column_labels)
+    counts = np.bincount(
+        row_codes * width + column_codes,
+        weights=weights,
+        minlength=len(row_labels) * width,
+    ).reshape(len(row_labels), width)
+
+    matrix = pd.DataFrame(
+        counts,
+        index=pd.Index(row_labels, name=rows.name),
+        columns=pd.Index(column_labels, name=columns.name),
+    )
+    if observed:
+        matrix = matrix.loc[counts.any(axis=1), counts.any(axis=0)]
+    return matrix
+
+
+def sparse_reply_counts(
+    rows: pd.Series,
+    columns: pd.Series,
+    mask: Optional[pd.Series] = None,
+    labels: Optional[pd.Index] = None,
+    weights: Optional[pd.Series] = None,
+) -> Tuple[sparse.csr_matrix, pd.Index]:
+    """
+    Tel paren in een vierkante sparse matrix, bijvoorbeeld auteur × vorige auteur.
+
+    Rijen en kolommen delen dezelfde labels, zodat cel (i, j) het aantal
+    reacties van labels[i] op labels[j] is. Zolang de matrix klein genoeg is
+    wordt er dicht geteld met np.bincount, anders via np.unique op de
+    gecombineerde codes; alleen paren die voorkomen kosten geheugen.
+
+    Args:
+        rows: Label per bericht, bijvoorbeeld author
+        columns: Label van het bericht ervoor, bijvoorbeeld prev_author
+        mask: Alleen berichten waar dit waar is tellen mee
+        labels: Vaste labels (standaard alle labels uit beide kolommen, gesorteerd)
+        weights: Gewicht per bericht in plaats van 1 (geeft een float-matrix)
+
+    Returns:
+        Tuple[sparse.csr_matrix, pd.Index]: De matrix en de labels van rijen en kolommen
+    """
+    if labels is None:
+        labels = pd.Index(
+            pd.concat(
+                [rows.dropna().drop_duplicates(), columns.dropna().drop_duplicates()]
+            )
+            .astype(object)
+            .drop_duplicates()
+            .sort_values()
+        )
+    row_codes, column_codes, weights, _, _ = _valid_pairs(
+        rows, columns, mask, weights, labels, labels
+    )
+    size = len(labels)
+    combined = row_codes.astype("int64") * size + column_codes
+
+    if size * size <= DENSE_LIMIT:
+        counts = np.bincount(combined, weights=weights, minlength=size * size)
+        pairs = np.flatnonzero(counts)
+        counts = counts[pairs]
+    else:
+        pairs, inverse = np.unique(combined, return_inverse=True)
+        counts = np.bincount(inverse, weights=weights, minlength=len(pairs))
+
+    matrix = sparse.csr_matrix(
+        (counts, (pairs // size, pairs % size)),
+        shape=(size, size),
+        dtype="int64" if weights is None else "float64",
+    )
+    return matrix, labels
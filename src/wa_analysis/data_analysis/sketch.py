@@ -0,0 +1,373 @@
+### Mergeable quantile sketches (DDSketch style), built per group in one vectorized pass ###
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Maximale grootte van de dichte telmatrix (groepen x buckets) in sketch_by_group
+DENSE_LIMIT = 50_000_000
+
+
+class QuantileSketch:
+    """
+    Quantile sketch met relatieve nauwkeurigheid, naar DDSketch.
+
+    Een positieve waarde x valt in bucket ceil(log(x) / log(gamma)) met
+    gamma = (1 + alpha) / (1 - alpha); elke geschatte quantile ligt dan
+    binnen een factor alpha van de echte waarde. Waarden op of onder 0 (een
+    reactie binnen dezelfde minuut) worden apart geteld. De tellingen staan
+    dicht in één array vanaf offset, zodat twee sketches met dezelfde alpha
+    optellen tot de sketch van alle waarden samen.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        """
+        Args:
+            relative_accuracy: Maximale relatieve fout alpha, tussen 0 en 1
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy moet tussen 0 en 1 liggen")
+        self.relative_accuracy: float = relative_accuracy
+        self.gamma: float = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma: float = float(np.log(self.gamma))
+        self.offset: int = 0
+        self.counts: np.ndarray = np.zeros(0, dtype="int64")
+        self.zero_count: int = 0
+        self.min: float = np.inf
+        self.max: float = -np.inf
+
+    @property
+    def count(self) -> int:
+        """Aantal toegevoegde waarden."""
+        return int(self.counts.sum()) + self.zero_count
+
+    def keys(self, values: np.ndarray) -> np.ndarray:
+        """Bucket van elke positieve waarde."""
+        return np.ceil(np.log(values) / self.log_gamma).astype("int64")
+
+    def _extend(self, low: int, high: int) -> None:
+        """Zorg dat de buckets low tot en met high in counts passen."""
+        if not len(self.counts):
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype="int64")
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype="int64")
+        start = self.offset - new_low
+        counts[start : start + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add(self, values: Any) -> "QuantileSketch":
+        """
+        Voeg waarden toe; NaN wordt overgeslagen.
+
+        Args:
+            values: Waarden (array, Series of lijst)
+
+        Returns:
+            QuantileSketch: Deze sketch, zodat aanroepen te ketenen zijn
+        """
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            keys = self.keys(positive)
+            low, high = int(keys.min()), int(keys.max())
+            self._extend(low, high)
+            self.counts += np.bincount(keys - self.offset, minlength=len(self.counts))
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Tel een andere sketch met dezelfde nauwkeurigheid op bij deze sketch.
+
+        Args:
+            other: Sketch met dezelfde relative_accuracy
+
+        Returns:
+            QuantileSketch: Deze sketch
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Alleen sketches met dezelfde relative_accuracy zijn op te tellen"
+            )
+        if len(other.counts):
+            self._extend(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start : start + len(other.counts)] += other.counts
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self) -> "QuantileSketch":
+        """Geef een onafhankelijke kopie."""
+        return QuantileSketch(self.relative_accuracy).merge(self)
+
+    def __add__(self, other: "QuantileSketch") -> "QuantileSketch":
+        return self.copy().merge(other)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Schat quantiles.
+
+        Args:
+            qs: Fracties tussen 0 en 1, bijvoorbeeld [0.5, 0.9, 0.99]
+
+        Returns:
+            np.ndarray: Geschatte waarde per fractie (NaN voor een lege sketch)
+        """
+        qs = np.asarray(qs, dtype="float64")
+        if ((qs < 0) | (qs > 1)).any():
+            raise ValueError(f"Quantiles moeten tussen 0 en 1 liggen: {qs.tolist()}")
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+
+        # Rang zoals np.quantile: q * (n - 1), de eerste bucket die die rang bevat
+        ranks = qs * (self.count - 1)
+        cumulative = self.zero_count + np.cumsum(self.counts)
+        index = np.searchsorted(cumulative, ranks, side="right")
+        index = np.minimum(index, len(self.counts) - 1) if len(self.counts) else index
+        estimates = (
+            2 * self.gamma ** (self.offset + index.astype("float64")) / (self.gamma + 1)
+        )
+        estimates = np.where(ranks < self.zero_count, 0.0, estimates)
+        return np.clip(estimates, self.min, self.max)
+
+    def quantile(self, q: float) -> float:
+        """Schat één quantile (zie quantiles)."""
+        return float(self.quantiles([q])[0])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Sketch als compacte dictionary, bijvoorbeeld voor JSON."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "offset": self.offset,
+            "counts": self.counts.tolist(),
+            "zero_count": self.zero_count,
+            "min": None if self.count == 0 else self.min,
+            "max": None if self.count == 0 else self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        """
+        Maak een sketch uit to_dict().
+
+        Args:
+            data: Dictionary uit to_dict
+
+        Returns:
+            QuantileSketch: De sketch
+        """
+        sketch = cls(data["relative_accuracy"])
+        sketch.offset = int(data["offset"])
+        sketch.counts = np.asarray(data["counts"], dtype="int64")
+        sketch.zero_count = int(data["zero_count"])
+        if data.get("min") is not None:
+            sketch.min, sketch.max = float(data["min"]), float(data["max"])
+        return sketch
+
+
+def factorize_groups(
+    groups: Union[pd.Series, pd.DataFrame],
+) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Geef per rij een groepsnummer en de sleutel van elke groep.
+
+    Elke kolom wordt apart gefactoriseerd en de codes worden tot één geheel
+    getal gecombineerd; dat is veel sneller dan tuples in een MultiIndex.
+
+    Args:
+        groups: Groepssleutel per rij, één of meer kolommen
+
+    Returns:
+        Tuple[np.ndarray, List[Any]]: Codes (-1 bij NaN) en sleutels (tuples bij meerdere kolommen)
+    """
+    if isinstance(groups, pd.Series):
+        codes, uniques = pd.factorize(groups)
+        return codes, list(uniques)
+
+    combined = np.zeros(len(groups), dtype="int64")
+    missing = np.zeros(len(groups), dtype=bool)
+    levels = []
+    for column in groups.columns:
+        column_codes, column_uniques = pd.factorize(groups[column])
+        missing |= column_codes < 0
+        combined *= len(column_uniques)
+        combined += column_codes
+        levels.append(column_uniques)
+    size = int(np.prod([len(level) for level in levels], dtype="float64"))
+    if size <= DENSE_LIMIT:
+        # Kleine codeset: groepen nummeren via bincount, zonder hashing
+        present = np.bincount(combined[~missing], minlength=size) > 0
+        uniques = np.flatnonzero(present)
+        lookup = np.cumsum(present) - 1
+        codes = np.where(missing, -1, lookup[np.where(missing, 0, combined)])
+    else:
+        combined[missing] = -1
+        codes, uniques = pd.factorize(combined)
+        # Het nummer van de groep met NaN valt weg; hernummer de rest aaneengesloten
+        remap = np.cumsum(uniques >= 0) - 1
+        codes = np.where(codes >= 0, remap[codes], -1)
+        uniques = uniques[uniques >= 0]
+
+    # Ontleed de gecombineerde codes weer in een index per kolom
+    remainder = uniques
+    positions = []
+    for level in reversed(levels):
+        remainder, index = np.divmod(remainder, len(level))
+        positions.append(index)
+    columns = [level.take(index) for level, index in zip(levels, reversed(positions))]
+    keys: List[Any] = list(zip(*columns))
+    return codes, keys
+
+
+def sketch_by_group(
+    values: Union[pd.Series, np.ndarray],
+    groups: Union[pd.Series, pd.DataFrame],
+    relative_accuracy: float = 0.01,
+) -> Dict[Any, QuantileSketch]:
+    """
+    Bouw in één gevectoriseerde doorgang een sketch per groep.
+
+    Groepen worden gefactoriseerd, alle buckets in één keer berekend en met
+    één bincount over (groep, bucket) geteld. Rijen met NaN als waarde of
+    als groep worden overgeslagen.
+
+    Args:
+        values: Waarden, bijvoorbeeld time_since_prev
+        groups: Groepssleutel per rij; met meerdere kolommen is de sleutel een tuple
+        relative_accuracy: Maximale relatieve fout van de quantiles
+
+    Returns:
+        Dict[Any, QuantileSketch]: Sketch per groep
+    """
+    codes, group_keys = factorize_groups(groups)
+    values = np.asarray(values, dtype="float64")
+    valid = (codes >= 0) & ~np.isnan(values)
+    if not valid.all():
+        codes, values = codes[valid], values[valid]
+    n_groups = len(group_keys)
+
+    sketches = [QuantileSketch(relative_accuracy) for _ in range(n_groups)]
+    if not len(values):
+        return {}
+
+    extremes = (
+        pd.Series(values)
+        .groupby(codes, sort=True)
+        .agg(["min", "max"])
+        .reindex(range(n_groups))
+    )
+    minima, maxima = extremes["min"].to_numpy(), extremes["max"].to_numpy()
+    positive = values > 0
+    zero_counts = np.bincount(codes[~positive], minlength=n_groups)
+
+    keys = sketches[0].keys(values[positive])
+    group_codes = codes[positive]
+    rows: List[Optional[np.ndarray]] = [None] * n_groups
+    offsets = np.zeros(n_groups, dtype="int64")
+    if len(keys):
+        low = int(keys.min())
+        width = int(keys.max()) - low + 1
+        keys -= low
+        if n_groups * width <= DENSE_LIMIT:
+            dense = np.bincount(
+                group_codes * width + keys, minlength=n_groups * width
+            ).reshape(n_groups, width)
+            used = dense > 0
+            first = used.argmax(axis=1)
+            last = width - 1 - used[:, ::-1].argmax(axis=1)
+            for code in np.flatnonzero(used.any(axis=1)):
+                rows[code] = dense[code, first[code] : last[code] + 1].copy()
+                offsets[code] = low + first[code]
+        else:
+            # Te veel groepen x buckets: tel alleen de paren die voorkomen
+            pairs, pair_counts = np.unique(
+                np.stack([group_codes, keys]), axis=1, return_counts=True
+            )
+            bounds = np.searchsorted(pairs[0], np.arange(n_groups + 1))
+            for code in range(n_groups):
+                pair_keys = pairs[1, bounds[code] : bounds[code + 1]]
+                if not len(pair_keys):
+                    continue
+                row = np.zeros(pair_keys[-1] - pair_keys[0] + 1, dtype="int64")
+                row[pair_keys - pair_keys[0]] = pair_counts[
+                    bounds[code] : bounds[code + 1]
+                ]
+                rows[code] = row
+                offsets[code] = low + pair_keys[0]
+
+    for code, sketch in enumerate(sketches):
+        sketch.zero_count = int(zero_counts[code])
+        if not np.isnan(minima[code]):
+            sketch.min, sketch.max = float(minima[code]), float(maxima[code])
+        if rows[code] is not None:
+            sketch.offset, sketch.counts = int(offsets[code]), rows[code]
+
+    # Groepen met alleen NaN als waarde krijgen geen sketch
+    return {key: sketch for key, sketch in zip(group_keys, sketches) if sketch.count}
+
+
+def merge_sketch_groups(
+    parts: Iterable[Dict[Any, QuantileSketch]],
+) -> Dict[Any, QuantileSketch]:
+    """
+    Tel sketches per groep op, bijvoorbeeld uit verschillende chunks of chats.
+
+    Args:
+        parts: Resultaten van sketch_by_group
+
+    Returns:
+        Dict[Any, QuantileSketch]: Eén sketch per groep over alle delen
+    """
+    merged: Dict[Any, QuantileSketch] = {}
+    for part in parts:
+        for group, sketch in part.items():
+            if group in merged:
+                merged[group].merge(sketch)
+            else:
+                merged[group] = sketch.copy()
+    return merged
+
+
+def quantile_table(
+    sketches: Dict[Any, QuantileSketch],
+    qs: Sequence[float] = (0.5, 0.9, 0.99),
+    names: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Zet sketches per groep om naar een tabel met quantiles.
+
+    Args:
+        sketches: Sketch per groep
+        qs: Gewenste quantiles
+        names: Namen van de groepskolommen (voor de index)
+
+    Returns:
+        pd.DataFrame: Per groep het aantal en kolommen p50, p90, ...
+    """
+    columns = [f"p{q * 100:g}" for q in qs]
+    groups = list(sketches)
+    table = pd.DataFrame(
+        [sketches[group].quantiles(qs) for group in groups],
+        columns=columns,
+        index=(
+            pd.MultiIndex.from_tuples(groups, names=names)
+            if groups and isinstance(groups[0], tuple)
+            else pd.Index(groups, name=names[0] if names else None)
+        ),
+    )
+    table.insert(0, "count", [sketches[group].count for group in groups])
+    return table
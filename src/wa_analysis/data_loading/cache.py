@@ -0,0 +1,266 @@
+### This module keeps loaded and enriched datasets in memory for the whole run ###
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from wa_analysis.data_loading.enrichment_cache import EnrichmentCache
+from wa_analysis.data_loading.processor import DataProcessor, enriched_columns
+from wa_analysis.data_loading.store import DatasetStore
+from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import Profiler
+
+# Setup logger
+logger = Logger().get_logger()
+
+CacheKey = Tuple[str, int]
+RequestKey = Tuple[
+    CacheKey,
+    Optional[Tuple[str, ...]],
+    Optional[str],
+    Optional[str],
+    Optional[Tuple[str, ...]],
+    Optional[Tuple[str, ...]],
+]
+
+
+def enable_copy_on_write() -> None:
+    """
+    Zet copy-on-write van pandas aan voor het hele proces.
+
+    De DatasetCache deelt frames via ondiepe kopieën en rekent erop dat pandas
+    pas kopieert bij een aanpassing. Dit is een procesbrede instelling, dus
+    die wordt één keer gezet bij het begin van een run (main, pipeline en de
+    workers van batch) en niet als bijwerking van de cache.
+    """
+    pd.set_option("mode.copy_on_write", True)
+    logger.info("Copy-on-write van pandas ingeschakeld")
+
+
+class DatasetCache:
+    """
+    Procesbrede cache van geladen en verrijkte datasets.
+
+    Elke dataset wordt één keer geladen en door DataProcessor.add_columns
+    verrijkt, of direct uit de EnrichmentCache op schijf gehaald. De sleutel
+    is het pad plus de wijzigingstijd, zodat een nieuw weggeschreven bestand
+    automatisch opnieuw wordt geladen. De cache is thread-safe: per pad laadt
+    maar één thread tegelijk, zodat parallelle stappen van de pipeline een
+    dataset niet dubbel laden en verrijken. Visualisaties
+    krijgen een ondiepe kopie; met copy-on-write (zie enable_copy_on_write)
+    kopieert pandas pas data als een visualisatie iets aanpast, waardoor ze
+    elkaar niet kunnen beschadigen.
+    """
+
+    _instance: Optional["DatasetCache"] = None  # Singleton pattern
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "DatasetCache":
+        """Implement singleton pattern to ensure only one cache exists."""
+        if cls._instance is None:
+            cls._instance = super(DatasetCache, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        # Only initialize once (singleton pattern)
+        if getattr(self, "_initialized", False):
+            return
+
+        self._frames: Dict[CacheKey, pd.DataFrame] = {}
+        self._subsets: Dict[RequestKey, pd.DataFrame] = {}
+        # _lock beschermt de dicts en tellers, _path_locks het laden per pad
+        self._lock = threading.Lock()
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+        if not pd.get_option("mode.copy_on_write"):
+            logger.warning(
+                "Copy-on-write staat uit; aanpassingen aan gedeelde frames "
+                "zijn zichtbaar voor andere visualisaties"
+            )
+        logger.info("DatasetCache geïnitialiseerd")
+        self._initialized = True
+
+    @staticmethod
+    def make_key(file_path: Path) -> CacheKey:
+        """
+        Bepaal de cachesleutel van een bestand of dataset-map.
+
+        Voor een map (met part-bestanden) telt de nieuwste wijzigingstijd van
+        de map en de bestanden erin.
+
+        Args:
+            file_path: Pad naar het bestand of de map
+
+        Returns:
+            CacheKey: Tuple van (absoluut pad, wijzigingstijd in ns)
+        """
+        resolved = Path(file_path).resolve()
+        mtime = resolved.stat().st_mtime_ns
+        if resolved.is_dir():
+            for child in resolved.iterdir():
+                mtime = max(mtime, child.stat().st_mtime_ns)
+        return str(resolved), mtime
+
+    def get_enriched(
+        self,
+        config: Dict[str, Any],
+        datafile: Optional[Path] = None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        authors: Optional[Sequence[str]] = None,
+        chats: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Geef de verrijkte DataFrame van een dataset, geladen indien nodig.
+
+        Zonder projectie of filter wordt de volledige dataset gecachet. Met
+        alleen een kolomprojectie wordt uit de volledige dataset geknipt als
+        die al in het geheugen of op schijf staat. Met een rijfilter wordt
+        alleen het gefilterde deel geladen en verrijkt; dat resultaat wordt
+        niet op schijf bewaard, omdat de verrijking relatief is aan de rijen.
+        Chats uit de DatasetStore worden net zo behandeld als een rijfilter.
+
+        Args:
+            config: Configuratie uit config.toml
+            datafile: Pad naar de dataset
+            columns: Bronkolommen die nodig zijn (standaard alle)
+            start: Alleen berichten vanaf dit moment
+            end: Alleen berichten vóór dit moment
+            authors: Alleen berichten van deze auteurs
+            chats: Lees deze chats uit de DatasetStore in plaats van datafile
+
+        Returns:
+            pd.DataFrame: Alleen-lezen view op de verrijkte DataFrame
+        """
+        Profiler().set_dataset(",".join(chats) if chats is not None else datafile)
+        if chats is not None:
+            key = self.make_key(DatasetStore(config).catalog_path)
+        else:
+            key = self.make_key(Path(config["processed"]).resolve() / Path(datafile))
+        row_filter = any(arg is not None for arg in (start, end, authors, chats))
+
+        with self._path_lock(key[0]):
+            if columns is None and not row_filter:
+                return self._get_full(config, datafile, key).copy(deep=False)
+            return self._get_subset(
+                config, datafile, key, row_filter, columns, start, end, authors, chats
+            ).copy(deep=False)
+
+    def _path_lock(self, path: str) -> threading.Lock:
+        """Lock voor het laden van één pad."""
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def _get_subset(
+        self,
+        config: Dict[str, Any],
+        datafile: Optional[Path],
+        key: CacheKey,
+        row_filter: bool,
+        columns: Optional[Sequence[str]],
+        start: Optional[Any],
+        end: Optional[Any],
+        authors: Optional[Sequence[str]],
+        chats: Optional[Sequence[str]],
+    ) -> pd.DataFrame:
+        """Geef een projectie of gefilterde deelselectie, uit het geheugen of vers."""
+        request: RequestKey = (
+            key,
+            tuple(columns) if columns is not None else None,
+            str(start) if start is not None else None,
+            str(end) if end is not None else None,
+            tuple(sorted(authors)) if authors is not None else None,
+            tuple(sorted(chats)) if chats is not None else None,
+        )
+        with self._lock:
+            cached = self._subsets.get(request)
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._evict_path(key)
+            full = self._frames.get(key)
+        if cached is not None:
+            logger.info(f"Deelselectie uit cache: {key[0]}")
+            return cached
+
+        wanted: Optional[List[str]] = (
+            enriched_columns(columns, config) if columns is not None else None
+        )
+        df: Optional[pd.DataFrame] = None
+        if not row_filter:
+            if full is not None:
+                logger.info(f"Kolomprojectie uit gecachete dataset: {key[0]}")
+                df = full[wanted]
+            else:
+                df = EnrichmentCache(config).load(Path(key[0]), columns=wanted)
+
+        if df is None:
+            logger.info(f"Deelselectie laden en verrijken: {key[0]}")
+            processor = DataProcessor(
+                config=config,
+                datafile=datafile,
+                columns=columns,
+                start=start,
+                end=end,
+                authors=authors,
+                chats=chats,
+            )
+            df = processor.add_columns()
+
+        with self._lock:
+            self._subsets[request] = df
+        return df
+
+    def _get_full(
+        self, config: Dict[str, Any], datafile: Path, key: CacheKey
+    ) -> pd.DataFrame:
+        """Geef de volledige verrijkte dataset, uit het geheugen, van schijf of vers."""
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._evict_path(key)
+        if cached is not None:
+            logger.info(f"Dataset uit cache: {key[0]}")
+            return cached
+
+        logger.info(f"Dataset niet in cache, laden en verrijken: {key[0]}")
+        enrichment_cache = EnrichmentCache(config)
+        source = Path(key[0])
+        df = enrichment_cache.load(source)
+        if df is None:
+            processor = DataProcessor(config=config, datafile=datafile)
+            df = processor.add_columns()
+            enrichment_cache.store(source, df)
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def _evict_path(self, key: CacheKey) -> None:
+        """Verwijder verouderde versies van hetzelfde pad uit de cache (onder _lock)."""
+        stale = [k for k in self._frames if k[0] == key[0] and k != key]
+        for k in stale:
+            logger.debug("Verouderde cache-entry verwijderd: %s", k)
+            del self._frames[k]
+        stale_subsets = [
+            request
+            for request in self._subsets
+            if request[0][0] == key[0] and request[0] != key
+        ]
+        for request in stale_subsets:
+            del self._subsets[request]
+
+    def clear(self) -> None:
+        """Leeg de cache."""
+        with self._lock:
+            logger.info(f"Cache geleegd ({len(self._frames)} datasets)")
+            self._frames.clear()
+            self._subsets.clear()
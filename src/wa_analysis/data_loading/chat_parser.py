@@ -0,0 +1,271 @@
+### This module parses a raw WhatsApp export (_chat.txt) into a parquet file ###
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import HOTPATH, Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+# Schema van de geparste export, gelijk aan wat BaseDataLoader verwacht
+CHAT_SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("ns")),
+        ("author", pa.string()),
+        ("message", pa.string()),
+    ]
+)
+
+# Een nieuwe regel begint met een datum/tijd, bijvoorbeeld:
+#   18-08-2020 14:32 - Auteur: bericht        (Android)
+#   [18-08-2020, 14:32:05] Auteur: bericht    (iOS)
+HEADER_PATTERN = re.compile(
+    r"^\[?(?P<timestamp>\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4},? \d{1,2}:\d{2}(?::\d{2})?)\]?"
+    r"(?: -)? (?P<rest>.*)$"
+)
+AUTHOR_SEPARATOR = ": "
+
+# Onzichtbare tekens die WhatsApp in exports zet
+INVISIBLE_CHARACTERS = "\u200e\u200f\ufeff"
+
+
+class ChatParser:
+    """
+    Streaming parser voor een ruwe WhatsApp-export.
+
+    De export wordt regel voor regel gelezen. Berichten over meerdere regels
+    worden samengevoegd, systeemregels (zonder auteur) worden overgeslagen en
+    de berichten worden in batches ter grootte van een row group naar parquet
+    geschreven. Het geheugengebruik is daardoor begrensd door de batchgrootte.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        input_file: Optional[Path] = None,
+        output_file: Optional[Path] = None,
+        batch_size: Optional[int] = None,
+    ) -> None:
+        logger.info("Initialiseren van ChatParser")
+        self.config = config
+        parser_config: Dict[str, Any] = config.get("parser", {})
+
+        self.input_file = (
+            Path(input_file)
+            if input_file is not None
+            else Path(config["raw"]) / config["input"]
+        )
+        self.output_file = (
+            Path(output_file)
+            if output_file is not None
+            else Path(config["processed"]) / config["current"]
+        )
+        self.datetime_format: str = config.get("datetime_format", "%d-%m-%Y %H:%M")
+        self.batch_size: int = batch_size or parser_config.get("batch_size", 100_000)
+        self.encoding: str = parser_config.get("encoding", "utf-8")
+
+        # Tellers voor de samenvatting na het parsen
+        self.message_count = 0
+        self.system_count = 0
+
+        logger.debug("Invoerbestand: %s", self.input_file)
+        logger.debug("Uitvoerbestand: %s", self.output_file)
+        logger.debug("Batchgrootte: %s", self.batch_size)
+
+    def iter_records(
+        self, start_offset: int = 0
+    ) -> Iterator[Tuple[str, str, str, int]]:
+        """
+        Lees de export regel voor regel en geef complete berichten terug.
+
+        Args:
+            start_offset: Byte-positie in de export waar het lezen begint
+
+        Returns:
+            Iterator[Tuple[str, str, str, int]]: Tuples van (timestamp, auteur,
+                bericht, byte-positie van de eerste regel van het bericht)
+        """
+        current: Optional[List[Any]] = None
+        is_system = False
+        offset = start_offset
+
+        with self.input_file.open("rb") as f:
+            f.seek(start_offset)
+            for raw_line in f:
+                line_offset = offset
+                offset += len(raw_line)
+                line = (
+                    raw_line.decode(self.encoding, errors="replace")
+                    .rstrip("\r\n")
+                    .lstrip(INVISIBLE_CHARACTERS)
+                )
+
+                match = HEADER_PATTERN.match(line)
+                if match is None:
+                    # Vervolgregel van een bericht over meerdere regels
+                    if current is not None and not is_system:
+                        current[2] += "\n" + line
+                    continue
+
+                if current is not None and not is_system:
+                    yield current[0], current[1], current[2], current[3]
+
+                rest = match.group("rest")
+                author, separator, message = rest.partition(AUTHOR_SEPARATOR)
+                if not separator:
+                    # Systeemregel, bijvoorbeeld "X heeft Y toegevoegd"
+                    self.system_count += 1
+                    is_system = True
+                    current = None
+                    continue
+
+                is_system = False
+                current = [
+                    match.group("timestamp"),
+                    author.strip(INVISIBLE_CHARACTERS + " "),
+                    message.lstrip(INVISIBLE_CHARACTERS),
+                    line_offset,
+                ]
+
+        if current is not None and not is_system:
+            yield current[0], current[1], current[2], current[3]
+
+    def parse_timestamps(self, raw_timestamps: List[str]) -> pd.Series:
+        """
+        Zet een batch timestamp-strings in één keer om naar datetimes.
+
+        HEADER_PATTERN accepteert ook timestamps met seconden (iOS-exports);
+        wat niet op datetime_format past, wordt opnieuw geprobeerd met
+        seconden achter de minuten.
+
+        Args:
+            raw_timestamps: Timestamps zoals ze in de export staan
+
+        Returns:
+            pd.Series: Geparste timestamps
+
+        Raises:
+            ValueError: Als een timestamp ook met seconden niet past
+        """
+        cleaned = pd.Series(raw_timestamps, dtype=object).str.replace(
+            ",", "", regex=False
+        )
+        parsed = pd.to_datetime(cleaned, format=self.datetime_format, errors="coerce")
+        failed = parsed.isna()
+        if failed.any() and "%S" not in self.datetime_format:
+            with_seconds = self.datetime_format.replace("%M", "%M:%S", 1)
+            parsed[failed] = pd.to_datetime(
+                cleaned[failed], format=with_seconds, errors="coerce"
+            )
+            failed = parsed.isna()
+        if failed.any():
+            # Strikt opnieuw parsen geeft de foutmelding met de eerste foute waarde
+            pd.to_datetime(cleaned[failed], format=self.datetime_format)
+        return parsed
+
+    def iter_batches(
+        self, start_offset: int = 0, include_offsets: bool = False
+    ) -> Iterator[pa.Table]:
+        """
+        Groepeer de berichten in tabellen van maximaal batch_size rijen.
+
+        Args:
+            start_offset: Byte-positie in de export waar het lezen begint
+            include_offsets: Voeg een kolom 'offset' toe met de byte-positie
+                van elk bericht in de export
+
+        Returns:
+            Iterator[pa.Table]: Arrow-tabellen met het CHAT_SCHEMA
+        """
+        timestamps: List[str] = []
+        authors: List[str] = []
+        messages: List[str] = []
+        offsets: List[int] = []
+
+        for timestamp, author, message, offset in self.iter_records(start_offset):
+            timestamps.append(timestamp)
+            authors.append(author)
+            messages.append(message)
+            offsets.append(offset)
+            if len(timestamps) >= self.batch_size:
+                yield self._to_table(
+                    timestamps, authors, messages, offsets if include_offsets else None
+                )
+                timestamps, authors, messages, offsets = [], [], [], []
+
+        if timestamps:
+            yield self._to_table(
+                timestamps, authors, messages, offsets if include_offsets else None
+            )
+
+    def _to_table(
+        self,
+        timestamps: List[str],
+        authors: List[str],
+        messages: List[str],
+        offsets: Optional[List[int]] = None,
+    ) -> pa.Table:
+        """Zet een batch kolomlijsten om naar een Arrow-tabel."""
+        self.message_count += len(timestamps)
+        table = pa.Table.from_arrays(
+            [
+                pa.array(self.parse_timestamps(timestamps), type=pa.timestamp("ns")),
+                pa.array(authors, type=pa.string()),
+                pa.array(messages, type=pa.string()),
+            ],
+            schema=CHAT_SCHEMA,
+        )
+        if offsets is not None:
+            table = table.append_column("offset", pa.array(offsets, type=pa.int64()))
+        return table
+
+    def write_parquet(self) -> Path:
+        """
+        Parse de volledige export en schrijf het resultaat naar parquet.
+
+        Er wordt eerst naar een tijdelijk bestand geschreven, zodat een
+        afgebroken run geen half bestand achterlaat.
+
+        Returns:
+            Path: Pad naar het geschreven parquet-bestand
+        """
+        logger.info(f"Parsen van {self.input_file} naar {self.output_file}")
+        try:
+            self.output_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.output_file.with_name(self.output_file.name + ".tmp")
+
+            with pq.ParquetWriter(tmp_file, CHAT_SCHEMA) as writer:
+                for table in self.iter_batches():
+                    writer.write_table(table, row_group_size=self.batch_size)
+                    logger.log(
+                        HOTPATH, "Batch geschreven met %s berichten", table.num_rows
+                    )
+
+            tmp_file.replace(self.output_file)
+            logger.info(
+                f"Export geparst: {self.message_count} berichten, "
+                f"{self.system_count} systeemregels overgeslagen"
+            )
+            return self.output_file
+
+        except Exception as e:
+            logger.error(f"Fout bij het parsen van de export: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering chat_parser.py")
+    try:
+        config_loader = ConfigLoader()
+        parser = ChatParser(config_loader.config)
+        parser.write_parquet()
+        logger.info("Einde uitvoering chat_parser.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering chat_parser.py - Fout: {str(e)}")
@@ -0,0 +1,118 @@
+### This module flags message types (media, tikkies, links, ...) per unique message ###
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+# Berichttypen als er geen [message_types] in config.toml staat
+DEFAULT_MESSAGE_TYPES: Dict[str, str] = {
+    "has_image": "<Media weggelaten>",
+    "has_tikkie": "<https://tikkie.me",
+}
+
+
+class MessageClassifier:
+    """
+    Bepaalt voor elk bericht welke berichttypen erin voorkomen.
+
+    De berichttypen komen uit de sectie [message_types] in config.toml: de
+    sleutel is de naam van de kolom, de waarde een reguliere expressie. Elk
+    patroon wordt apart getest, zodat overlappende typen allemaal een vlag
+    krijgen; de kosten groeien dus met het aantal typen. Alleen unieke
+    berichten worden geclassificeerd, zodat veelvoorkomende berichten zoals
+    '<Media weggelaten>' maar één keer worden gescand. De scan per type loopt
+    met de RE2-kernel van pyarrow; een patroon dat RE2 niet ondersteunt (zoals
+    een lookahead of backreference) wordt met Python re getest.
+    """
+
+    def __init__(self, message_types: Dict[str, str]) -> None:
+        self.message_types = dict(message_types)
+        self.names: List[str] = list(self.message_types)
+        # Compileer vooraf, zodat een ongeldig patroon direct opvalt
+        self.patterns: Dict[str, re.Pattern] = {
+            name: re.compile(pattern) for name, pattern in self.message_types.items()
+        }
+        # Typen waarvan het patroon niet door RE2 (pyarrow) kan worden uitgevoerd
+        self.python_only: List[str] = [
+            name
+            for name, pattern in self.message_types.items()
+            if not self._supported_by_arrow(pattern)
+        ]
+        logger.debug(
+            "MessageClassifier met %s berichttypen (%s via Python re)",
+            len(self.names),
+            len(self.python_only),
+        )
+
+    @staticmethod
+    def _supported_by_arrow(pattern: str) -> bool:
+        """Of de RE2-kernel van pyarrow het patroon kan uitvoeren."""
+        try:
+            pc.match_substring_regex(pa.array([""], type=pa.string()), pattern)
+            return True
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return False
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "MessageClassifier":
+        """
+        Maak een classifier op basis van de sectie [message_types].
+
+        Args:
+            config: Configuratie uit config.toml
+
+        Returns:
+            MessageClassifier: Classifier met de geconfigureerde berichttypen
+        """
+        return cls(config.get("message_types", DEFAULT_MESSAGE_TYPES))
+
+    def fingerprint(self) -> str:
+        """Korte hash van de registry, voor gebruik in cachesleutels."""
+        payload = json.dumps(self.message_types, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()[:8]
+
+    def classify(self, messages: pd.Series) -> pd.DataFrame:
+        """
+        Classificeer een kolom berichten.
+
+        Args:
+            messages: Kolom met berichten (ontbrekende berichten tellen als leeg)
+
+        Returns:
+            pd.DataFrame: Per berichttype een kolom met 0/1, met de index van messages
+        """
+        logger.info(f"Classificeren van {len(messages)} berichten")
+        try:
+            codes, uniques = pd.factorize(messages)
+            texts = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+            arrow_texts = pa.array(texts, type=pa.large_string())
+            logger.debug("%s unieke berichten te scannen", len(uniques))
+
+            flags: Dict[str, np.ndarray] = {}
+            for name, pattern in self.patterns.items():
+                if name in self.python_only:
+                    unique_flags = texts.str.contains(pattern, regex=True).to_numpy(
+                        dtype=bool
+                    )
+                else:
+                    unique_flags = pc.match_substring_regex(
+                        arrow_texts, pattern.pattern
+                    ).to_numpy(zero_copy_only=False)
+                # Ontbrekende berichten (code -1) wijzen naar False achteraan
+                flags[name] = np.append(unique_flags, False)[codes].astype(int)
+            return pd.DataFrame(flags, index=messages.index)
+
+        except Exception as e:
+            logger.error(f"Fout bij het classificeren van berichten: {str(e)}")
+            raise
@@ -1,8 +1,8 @@
 ### This module is to load the dataframe using the configfile
 
-import tomllib
 from pathlib import Path
 
+from wa_analysis.settings.app_config import load_config
 from wa_analysis.settings.logger import Logger
 
 # Setup logger
@@ -13,36 +13,36 @@ class ConfigLoader:
     def __init__(self):
         logger.info("Initialiseren van ConfigLoader")
         self.config_path = Path("./config.toml").resolve()
-        logger.debug(f"Config pad: {self.config_path}")
+        logger.debug("Config pad: %s", self.config_path)
 
         self.config = self.load_config()
 
         self.root = Path("./").resolve()
-        logger.debug(f"Root pad: {self.root}")
+        logger.debug("Root pad: %s", self.root)
 
         self.processed = self.root / Path(
             self.config["processed"]
         )  # pad naar de processed-folder
-        logger.debug(f"Processed pad: {self.processed}")
+        logger.debug("Processed pad: %s", self.processed)
 
         self.raw = self.root / Path(self.config["raw"])  # pad naar de raw-folder
-        logger.debug(f"Raw pad: {self.raw}")
+        logger.debug("Raw pad: %s", self.raw)
 
         self.datafile_hockeyteam = self.processed / (
             self.config["current"]
         )  # gebruik het hockeyteam bestand
-        logger.debug(f"Hockey team datafile: {self.datafile_hockeyteam}")
+        logger.debug("Hockey team datafile: %s", self.datafile_hockeyteam)
 
         self.datafile_wife = self.processed / (
             self.config["wife_file"]
         )  # gebruik het wife bestand
-        logger.debug(f"Wife datafile: {self.datafile_wife}")
+        logger.debug("Wife datafile: %s", self.datafile_wife)
 
         self.role_file = self.raw / Path(self.config["role_file"])
-        logger.debug(f"Role file: {self.role_file}")
+        logger.debug("Role file: %s", self.role_file)
 
         self.output_folder = self.root / Path(self.config["output_folder"])
-        logger.debug(f"Output folder: {self.output_folder}")
+        logger.debug("Output folder: %s", self.output_folder)
 
         logger.info("ConfigLoader succesvol geïnitialiseerd")
 
@@ -50,10 +50,11 @@ class ConfigLoader:
         """Laad de configuratie uit het TOML-bestand."""
         logger.info(f"Laden van configuratie uit: {self.config_path}")
         try:
-            with self.config_path.open("rb") as f:
-                config = tomllib.load(f)
-                logger.debug(f"Configuratie geladen met {len(config)} items")
-                return config
+            # Gedeelde, gevalideerde snapshot: het bestand wordt alleen
+            # opnieuw gelezen als het is gewijzigd
+            config = load_config(self.config_path)
+            logger.debug("Configuratie geladen met %s items", len(config))
+            return config
         except Exception as e:
             logger.error(f"Fout bij het laden van configuratie: {str(e)}")
             raise
@@ -64,6 +65,6 @@ if __name__ == "__main__":
     try:
         config_loader = ConfigLoader()
         logger.info("Configuratie succesvol geladen")
-        logger.debug(f"Config inhoud: {config_loader.config}")
+        logger.debug("Config inhoud: %s", config_loader.config)
     except Exception as e:
         logger.error(f"Fout bij uitvoeren van config.py: {str(e)}")
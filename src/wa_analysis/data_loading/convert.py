@@ -0,0 +1,86 @@
+### This module converts processed parquet files to uncompressed Arrow IPC ###
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+IPC_SUFFIX = ".arrow"
+
+
+class IpcConverter:
+    """
+    Zet verwerkte parquet-bestanden om naar Arrow IPC (.arrow).
+
+    Het IPC-bestand wordt ongecomprimeerd geschreven, zodat BaseDataLoader het
+    via memory mapping kan lezen zonder te decomprimeren. Meerdere processen
+    die hetzelfde bestand lezen delen dan de page cache van het besturingssysteem.
+    Een dataset-map met part-bestanden wordt samengevoegd tot één IPC-bestand.
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        logger.info("Initialiseren van IpcConverter")
+        self.processed = Path(config["processed"]).resolve()
+        self.config = config
+
+    def default_sources(self) -> List[Path]:
+        """
+        Geef de parquet-bestanden uit de configuratie.
+
+        Returns:
+            List[Path]: Paden naar de hockeyteam- en partnerdataset
+        """
+        return [
+            self.processed / self.config["current"],
+            self.processed / self.config["wife_file"],
+        ]
+
+    def convert(self, source: Path, target: Optional[Path] = None) -> Path:
+        """
+        Zet één parquet-bestand of dataset-map om naar Arrow IPC.
+
+        Args:
+            source: Pad naar het parquet-bestand of de dataset-map
+            target: Pad van het IPC-bestand (standaard dezelfde naam met .arrow)
+
+        Returns:
+            Path: Pad naar het geschreven IPC-bestand
+        """
+        source = Path(source)
+        target = Path(target) if target is not None else source.with_suffix(IPC_SUFFIX)
+        logger.info(f"Omzetten van {source} naar {target}")
+        try:
+            table = pq.read_table(source)
+            tmp_path = target.with_name("." + target.name + ".tmp")
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            tmp_path.replace(target)
+            logger.info(
+                f"{table.num_rows} rijen geschreven naar {target.name} "
+                f"({target.stat().st_size / 1e6:.1f} MB)"
+            )
+            return target
+
+        except Exception as e:
+            logger.error(f"Fout bij het omzetten naar Arrow IPC: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering convert.py")
+    try:
+        config_loader = ConfigLoader()
+        converter = IpcConverter(config_loader.config)
+        sources = [Path(arg) for arg in sys.argv[1:]] or converter.default_sources()
+        for source in sources:
+            converter.convert(source)
+        logger.info("Einde uitvoering convert.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering convert.py - Fout: {str(e)}")
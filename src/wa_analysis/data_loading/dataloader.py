@@ -1,16 +1,41 @@
 ### This module loads the data and adds the roles of the players ###
 
 from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 
 from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.data_loading.store import DatasetStore
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 
 
 # Basis dataloader class. Aan de hand van de folder pakt hij de data
 class BaseDataLoader:
-    def __init__(self, config, datafile=None):
+    def __init__(
+        self,
+        config,
+        datafile=None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        authors: Optional[Sequence[str]] = None,
+        chats: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            config: Configuratie uit config.toml
+            datafile: Bestand in de processed-folder
+            columns: Alleen deze kolommen inlezen (standaard alle kolommen)
+            start: Alleen berichten vanaf dit tijdstip (inclusief)
+            end: Alleen berichten tot dit tijdstip (exclusief)
+            authors: Alleen berichten van deze auteurs
+            chats: Lees deze chats uit de DatasetStore in plaats van een datafile
+        """
         # Initialiseer de logger
         self.logger = Logger().get_logger()
         self.logger.info(f"Initializing BaseDataLoader with datafile: {datafile}")
@@ -18,40 +43,166 @@ class BaseDataLoader:
         self.processed = Path(config["processed"]).resolve()
         self.config = config
         self.datafile = datafile
+        self.columns = list(columns) if columns is not None else None
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+        self.authors = list(authors) if authors is not None else None
+        self.chats = list(chats) if chats is not None else None
 
         self.logger.debug(f"Processed directory: {self.processed}")
+        # True als df (deels) direct naar een memory-mapped Arrow IPC-bestand wijst
+        self.memory_mapped = False
 
-        if self.datafile is not None:
+        if self.chats is not None:
+            self.logger.info(f"Loading chats from dataset store: {self.chats}")
+            self.df = self.load_store()
+        elif self.datafile is not None:
             self.logger.info(f"Loading data from file: {self.datafile}")
             self.df = self.load_data()
         else:
             self.logger.warning("No datafile specified, df set to None")
             self.df = None  # Als geen bestand is opgegeven, stel df in op None
 
+    def build_filters(self) -> Optional[List[Tuple[str, str, Any]]]:
+        """
+        Zet het tijdsbereik en de auteurs om naar filters in pyarrow-formaat.
+
+        Returns:
+            Optional[List[Tuple[str, str, Any]]]: Filters, of None zonder filter
+        """
+        filters: List[Tuple[str, str, Any]] = []
+        if self.start is not None:
+            filters.append(("timestamp", ">=", self.start))
+        if self.end is not None:
+            filters.append(("timestamp", "<", self.end))
+        if self.authors is not None:
+            filters.append(("author", "in", self.authors))
+        return filters or None
+
+    def _read_columns(self) -> Optional[List[str]]:
+        """Kolommen die gelezen moeten worden: de projectie plus filterkolommen."""
+        if self.columns is None:
+            return None
+        needed = list(self.columns)
+        for column, _, _ in self.build_filters() or []:
+            if column not in needed:
+                needed.append(column)
+        return needed
+
+    def apply_filters(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Pas filters en projectie toe op een al ingelezen DataFrame.
+
+        Wordt gebruikt voor formaten zonder predicate pushdown (JSON en CSV).
+
+        Args:
+            df: Volledig ingelezen DataFrame
+
+        Returns:
+            pd.DataFrame: Gefilterde en geprojecteerde DataFrame
+        """
+        filters = self.build_filters()
+        if filters is not None:
+            mask = pd.Series(True, index=df.index)
+            for column, op, value in filters:
+                values = df[column]
+                if column == "timestamp":
+                    values = pd.to_datetime(values)
+                if op == ">=":
+                    mask &= values >= value
+                elif op == "<":
+                    mask &= values < value
+                else:
+                    mask &= values.isin(value)
+            df = df[mask].reset_index(drop=True)
+        if self.columns is not None:
+            df = df[self.columns]
+        return df
+
+    def load_store(self) -> pd.DataFrame:
+        """
+        Laad chats uit de gepartitioneerde DatasetStore.
+
+        Alleen de partities van de gevraagde chats en maanden worden gelezen.
+
+        Returns:
+            pd.DataFrame: Berichten van de gevraagde chats, met kolom 'chat'
+        """
+        try:
+            df = DatasetStore(self.config).read(
+                chats=self.chats,
+                columns=self.columns,
+                start=self.start,
+                end=self.end,
+                authors=self.authors,
+            )
+            self.logger.info(f"Successfully loaded dataframe with shape: {df.shape}")
+            return df
+
+        except Exception as e:
+            self.logger.error(f"Error loading data from store: {str(e)}")
+            raise
+
+    @profiled("load_data")
     def load_data(self):
         """
         Laad data op basis van het bestandstype uit de configuratie.
-        Ondersteunt bijvoorbeeld JSON, Parquet of CSV.
+        Ondersteunt JSON, CSV, Parquet en Arrow IPC (.arrow/.feather).
+
+        Bij Parquet worden de kolomprojectie en de filters doorgegeven aan de
+        pyarrow-reader, zodat row groups buiten het bereik niet worden gedecodeerd.
         """
         file_path = self.processed / Path(self.datafile)
         file_extension = file_path.suffix
+        filters = self.build_filters()
 
         self.logger.info(
             f"Loading data from {file_path} with extension {file_extension}"
         )
+        if self.columns is not None or filters is not None:
+            self.logger.info(f"Projection: {self.columns}, filters: {filters}")
 
         try:
             if file_extension == ".json":
                 self.logger.debug("Loading JSON file")
-                df = pd.read_json(file_path, encoding="latin")
+                df = self.apply_filters(pd.read_json(file_path, encoding="latin"))
             elif file_extension == ".csv":
                 self.logger.debug("Loading CSV file")
-                df = pd.read_csv(file_path)
+                df = self.apply_filters(
+                    pd.read_csv(file_path, usecols=self._read_columns())
+                )
             elif file_extension == ".parq":
-                self.logger.debug("Loading Parquet file")
-                df = pd.read_parquet(file_path)
+                if file_path.is_dir():
+                    # Map met part-bestanden (zie ingest.py), gelezen als één dataset
+                    self.logger.debug("Loading Parquet dataset directory")
+                else:
+                    self.logger.debug("Loading Parquet file")
+                df = pd.read_parquet(
+                    file_path, engine="pyarrow", columns=self.columns, filters=filters
+                )
+            elif file_extension in (".arrow", ".feather"):
+                # Ongecomprimeerde Arrow IPC via mmap: processen delen de page
+                # cache en er hoeft niets gedecomprimeerd te worden
+                self.logger.debug("Loading Arrow IPC file (memory-mapped)")
+                table = feather.read_table(
+                    file_path, columns=self._read_columns(), memory_map=True
+                )
+                if filters is not None:
+                    table = table.filter(pq.filters_to_expression(filters))
+                if self.columns is not None:
+                    table = table.select(self.columns)
+                # Strings blijven Arrow-arrays op de mmap in plaats van Python-objecten
+                string_type = pd.StringDtype("pyarrow")
+                df = table.to_pandas(
+                    split_blocks=True,
+                    types_mapper={
+                        pa.string(): string_type,
+                        pa.large_string(): string_type,
+                    }.get,
+                )
+                self.memory_mapped = True
             else:
-                error_msg = f"Unsupported file format: {file_extension}. Only CSV, Parquet and JSON are supported."
+                error_msg = f"Unsupported file format: {file_extension}. Only CSV, Parquet, Arrow IPC and JSON are supported."
                 self.logger.error(error_msg)
                 raise ValueError(error_msg)
 
@@ -0,0 +1,220 @@
+### This module stores the output of DataProcessor.add_columns on disk ###
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from wa_analysis.data_loading.classifier import MessageClassifier
+from wa_analysis.data_loading.processor import ENRICHMENT_VERSION
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+HASH_INDEX_NAME = "_hashes.json"
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB per leesactie
+
+# Eén schrijver tegelijk op de hash-index binnen dit proces
+_index_lock = threading.Lock()
+
+
+def _temp_path(path: Path) -> Path:
+    """Tijdelijk pad naast path, uniek per proces en thread."""
+    return path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+class EnrichmentCache:
+    """
+    Cache op schijf van de verrijkte DataFrame uit DataProcessor.add_columns.
+
+    De sleutel bestaat uit de hash van het bronbestand en ENRICHMENT_VERSION.
+    Verandert de bron of de verrijkingscode, dan past de sleutel niet meer en
+    worden oude entries van dezelfde bron verwijderd. Om niet bij elke run het
+    hele bronbestand te hoeven hashen, wordt de hash per bestand onthouden
+    zolang grootte en wijzigingstijd gelijk blijven.
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        cache_config: Dict[str, Any] = config.get("cache", {})
+        self.enabled: bool = cache_config.get("enabled", True)
+        self.cache_dir = Path(cache_config.get("folder", "data/cache")).resolve()
+        self.index_path = self.cache_dir / HASH_INDEX_NAME
+        # De dtype-layout en de berichttypen horen bij de sleutel
+        self.layout = (
+            "c" if config.get("processing", {}).get("compact_schema", False) else ""
+        )
+        self.types_id = MessageClassifier.from_config(config).fingerprint()
+        logger.debug(
+            "EnrichmentCache map: %s (actief: %s)", self.cache_dir, self.enabled
+        )
+
+    def _load_index(self) -> Dict[str, Any]:
+        """Laad de onthouden bestandshashes."""
+        if not self.index_path.exists():
+            return {}
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Hash-index onleesbaar, wordt opnieuw opgebouwd: {e}")
+            return {}
+
+    def _save_index(self, updates: Dict[str, Any]) -> None:
+        """
+        Voeg nieuwe bestandshashes toe aan de index en schrijf die weg.
+
+        De index wordt onder een lock opnieuw gelezen, zodat hashes die een
+        andere thread intussen heeft weggeschreven niet verloren gaan.
+        """
+        with _index_lock:
+            index = self._load_index()
+            index.update(updates)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = _temp_path(self.index_path)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            tmp_path.replace(self.index_path)
+
+    def _file_hash(
+        self, file_path: Path, index: Dict[str, Any], updates: Dict[str, Any]
+    ) -> str:
+        """Bereken (of hergebruik) de sha256 van één bestand; nieuwe hashes gaan in updates."""
+        stat = file_path.stat()
+        entry = index.get(str(file_path))
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["sha256"]
+
+        logger.debug("Hash berekenen van %s", file_path)
+        digest = hashlib.sha256()
+        with file_path.open("rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        updates[str(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest(),
+        }
+        return digest.hexdigest()
+
+    def source_hash(self, source: Path) -> str:
+        """
+        Bepaal de hash van een bronbestand of dataset-map.
+
+        Args:
+            source: Pad naar het bestand of de map met part-bestanden
+
+        Returns:
+            str: Hexadecimale sha256
+        """
+        with _index_lock:
+            index = self._load_index()
+        updates: Dict[str, Any] = {}
+        if source.is_dir():
+            digest = hashlib.sha256()
+            for part in sorted(source.iterdir()):
+                if part.name.startswith(("_", ".")):
+                    continue
+                digest.update(part.name.encode("utf-8"))
+                digest.update(self._file_hash(part, index, updates).encode("ascii"))
+            result = digest.hexdigest()
+        else:
+            result = self._file_hash(source, index, updates)
+        # Hashen gebeurt buiten de lock; alleen nieuwe hashes worden weggeschreven
+        if updates:
+            self._save_index(updates)
+        return result
+
+    def _entry_prefix(self, source: Path) -> str:
+        """Voorvoegsel van alle cache-entries die bij één bronpad horen."""
+        path_id = hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:8]
+        return f"{source.stem}-{path_id}-"
+
+    def entry_path(self, source: Path, key: str) -> Path:
+        """
+        Pad van de cache-entry voor een bron en sleutel.
+
+        Args:
+            source: Pad naar de bron
+            key: Cachesleutel (hash van de bron)
+
+        Returns:
+            Path: Pad naar het parquet-bestand in de cache
+        """
+        return self.cache_dir / (
+            f"{self._entry_prefix(source)}{key[:16]}-{self.types_id}-v{ENRICHMENT_VERSION}{self.layout}.parq"
+        )
+
+    def load(
+        self, source: Path, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Laad de verrijkte DataFrame uit de cache als die nog geldig is.
+
+        Args:
+            source: Pad naar de bron
+            columns: Alleen deze kolommen inlezen (standaard alle)
+
+        Returns:
+            Optional[pd.DataFrame]: De verrijkte DataFrame, of None bij een miss
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            source = Path(source).resolve()
+            entry = self.entry_path(source, self.source_hash(source))
+            if not entry.exists():
+                logger.info(f"Geen geldige verrijkingscache voor {source.name}")
+                return None
+
+            logger.info(f"Verrijkte data geladen uit cache: {entry.name}")
+            return pd.read_parquet(entry, engine="pyarrow", columns=columns)
+
+        except Exception as e:
+            # Een kapotte cache mag de analyse niet tegenhouden
+            logger.warning(f"Laden uit verrijkingscache mislukt: {str(e)}")
+            return None
+
+    def store(self, source: Path, df: pd.DataFrame) -> Optional[Path]:
+        """
+        Sla de verrijkte DataFrame op en verwijder verouderde entries.
+
+        Args:
+            source: Pad naar de bron
+            df: Verrijkte DataFrame
+
+        Returns:
+            Optional[Path]: Pad naar de cache-entry, of None als de cache uit staat
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            source = Path(source).resolve()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry = self.entry_path(source, self.source_hash(source))
+
+            tmp_path = _temp_path(entry)
+            df.to_parquet(tmp_path)
+            tmp_path.replace(entry)
+            logger.info(f"Verrijkte data opgeslagen in cache: {entry.name}")
+
+            for stale in self.cache_dir.glob(f"{self._entry_prefix(source)}*.parq"):
+                if stale != entry:
+                    logger.debug("Verouderde cache-entry verwijderd: %s", stale.name)
+                    stale.unlink(missing_ok=True)
+            return entry
+
+        except Exception as e:
+            # Een mislukte cache mag de analyse niet tegenhouden
+            logger.warning(f"Opslaan in verrijkingscache mislukt: {str(e)}")
+            return None
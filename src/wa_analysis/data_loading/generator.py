@@ -0,0 +1,418 @@
+### This module generates synthetic WhatsApp chats for testing at scale ###
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from wa_analysis.data_loading.chat_parser import CHAT_SCHEMA
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import HOTPATH, Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+ADJECTIVES = [
+    "brave", "calm", "dark", "eager", "fine", "glad", "happy", "icy", "jolly",
+    "keen", "lucky", "motley", "noble", "odd", "proud", "quick", "rapid",
+    "shy", "tiny", "urban", "vivid", "warm", "young", "zesty", "bold", "crisp",
+    "dusty", "early", "fancy", "gentle",
+]  # fmt: skip
+ANIMALS = [
+    "ant", "bat", "cat", "dog", "eel", "fox", "goat", "hare", "ibis", "jay",
+    "kiwi", "lynx", "mole", "newt", "owl", "pike", "quail", "rat", "seal",
+    "toad", "urchin", "vole", "wolf", "yak", "zebra", "bear", "crab", "duck",
+    "fish", "gull",
+]  # fmt: skip
+VOCABULARY = [
+    "ik", "je", "de", "het", "een", "is", "en", "niet", "wat", "dat", "ook",
+    "we", "er", "op", "nog", "maar", "wel", "te", "van", "in", "ja", "nee",
+    "haha", "oké", "morgen", "vanavond", "training", "wedstrijd", "veld",
+    "stick", "bal", "goal", "keeper", "tijd", "laat", "kom", "komt", "zijn",
+    "hebben", "kan", "moet", "gaan", "gaat", "mee", "thuis", "uit", "bier",
+    "derde", "helft", "team", "coach", "trainer", "spelen", "gespeeld",
+    "gewonnen", "verloren", "gelijk", "goed", "lekker", "zondag", "zaterdag",
+    "fietsen", "rijden", "auto", "wie", "waar", "hoe", "laat", "afmelden",
+    "aanwezig", "geblesseerd", "sorry", "top", "mooi", "jammer", "succes",
+    "toernooi", "competitie", "uur", "kwart", "half", "nu", "straks", "even",
+    "iedereen", "jongens", "tikkie", "betalen", "contributie", "shirt",
+    "scheidsrechter", "fluiten", "corner", "strafcorner", "bank", "wissel",
+]  # fmt: skip
+
+# Relatieve activiteit per uur van de dag (0-23), maximaal 1
+DIURNAL_ACTIVITY = np.array(
+    [
+        0.15, 0.06, 0.02, 0.01, 0.01, 0.02, 0.08, 0.30, 0.50, 0.60, 0.60, 0.65,
+        0.80, 0.70, 0.60, 0.60, 0.70, 0.85, 0.90, 1.00, 1.00, 0.90, 0.70, 0.40,
+    ]  # fmt: skip
+)
+
+# Berichttypen met hun aandeel; de rest zijn tekstberichten
+MESSAGE_KIND_SHARES: Dict[str, float] = {
+    "media": 0.08,
+    "tikkie": 0.005,
+    "link": 0.02,
+    "deleted": 0.005,
+    "sticker": 0.01,
+    "poll": 0.002,
+    "location": 0.001,
+}
+POSITIONS = ["Keeper", "Verdediger", "Middenvelder", "Aanvaller"]
+
+SECONDS_PER_DAY = 86_400
+
+
+class ChatGenerator:
+    """
+    Genereert een synthetische chat in het schema dat BaseDataLoader verwacht.
+
+    Gesprekken starten als een Poisson-proces met een dag-en-nachtritme;
+    binnen een gesprek volgen berichten elkaar op met lognormale tussentijden,
+    zodat de tijden net als in echte chats in uitbarstingen komen. Auteurs
+    hebben een scheve (Zipf-achtige) activiteit en sturen vaak meerdere
+    berichten achter elkaar. Media, tikkies, links en andere berichttypen
+    komen voor in vaste verhoudingen. Tekstberichten komen uit een vooraf
+    gegenereerde pool met een lognormale lengteverdeling.
+
+    Het resultaat wordt per batch naar parquet geschreven, zodat het geheugen
+    begrensd blijft, ook voor tientallen miljoenen berichten. Met dezelfde
+    seed en instellingen is de uitvoer identiek.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        seed: Optional[int] = None,
+        authors: Optional[int] = None,
+        days: Optional[int] = None,
+        start: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        pool_size: Optional[int] = None,
+    ) -> None:
+        logger.info("Initialiseren van ChatGenerator")
+        generator_config: Dict[str, Any] = config.get("generator", {})
+        parser_config: Dict[str, Any] = config.get("parser", {})
+
+        self.seed: int = seed if seed is not None else generator_config.get("seed", 42)
+        self.author_count: int = authors or generator_config.get("authors", 25)
+        self.days: int = days or generator_config.get("days", 1825)
+        self.start = pd.Timestamp(start or generator_config.get("start", "2019-01-01"))
+        self.batch_size: int = batch_size or parser_config.get("batch_size", 100_000)
+        self.pool_size: int = pool_size or generator_config.get("pool_size", 50_000)
+
+        # Gesprekken: gemiddeld 1 / session_end berichten per gesprek
+        self.session_end = 0.12
+        self.author_repeat = 0.35
+        self.gap_median_seconds = 45.0
+        self.gap_sigma = 1.2
+
+        self.rng = np.random.default_rng(self.seed)
+        self.authors: List[str] = self.make_authors(self.author_count)
+        weights = 1.0 / np.arange(1, self.author_count + 1) ** 0.8
+        self.author_weights = self.rng.permutation(weights / weights.sum())
+        self.pool, self.kind_ranges = self.make_pool()
+
+        logger.debug(
+            "Seed: %s, auteurs: %s, periode: %s dagen vanaf %s",
+            self.seed,
+            self.author_count,
+            self.days,
+            self.start.date(),
+        )
+
+    def make_authors(self, count: int) -> List[str]:
+        """
+        Maak unieke, geanonimiseerde auteursnamen zoals 'brave-owl'.
+
+        Args:
+            count: Aantal auteurs
+
+        Returns:
+            List[str]: Namen van de auteurs
+        """
+        names = [
+            f"{adjective}-{animal}" for adjective in ADJECTIVES for animal in ANIMALS
+        ]
+        names = [names[i] for i in self.rng.permutation(len(names))]
+        # Meer auteurs dan combinaties: nummeren
+        return [
+            names[i % len(names)] + (f"-{i // len(names)}" if i >= len(names) else "")
+            for i in range(count)
+        ]
+
+    def make_roles(self) -> List[Dict[str, str]]:
+        """
+        Maak de rollen voor Roles.json: ongeveer een op de tien is staf.
+
+        Returns:
+            List[Dict[str, str]]: Per auteur Author, Position en Function
+        """
+        staff = max(1, self.author_count // 10)
+        keepers = max(1, self.author_count // 12)
+        positions = ["Staff"] * staff + ["Keeper"] * keepers
+        positions += [
+            POSITIONS[1 + i % 3] for i in range(self.author_count - len(positions))
+        ]
+        # Eigen generator, zodat de rollen niet afhangen van het aantal berichten
+        rng = np.random.default_rng((self.seed, 1))
+        positions = [positions[i] for i in rng.permutation(len(positions))]
+        return [
+            {
+                "Author": author,
+                "Position": position,
+                "Function": "Staff" if position == "Staff" else "Speler",
+            }
+            for author, position in zip(self.authors, positions)
+        ]
+
+    def make_texts(self, count: int) -> List[str]:
+        """
+        Maak tekstberichten met een lognormaal verdeeld aantal woorden.
+
+        Args:
+            count: Aantal berichten
+
+        Returns:
+            List[str]: Tekstberichten
+        """
+        lengths = np.clip(self.rng.lognormal(np.log(5), 0.8, count).astype(int), 1, 120)
+        ranks = 1.0 / np.arange(1, len(VOCABULARY) + 1)
+        words = self.rng.choice(
+            len(VOCABULARY), size=int(lengths.sum()), p=ranks / ranks.sum()
+        )
+        texts: List[str] = []
+        position = 0
+        for length in lengths:
+            text = " ".join(VOCABULARY[w] for w in words[position : position + length])
+            texts.append(text[0].upper() + text[1:])
+            position += length
+        return texts
+
+    def make_pool(self) -> Tuple[pa.Array, Dict[str, Tuple[int, int]]]:
+        """
+        Maak de pool van berichten waaruit elke batch wordt getrokken.
+
+        Returns:
+            Tuple[pa.Array, Dict[str, Tuple[int, int]]]: De berichten en per
+                berichttype het bereik van indices in de pool
+        """
+        codes = self.rng.integers(10**9, 10**10, 200)
+        coordinates = self.rng.uniform([51.5, 4.0], [53.0, 6.5], (50, 2))
+        kinds: Dict[str, List[str]] = {
+            "text": self.make_texts(self.pool_size),
+            "media": ["<Media weggelaten>"],
+            "tikkie": [
+                f"Wie betaalt mee? <https://tikkie.me/pay/{code}>" for code in codes
+            ],
+            "link": [
+                f"https://www.hockey.nl/nieuws/{'-'.join(text.lower().split()[:4])}"
+                for text in self.make_texts(200)
+            ],
+            "deleted": ["Dit bericht is verwijderd"],
+            "sticker": ["sticker weggelaten"],
+            "poll": [f"PEILING:\n{text}?" for text in self.make_texts(100)],
+            "location": [
+                f"locatie: https://maps.google.com/?q={lat:.5f},{lon:.5f}"
+                for lat, lon in coordinates
+            ],
+        }
+
+        messages: List[str] = []
+        kind_ranges: Dict[str, Tuple[int, int]] = {}
+        for kind, values in kinds.items():
+            kind_ranges[kind] = (len(messages), len(messages) + len(values))
+            messages.extend(values)
+        return pa.array(messages, type=pa.string()), kind_ranges
+
+    def session_starts(self, count: int, clock: float, rate: float) -> np.ndarray:
+        """
+        Trek starttijden van gesprekken met een dag-en-nachtritme.
+
+        Kandidaten komen uit een Poisson-proces met het maximale tempo en
+        worden behouden met de kans uit DIURNAL_ACTIVITY voor hun uur.
+
+        Args:
+            count: Aantal gesprekken
+            clock: Huidige tijd in seconden na de start
+            rate: Gemiddeld aantal gesprekken per seconde
+
+        Returns:
+            np.ndarray: Starttijden in seconden na de start, oplopend
+        """
+        peak_rate = rate / DIURNAL_ACTIVITY.mean()
+        starts: List[np.ndarray] = []
+        found = 0
+        while found < count:
+            candidates = clock + np.cumsum(
+                self.rng.exponential(1 / peak_rate, int(count * 1.3) + 16)
+            )
+            clock = candidates[-1]
+            hours = ((candidates % SECONDS_PER_DAY) // 3600).astype(int)
+            accepted = candidates[
+                self.rng.random(len(candidates)) < DIURNAL_ACTIVITY[hours]
+            ]
+            starts.append(accepted)
+            found += len(accepted)
+        return np.concatenate(starts)[:count]
+
+    def make_batch(
+        self, rows: int, clock: float, rate: float
+    ) -> Tuple[pa.Table, float]:
+        """
+        Genereer één batch berichten.
+
+        Args:
+            rows: Aantal berichten in de batch
+            clock: Tijd in seconden na de start waarna de batch begint
+            rate: Gemiddeld aantal gesprekken per seconde
+
+        Returns:
+            Tuple[pa.Table, float]: De batch met het CHAT_SCHEMA en de nieuwe klok
+        """
+        # Gesprekken met een geometrisch verdeeld aantal berichten
+        lengths = self.rng.geometric(
+            self.session_end, int(rows * self.session_end) + 16
+        )
+        while lengths.sum() < rows:
+            lengths = np.append(lengths, self.rng.geometric(self.session_end, 16))
+        ends = np.cumsum(lengths)
+        sessions = int(np.searchsorted(ends, rows)) + 1
+        lengths = lengths[:sessions]
+        lengths[-1] -= ends[sessions - 1] - rows
+
+        starts = self.session_starts(sessions, clock, rate)
+        first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        gaps = self.rng.lognormal(np.log(self.gap_median_seconds), self.gap_sigma, rows)
+        gaps[np.cumsum(lengths) - lengths] = 0
+        elapsed = np.cumsum(gaps)
+        seconds = np.sort(np.repeat(starts, lengths) + elapsed - elapsed[first])
+
+        # Auteurs: vaak meerdere berichten achter elkaar van dezelfde auteur
+        author_codes = self.rng.choice(self.author_count, rows, p=self.author_weights)
+        repeat = self.rng.random(rows) < self.author_repeat
+        repeat[0] = False
+        source = np.maximum.accumulate(np.where(repeat, 0, np.arange(rows)))
+        author_codes = author_codes[source]
+
+        # Berichttypen en berichten uit de pool
+        kinds = list(MESSAGE_KIND_SHARES) + ["text"]
+        shares = list(MESSAGE_KIND_SHARES.values())
+        kind_codes = self.rng.choice(len(kinds), rows, p=shares + [1 - sum(shares)])
+        low = np.array([self.kind_ranges[kind][0] for kind in kinds])
+        high = np.array([self.kind_ranges[kind][1] for kind in kinds])
+        indices = low[kind_codes] + (
+            self.rng.random(rows) * (high - low)[kind_codes]
+        ).astype(np.int64)
+
+        # Tijden per minuut, zoals in een export van Android
+        minutes = (seconds // 60).astype(np.int64)
+        timestamps = self.start.value + minutes * 60 * 10**9
+        table = pa.Table.from_arrays(
+            [
+                pa.array(timestamps, type=pa.timestamp("ns")),
+                pa.array(self.authors, type=pa.string()).take(pa.array(author_codes)),
+                self.pool.take(pa.array(indices)),
+            ],
+            schema=CHAT_SCHEMA,
+        )
+        return table, float(seconds[-1])
+
+    def generate(self, rows: int, output_file: Path) -> Dict[str, Any]:
+        """
+        Genereer een chat en schrijf hem per batch naar parquet.
+
+        Args:
+            rows: Aantal berichten
+            output_file: Pad van het parquet-bestand
+
+        Returns:
+            Dict[str, Any]: Samenvatting met het aantal berichten en de periode
+        """
+        output_file = Path(output_file)
+        logger.info(f"Genereren van {rows} berichten naar {output_file}")
+        try:
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            # Gesprekken per seconde zodat de berichten de hele periode beslaan
+            rate = rows * self.session_end / (self.days * SECONDS_PER_DAY)
+            clock = 0.0
+
+            tmp_path = output_file.with_name("." + output_file.name + ".tmp")
+            with pq.ParquetWriter(tmp_path, CHAT_SCHEMA) as writer:
+                written = 0
+                while written < rows:
+                    batch_rows = min(self.batch_size, rows - written)
+                    table, clock = self.make_batch(batch_rows, clock, rate)
+                    writer.write_table(table, row_group_size=self.batch_size)
+                    written += batch_rows
+                    logger.log(HOTPATH, "%s/%s berichten geschreven", written, rows)
+            tmp_path.replace(output_file)
+
+            summary = {
+                "rows": rows,
+                "authors": self.author_count,
+                "seed": self.seed,
+                "start": str(self.start),
+                "end": str(self.start + pd.to_timedelta(int(clock // 60), unit="min")),
+            }
+            logger.info(f"Chat gegenereerd: {summary}")
+            return summary
+
+        except Exception as e:
+            logger.error(f"Fout bij het genereren van de chat: {str(e)}")
+            raise
+
+    def write_roles(self, role_file: Path) -> None:
+        """
+        Schrijf de rollen van de auteurs naar een JSON-bestand voor Merger.
+
+        Args:
+            role_file: Pad van het rollenbestand
+        """
+        role_file = Path(role_file)
+        logger.info(f"Schrijven van rollen naar {role_file}")
+        role_file.parent.mkdir(parents=True, exist_ok=True)
+        with role_file.open("w", encoding="utf-8") as f:
+            json.dump(self.make_roles(), f, indent=2)
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering generator.py")
+    try:
+        config_loader = ConfigLoader()
+        config = config_loader.config
+        generator_config: Dict[str, Any] = config.get("generator", {})
+
+        parser = argparse.ArgumentParser(
+            description="Genereer synthetische chats en Roles.json in de map [generator] folder."
+        )
+        parser.add_argument(
+            "--rows", type=int, default=generator_config.get("rows", 100_000)
+        )
+        parser.add_argument("--authors", type=int, default=None)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--days", type=int, default=None)
+        parser.add_argument("--folder", type=Path, default=None)
+        args = parser.parse_args()
+
+        folder = args.folder or config_loader.root / generator_config.get(
+            "folder", "data/sim"
+        )
+        # Dezelfde bestandsnamen als in config.toml, zodat 'raw' en 'processed'
+        # naar deze map kunnen wijzen
+        team = ChatGenerator(
+            config, seed=args.seed, authors=args.authors, days=args.days
+        )
+        team.generate(args.rows, folder / config["current"])
+        team.write_roles(folder / config["role_file"])
+
+        # Een chat met twee personen; andere seed zodat de namen verschillen
+        wife = ChatGenerator(config, seed=team.seed + 1, authors=2, days=args.days)
+        wife.generate(max(args.rows // 10, 1), folder / config["wife_file"])
+        logger.info("Einde uitvoering generator.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering generator.py - Fout: {str(e)}")
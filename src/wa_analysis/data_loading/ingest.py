@@ -0,0 +1,329 @@
+### This module appends new messages from a fresh export to an existing dataset ###
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from wa_analysis.data_loading.chat_parser import (
+    CHAT_SCHEMA,
+    HEADER_PATTERN,
+    INVISIBLE_CHARACTERS,
+    ChatParser,
+)
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+MANIFEST_NAME = "_manifest.json"
+PART_TEMPLATE = "part-{:05d}.parq"
+TAIL_BLOCK_SIZE = 1 << 20  # 1 MiB per stap bij het achterwaarts zoeken
+
+
+class IncrementalIngestor:
+    """
+    Voegt alleen nieuwe berichten uit een verse export toe aan een dataset.
+
+    Een dataset is een map (bijvoorbeeld data/processed/whatsapp.parq/) met
+    append-only part-bestanden en een manifest met de watermark: de laatste
+    opgeslagen timestamp, het aantal berichten op die timestamp en de
+    byte-positie in de export. BaseDataLoader leest de map als één dataset;
+    bestanden die met '_' of '.' beginnen worden daarbij genegeerd.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        input_file: Optional[Path] = None,
+        dataset_dir: Optional[Path] = None,
+    ) -> None:
+        logger.info("Initialiseren van IncrementalIngestor")
+        self.config = config
+        self.dataset_dir = (
+            Path(dataset_dir)
+            if dataset_dir is not None
+            else Path(config["processed"]) / config["current"]
+        )
+        self.parser = ChatParser(config, input_file=input_file)
+        self.input_file = self.parser.input_file
+        self.manifest_path = self.dataset_dir / MANIFEST_NAME
+        self.hint_valid = False
+
+        logger.debug("Export: %s", self.input_file)
+        logger.debug("Dataset map: %s", self.dataset_dir)
+
+    def load_manifest(self) -> Optional[Dict[str, Any]]:
+        """
+        Laad het manifest van de dataset.
+
+        Een bestaand los parquet-bestand wordt eerst omgezet naar een map met
+        één part-bestand, zodat ook oude datasets incrementeel kunnen groeien.
+
+        Returns:
+            Optional[Dict[str, Any]]: Het manifest, of None voor een nieuwe dataset
+        """
+        if self.dataset_dir.is_file():
+            return self._migrate_single_file()
+
+        if not self.manifest_path.exists():
+            logger.info("Geen manifest gevonden, dataset wordt volledig opgebouwd")
+            return None
+
+        with self.manifest_path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        logger.info(
+            f"Manifest geladen: watermark {manifest['watermark']}, "
+            f"{len(manifest['parts'])} part-bestanden"
+        )
+        return manifest
+
+    def _migrate_single_file(self) -> Dict[str, Any]:
+        """Verplaats een los parquet-bestand naar een dataset-map met manifest."""
+        logger.info(f"Omzetten van {self.dataset_dir} naar een dataset-map")
+        tmp_path = self.dataset_dir.with_name(self.dataset_dir.name + ".migrating")
+        self.dataset_dir.replace(tmp_path)
+        self.dataset_dir.mkdir(parents=True)
+        part_path = self.dataset_dir / PART_TEMPLATE.format(0)
+        tmp_path.replace(part_path)
+
+        timestamps = pq.read_table(part_path, columns=["timestamp"]).column(0)
+        manifest = self._new_manifest()
+        if len(timestamps) > 0:
+            values = timestamps.to_numpy()
+            watermark = values.max()
+            manifest["watermark"] = str(pd.Timestamp(watermark))
+            manifest["watermark_count"] = int((values == watermark).sum())
+        manifest["parts"].append(
+            self._part_entry(part_path.name, len(timestamps), timestamps)
+        )
+        self.save_manifest(manifest)
+        return manifest
+
+    def _new_manifest(self) -> Dict[str, Any]:
+        """Maak een leeg manifest aan."""
+        return {
+            "source": str(self.input_file),
+            "watermark": None,
+            "watermark_count": 0,
+            "offset": None,
+            "parts": [],
+            "updated": None,
+        }
+
+    def _part_entry(self, name: str, rows: int, timestamps: Any) -> Dict[str, Any]:
+        """Beschrijf een part-bestand voor in het manifest."""
+        values = timestamps.to_numpy() if rows else np.array([], dtype="M8[ns]")
+        return {
+            "file": name,
+            "rows": rows,
+            "min": str(pd.Timestamp(values.min())) if rows else None,
+            "max": str(pd.Timestamp(values.max())) if rows else None,
+        }
+
+    def save_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        Schrijf het manifest atomisch weg.
+
+        Args:
+            manifest: Het bij te werken manifest
+        """
+        manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+        tmp_path = self.manifest_path.with_name("." + MANIFEST_NAME + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        tmp_path.replace(self.manifest_path)
+        logger.debug("Manifest opgeslagen: %s", self.manifest_path)
+
+    def _header_timestamp(self, line: bytes) -> Optional[pd.Timestamp]:
+        """
+        Geef de timestamp van een berichtregel, of None voor een vervolgregel.
+
+        De timestamp wordt geparst zoals ChatParser dat doet, dus ook met
+        seconden (iOS-exports). Een regel die op een header lijkt maar niet te
+        parsen is, telt als vervolgregel.
+        """
+        text = line.decode(self.parser.encoding, errors="replace").lstrip(
+            INVISIBLE_CHARACTERS
+        )
+        match = HEADER_PATTERN.match(text)
+        if match is None:
+            return None
+        try:
+            return self.parser.parse_timestamps([match.group("timestamp")]).iloc[0]
+        except ValueError:
+            logger.debug("Geen geldige timestamp, vervolgregel: %r", text[:40])
+            return None
+
+    def _line_at(self, offset: int) -> bytes:
+        """Lees de regel die op de gegeven byte-positie begint."""
+        with self.input_file.open("rb") as f:
+            f.seek(offset)
+            return f.readline()
+
+    def find_resume_offset(self, manifest: Dict[str, Any]) -> int:
+        """
+        Zoek de byte-positie in de export waar het parsen moet hervatten.
+
+        Eerst wordt de opgeslagen positie gecontroleerd. Klopt die niet meer
+        (bijvoorbeeld bij een andere export), dan wordt vanaf het einde van het
+        bestand achteruit gezocht naar de eerste berichtregel die ouder is dan
+        de watermark. Nieuwe berichten staan achteraan, dus dit leest meestal
+        maar een klein deel van de export.
+
+        Args:
+            manifest: Manifest met de watermark
+
+        Returns:
+            int: Byte-positie van een berichtregel op of vóór de watermark
+        """
+        watermark = pd.Timestamp(manifest["watermark"])
+        hint: Optional[int] = manifest.get("offset")
+        file_size = self.input_file.stat().st_size
+
+        if hint is not None and hint < file_size:
+            if self._header_timestamp(self._line_at(hint)) == watermark:
+                logger.info(
+                    f"Opgeslagen positie {hint} is geldig, hervatten vanaf daar"
+                )
+                self.hint_valid = True
+                return hint
+            logger.info("Opgeslagen positie komt niet overeen, achterwaarts zoeken")
+
+        with self.input_file.open("rb") as f:
+            end = file_size
+            remainder = b""
+            while end > 0:
+                start = max(0, end - TAIL_BLOCK_SIZE)
+                f.seek(start)
+                block = f.read(end - start) + remainder
+                lines = block.split(b"\n")
+                # De eerste regel kan halverwege beginnen, die bewaren we
+                remainder = lines[0] if start > 0 else b""
+                complete = lines[1:] if start > 0 else lines
+                line_end = start + len(block)
+                for line in reversed(complete):
+                    line_start = line_end - len(line)
+                    line_end = line_start - 1
+                    timestamp = self._header_timestamp(line)
+                    if timestamp is not None and timestamp < watermark:
+                        logger.info(f"Hervatten vanaf byte-positie {line_start}")
+                        return line_start
+                end = start
+
+        logger.info("Geen oudere berichtregel gevonden, hervatten vanaf het begin")
+        return 0
+
+    def ingest(self) -> int:
+        """
+        Parse de export en voeg de berichten na de watermark toe als nieuw part.
+
+        Returns:
+            int: Aantal toegevoegde berichten
+        """
+        logger.info(f"Incrementeel inlezen van {self.input_file}")
+        try:
+            manifest = self.load_manifest()
+            if manifest is None:
+                manifest = self._new_manifest()
+                self.dataset_dir.mkdir(parents=True, exist_ok=True)
+
+            if manifest["watermark"] is None:
+                watermark = None
+                start_offset = 0
+            else:
+                watermark = pd.Timestamp(manifest["watermark"]).to_datetime64()
+                start_offset = self.find_resume_offset(manifest)
+
+            part_name = PART_TEMPLATE.format(len(manifest["parts"]))
+            tmp_path = self.dataset_dir / f".{part_name}.tmp"
+            skip_equal: int = manifest["watermark_count"]
+            added = 0
+            last_timestamp = None
+            last_offset: Optional[int] = None
+            last_count = 0
+            new_timestamps: List[pa.ChunkedArray] = []
+
+            with pq.ParquetWriter(tmp_path, CHAT_SCHEMA) as writer:
+                for table in self.parser.iter_batches(
+                    start_offset, include_offsets=True
+                ):
+                    if watermark is not None:
+                        values = table.column("timestamp").to_numpy()
+                        equal = values == watermark
+                        # Berichten op de watermark zelf: sla de al opgeslagen over
+                        equal_rank = np.cumsum(equal)
+                        keep = (values > watermark) | (
+                            equal & (equal_rank > skip_equal)
+                        )
+                        skip_equal = max(0, skip_equal - int(equal.sum()))
+                        table = table.filter(pa.array(keep))
+                    if table.num_rows == 0:
+                        continue
+
+                    values = table.column("timestamp").to_numpy()
+                    offsets = table.column("offset").to_numpy()
+                    batch_last = values[-1]
+                    at_last = values == batch_last
+                    if last_timestamp is not None and batch_last == last_timestamp:
+                        last_count += int(at_last.sum())
+                    else:
+                        last_count = int(at_last.sum())
+                        last_offset = int(offsets[np.argmax(at_last)])
+                    last_timestamp = batch_last
+
+                    table = table.drop_columns(["offset"])
+                    writer.write_table(table, row_group_size=self.parser.batch_size)
+                    new_timestamps.append(table.column("timestamp"))
+                    added += table.num_rows
+
+            if added == 0:
+                tmp_path.unlink()
+                logger.info("Geen nieuwe berichten gevonden na de watermark")
+                return 0
+
+            part_path = self.dataset_dir / part_name
+            tmp_path.replace(part_path)
+
+            timestamps = pa.chunked_array(
+                [chunk for column in new_timestamps for chunk in column.chunks],
+                type=pa.timestamp("ns"),
+            )
+            if watermark is not None and last_timestamp == watermark:
+                # De watermark is niet verschoven: het eerste bericht op deze
+                # timestamp staat nog op de oude positie (indien bekend)
+                last_count += manifest["watermark_count"]
+                last_offset = manifest["offset"] if self.hint_valid else None
+            manifest["watermark"] = str(pd.Timestamp(last_timestamp))
+            manifest["watermark_count"] = last_count
+            manifest["offset"] = last_offset
+            manifest["source"] = str(self.input_file)
+            manifest["parts"].append(self._part_entry(part_name, added, timestamps))
+            self.save_manifest(manifest)
+
+            logger.info(
+                f"{added} nieuwe berichten toegevoegd in {part_name}, "
+                f"watermark nu {manifest['watermark']}"
+            )
+            return added
+
+        except Exception as e:
+            logger.error(f"Fout bij het incrementeel inlezen: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering ingest.py")
+    try:
+        config_loader = ConfigLoader()
+        ingestor = IncrementalIngestor(config_loader.config)
+        ingestor.ingest()
+        logger.info("Einde uitvoering ingest.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering ingest.py - Fout: {str(e)}")
@@ -1,26 +1,40 @@
+import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+import numpy as np
 import pandas as pd
 
 from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 
 # Setup logger
 logger = Logger().get_logger()
 
+# Optionele geldigheidsperiode van een rol in Roles.json
+VALIDITY_COLUMNS = ["valid_from", "valid_to"]
+
 
 class Merger(DataProcessor):
     def __init__(
-        self, config: Dict[str, Any], altered_df: pd.DataFrame, role_file: Path
+        self,
+        config: Dict[str, Any],
+        altered_df: pd.DataFrame,
+        role_file: Path,
+        drop_unmatched: bool = True,
     ) -> None:
         logger.info("Initialiseren van Merger")
         # Je hebt al altered_df, dus we hoeven geen data opnieuw te laden via de BaseDataLoader
         self.altered_dataframe = altered_df
-        logger.debug(f"Altered dataframe met vorm: {altered_df.shape}")
+        logger.debug("Altered dataframe met vorm: %s", altered_df.shape)
+
+        # Zonder rol weglaten (zoals de oude inner merge) of houden met lege rol
+        self.drop_unmatched = drop_unmatched
+        self.unmatched_authors: Optional[pd.DataFrame] = None
 
         self.role_file = role_file
-        logger.debug(f"Role file: {role_file}")
+        logger.debug("Role file: %s", role_file)
 
         self.player_roles = self.load_player_roles()
         logger.info(f"Spelerrollen geladen met {len(self.player_roles)} entries")
@@ -33,29 +47,91 @@ class Merger(DataProcessor):
     def load_player_roles(self) -> pd.DataFrame:
         """
         Laad de rollen van de spelers uit een JSON-bestand.
+
+        Een rol kan optioneel 'valid_from' en 'valid_to' hebben: de rol geldt
+        dan vanaf valid_from (inclusief) tot valid_to (exclusief). Een
+        ontbrekende grens betekent geen begin of geen einde. Zo kan één
+        auteur per periode een andere rol hebben.
         """
         logger.info(f"Laden van spelerrollen uit: {self.role_file}")
         try:
             roles_df = pd.read_json(self.role_file, encoding="latin")
-            logger.debug(f"Spelerrollen geladen met vorm: {roles_df.shape}")
+            for column in VALIDITY_COLUMNS:
+                if column in roles_df:
+                    roles_df[column] = pd.to_datetime(roles_df[column]).astype(
+                        "datetime64[ns]"
+                    )
+            logger.debug("Spelerrollen geladen met vorm: %s", roles_df.shape)
             return roles_df
         except Exception as e:
             logger.error(f"Fout bij het laden van spelerrollen: {str(e)}")
             raise
 
+    @profiled("merge_dataframes")
     def merge_dataframes(self) -> pd.DataFrame:
         """
         Voeg de spelerrollen toe aan de hoofdgegevens op basis van de auteur.
+
+        In plaats van een merge (die alle kolommen kopieert) wordt per bericht
+        alleen bepaald welke rij van de rollen erbij hoort. Zonder
+        geldigheidsperiodes gebeurt dat per auteur-categorie, met periodes via
+        een as-of join op timestamp per auteur. De rolkolommen worden daarna
+        als categoricals toegevoegd aan een ondiepe kopie van de DataFrame.
+        Auteurs met berichten zonder rol staan in unmatched_authors.
         """
         logger.info("Samenvoegen van dataframes op basis van auteur")
         try:
-            merged_df = pd.merge(
-                self.altered_dataframe,
-                self.player_roles,
-                left_on="author",
-                right_on="Author",
+            roles = self.player_roles
+            versioned = any(column in roles for column in VALIDITY_COLUMNS)
+            duplicated = roles["Author"].duplicated()
+            if not versioned and duplicated.any():
+                logger.warning(
+                    f"Dubbele auteurs in rollenbestand, eerste rol gebruikt: "
+                    f"{roles.loc[duplicated, 'Author'].tolist()}"
+                )
+                roles = roles[~duplicated]
+            roles = roles.reset_index(drop=True)
+
+            authors = self.altered_dataframe["author"]
+            if not isinstance(authors.dtype, pd.CategoricalDtype):
+                authors = authors.astype("category")
+            categories = authors.cat.categories
+            author_codes = authors.cat.codes.to_numpy()
+
+            if versioned:
+                row_roles = self._asof_role_rows(roles, categories, author_codes)
+            else:
+                # Per auteur-categorie de rij in de rollen, -1 zonder rol.
+                # Ontbrekende auteurs (code -1) wijzen naar de -1 achteraan.
+                role_rows = pd.Index(roles["Author"]).get_indexer(categories)
+                row_roles = np.append(role_rows, -1)[author_codes]
+            matched = row_roles >= 0
+
+            merged_df = self.altered_dataframe.copy(deep=False)
+            role_columns = roles.columns.drop(
+                ["Author", *VALIDITY_COLUMNS], errors="ignore"
             )
-            logger.debug(f"Samengevoegd resultaat heeft vorm: {merged_df.shape}")
+            for column in role_columns:
+                role_values = roles[column].astype("category")
+                value_codes = np.append(role_values.cat.codes.to_numpy(), -1)
+                merged_df[column] = pd.Categorical.from_codes(
+                    value_codes[row_roles], dtype=role_values.dtype
+                )
+
+            self.unmatched_authors = self._unmatched_report(
+                categories, author_codes, matched
+            )
+            if len(self.unmatched_authors):
+                logger.warning(
+                    f"{len(self.unmatched_authors)} auteurs met berichten zonder rol "
+                    f"({self.unmatched_authors['messages'].sum()} berichten): "
+                    f"{self.unmatched_authors['author'].tolist()}"
+                )
+
+            if self.drop_unmatched and not matched.all():
+                merged_df = merged_df[matched]
+            merged_df = merged_df.reset_index(drop=True)
+            logger.debug("Samengevoegd resultaat heeft vorm: %s", merged_df.shape)
 
             # Rapporteer hoeveel rijen behouden zijn
             pct_behouden = (merged_df.shape[0] / self.altered_dataframe.shape[0]) * 100
@@ -68,6 +144,99 @@ class Merger(DataProcessor):
             logger.error(f"Fout bij het samenvoegen van dataframes: {str(e)}")
             raise
 
+    def _asof_role_rows(
+        self, roles: pd.DataFrame, categories: pd.Index, author_codes: np.ndarray
+    ) -> np.ndarray:
+        """
+        Bepaal per bericht de rij van de rol die geldig was op de timestamp.
+
+        Er wordt een smalle tabel (timestamp, auteursleutel, rijnummer) gemaakt
+        en met merge_asof per auteur gekoppeld aan de laatste rol die op of
+        vóór de timestamp begon. Daarna vervalt de koppeling als het bericht
+        op of na valid_to van die rol valt.
+
+        Args:
+            roles: Rollen met valid_from en/of valid_to
+            categories: Auteur-categorieën van de berichten
+            author_codes: Categoriecode van de auteur per bericht
+
+        Returns:
+            np.ndarray: Rij in roles per bericht, -1 zonder geldige rol
+        """
+        # Dezelfde integer-sleutel per auteur aan beide kanten van de join
+        role_authors = pd.Index(roles["Author"].unique())
+        author_keys = np.append(role_authors.get_indexer(categories), -1)[author_codes]
+
+        valid_from = (
+            roles["valid_from"].fillna(pd.Timestamp.min)
+            if "valid_from" in roles
+            else pd.Series(pd.Timestamp.min, index=roles.index)
+        ).astype("datetime64[ns]")
+        valid_to = (
+            roles["valid_to"].fillna(pd.Timestamp.max)
+            if "valid_to" in roles
+            else pd.Series(pd.Timestamp.max, index=roles.index)
+        ).astype("datetime64[ns]")
+
+        right = pd.DataFrame(
+            {
+                "valid_from": valid_from.to_numpy(),
+                "key": role_authors.get_indexer(roles["Author"]),
+                "role_row": np.arange(len(roles)),
+            }
+        ).sort_values("valid_from", kind="stable")
+
+        timestamps = self.altered_dataframe["timestamp"].to_numpy(
+            dtype="datetime64[ns]"
+        )
+        candidates = np.flatnonzero((author_keys >= 0) & ~np.isnat(timestamps))
+        left = pd.DataFrame(
+            {
+                "timestamp": timestamps[candidates],
+                "key": author_keys[candidates],
+                "row": candidates,
+            }
+        ).sort_values("timestamp", kind="stable")
+
+        joined = pd.merge_asof(
+            left,
+            right,
+            left_on="timestamp",
+            right_on="valid_from",
+            by="key",
+            direction="backward",
+        )
+        role_row = joined["role_row"].fillna(-1).to_numpy(dtype=np.int64)
+        found = role_row >= 0
+        expired = np.zeros(len(joined), dtype=bool)
+        expired[found] = (
+            joined["timestamp"].to_numpy()[found]
+            >= valid_to.to_numpy()[role_row[found]]
+        )
+        role_row[expired] = -1
+
+        row_roles = np.full(len(author_codes), -1, dtype=np.int64)
+        row_roles[joined["row"].to_numpy()] = role_row
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "As-of join: %s van %s berichten hebben een geldige rol",
+                int((row_roles >= 0).sum()),
+                len(row_roles),
+            )
+        return row_roles
+
+    def _unmatched_report(
+        self, categories: pd.Index, author_codes: np.ndarray, matched: np.ndarray
+    ) -> pd.DataFrame:
+        """Auteurs met berichten zonder rol en hun aantal, meeste berichten eerst."""
+        missing_codes = author_codes[~matched & (author_codes >= 0)]
+        counts = np.bincount(missing_codes, minlength=len(categories))
+        missing = counts > 0
+        report = pd.DataFrame(
+            {"author": categories[missing], "messages": counts[missing]}
+        )
+        return report.sort_values("messages", ascending=False, ignore_index=True)
+
     def get_processed_data(self) -> pd.DataFrame:
         """
         Haal het verwerkte DataFrame op.
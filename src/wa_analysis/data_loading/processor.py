@@ -1,27 +1,127 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from wa_analysis.data_loading.classifier import MessageClassifier
 from wa_analysis.data_loading.config import ConfigLoader
 from wa_analysis.data_loading.dataloader import BaseDataLoader
+from wa_analysis.data_loading.schema import compact_dtypes, memory_report
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 
 # Setup logger als deze niet al is geïmporteerd via BaseDataLoader
 logger = Logger().get_logger()
 
+# Versie van de verrijking in add_columns. Verhoog deze bij elke wijziging van
+# de toegevoegde kolommen, zodat de cache op schijf automatisch ongeldig wordt.
+ENRICHMENT_VERSION = 3
+
+# Welke kolommen add_columns afleidt uit welke bronkolom. Wordt gebruikt om bij
+# een kolomprojectie ook de bijbehorende verrijkte kolommen op te halen. De
+# kolommen per berichttype komen daar nog bij, zie enriched_columns.
+DERIVED_COLUMNS: Dict[str, List[str]] = {
+    "timestamp": [
+        "day_of_month",
+        "day",
+        "month_number",
+        "month_name",
+        "year",
+        "prev_timestamp",
+        "time_since_prev",
+    ],
+    "message": ["message_length"],
+    "author": ["prev_author"],
+}
+
+
+def enriched_columns(
+    columns: Sequence[str], config: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """
+    Geef de bronkolommen plus de kolommen die add_columns daaruit afleidt.
+
+    Args:
+        columns: Bronkolommen
+        config: Configuratie met de registry van berichttypen
+
+    Returns:
+        List[str]: Bron- en afgeleide kolommen
+    """
+    result = list(columns)
+    for column in columns:
+        if column == "message":
+            result.extend(MessageClassifier.from_config(config or {}).names)
+        result.extend(DERIVED_COLUMNS.get(column, []))
+    return result
+
 
 class DataProcessor(BaseDataLoader):
-    def __init__(self, config, datafile=None):
+    def __init__(
+        self,
+        config,
+        datafile=None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        authors: Optional[Sequence[str]] = None,
+        chats: Optional[Sequence[str]] = None,
+    ):
         logger.info(f"Initialiseren DataProcessor voor bestand: {datafile}")
         # Roep de init van de superklasse aan om de data in te laden
-        super().__init__(config, datafile)
+        super().__init__(
+            config,
+            datafile,
+            columns=columns,
+            start=start,
+            end=end,
+            authors=authors,
+            chats=chats,
+        )
 
-        if self.df is not None:
+        if self.df is not None and self.memory_mapped:
+            # add_columns voegt alleen hele kolommen toe of vervangt ze; een
+            # ondiepe kopie laat self.df dus intact, terwijl een diepe kopie de
+            # gedeelde mmap-pagina's naar privégeheugen zou kopiëren
+            logger.info(f"Ondiepe kopie van memory-mapped DataFrame: {self.df.shape}")
+            self.altered_dataframe = self.df.copy(deep=False)
+        elif self.df is not None:
             logger.info(f"Kopie maken van DataFrame met vorm: {self.df.shape}")
             self.altered_dataframe = self.df.copy()
         else:
             logger.warning("Geen DataFrame beschikbaar om te verwerken")
             self.altered_dataframe = None
 
+        # Compacte dtypes (categoricals, kleine integers, pyarrow-strings)
+        self.compact_schema: bool = config.get("processing", {}).get(
+            "compact_schema", False
+        )
+        self.memory_report: Optional[pd.DataFrame] = None
+
+        # Registry van berichttypen uit [message_types]
+        self.classifier = MessageClassifier.from_config(config)
+
+    def _shift_previous(self, column: str) -> pd.Series:
+        """
+        Geef per rij de waarde van het vorige bericht.
+
+        Bij data uit de DatasetStore met meerdere chats wordt per chat
+        verschoven, zodat het eerste bericht van een chat geen voorganger krijgt.
+        """
+        if "chat" in self.altered_dataframe:
+            return self.altered_dataframe.groupby("chat", observed=True, sort=False)[
+                column
+            ].shift(1)
+        return self.altered_dataframe[column].shift(1)
+
+    @profiled("add_columns")
     def add_columns(self):
         """
         Voeg extra kolommen toe aan de samengevoegde DataFrame.
+
+        Alleen kolommen waarvan de bronkolom is ingelezen worden toegevoegd
+        (zie DERIVED_COLUMNS), zodat dit ook werkt na een kolomprojectie.
+        Bij een rijfilter zijn prev_author en time_since_prev relatief aan de
+        gefilterde rijen.
         """
         logger.info("Toevoegen van extra kolommen aan DataFrame")
 
@@ -31,64 +131,76 @@ class DataProcessor(BaseDataLoader):
                     "Geen DataFrame beschikbaar om kolommen aan toe te voegen"
                 )
 
-            # Datum/tijd kolommen
-            logger.debug("Toevoegen datum/tijd kolommen")
-            self.altered_dataframe["day_of_month"] = self.altered_dataframe[
-                "timestamp"
-            ].dt.day
-            self.altered_dataframe["day"] = self.altered_dataframe[
-                "timestamp"
-            ].dt.day_name()
-            self.altered_dataframe["month_number"] = self.altered_dataframe[
-                "timestamp"
-            ].dt.month
-            self.altered_dataframe["month_name"] = self.altered_dataframe[
-                "timestamp"
-            ].dt.month_name()
-            self.altered_dataframe["year"] = self.altered_dataframe["timestamp"].dt.year
-
-            # Media en bericht kolommen
-            logger.debug("Toevoegen van media en berichtkolommen")
-            self.altered_dataframe["has_image"] = (
-                self.altered_dataframe["message"]
-                .fillna("")
-                .str.contains("<Media weggelaten>")
-                .astype(int)
-            )
-            self.altered_dataframe["has_tikkie"] = (
-                self.altered_dataframe["message"]
-                .fillna("")
-                .str.contains("<https://tikkie.me")
-                .astype(int)
-            )
-            self.altered_dataframe["message_length"] = self.altered_dataframe[
-                "message"
-            ].str.len()
+            if "timestamp" in self.altered_dataframe:
+                # Datum/tijd kolommen
+                logger.debug("Toevoegen datum/tijd kolommen")
+                self.altered_dataframe["day_of_month"] = self.altered_dataframe[
+                    "timestamp"
+                ].dt.day
+                self.altered_dataframe["day"] = self.altered_dataframe[
+                    "timestamp"
+                ].dt.day_name()
+                self.altered_dataframe["month_number"] = self.altered_dataframe[
+                    "timestamp"
+                ].dt.month
+                self.altered_dataframe["month_name"] = self.altered_dataframe[
+                    "timestamp"
+                ].dt.month_name()
+                self.altered_dataframe["year"] = self.altered_dataframe[
+                    "timestamp"
+                ].dt.year
+
+            if "message" in self.altered_dataframe:
+                # Berichttypen uit [message_types], per type over de unieke berichten
+                logger.debug("Toevoegen van berichttype- en berichtkolommen")
+                flags = self.classifier.classify(self.altered_dataframe["message"])
+                for name in flags.columns:
+                    self.altered_dataframe[name] = flags[name]
+                self.altered_dataframe["message_length"] = self.altered_dataframe[
+                    "message"
+                ].str.len()
 
             # Kolommen voor interactie-analyse
             logger.debug("Toevoegen van interactie-analysekolommen")
-            self.altered_dataframe["prev_author"] = self.altered_dataframe[
-                "author"
-            ].shift(1)
-            self.altered_dataframe["prev_timestamp"] = self.altered_dataframe[
-                "timestamp"
-            ].shift(1)
-            self.altered_dataframe["time_since_prev"] = (
-                self.altered_dataframe["timestamp"]
-                - self.altered_dataframe["prev_timestamp"]
-            ).dt.total_seconds() / 60
-
-            # Samenvattende statistieken loggen
-            img_count = self.altered_dataframe["has_image"].sum()
-            tikkie_count = self.altered_dataframe["has_tikkie"].sum()
-            avg_msg_len = self.altered_dataframe["message_length"].mean()
+            if "author" in self.altered_dataframe:
+                self.altered_dataframe["prev_author"] = self._shift_previous("author")
+            if "timestamp" in self.altered_dataframe:
+                self.altered_dataframe["prev_timestamp"] = self._shift_previous(
+                    "timestamp"
+                )
+                self.altered_dataframe["time_since_prev"] = (
+                    self.altered_dataframe["timestamp"]
+                    - self.altered_dataframe["prev_timestamp"]
+                ).dt.total_seconds() / 60
 
             logger.info(
                 f"Kolommen toegevoegd: {len(self.altered_dataframe.columns)} kolommen totaal"
             )
-            logger.info(
-                f"Statistieken: {img_count} afbeeldingen, {tikkie_count} tikkies, gemiddelde berichtlengte: {avg_msg_len:.1f}"
-            )
+
+            # Samenvattende statistieken loggen
+            if "message" in self.altered_dataframe:
+                type_counts = ", ".join(
+                    f"{name}: {self.altered_dataframe[name].sum()}"
+                    for name in self.classifier.names
+                )
+                avg_msg_len = self.altered_dataframe["message_length"].mean()
+
+                logger.info(
+                    f"Statistieken: {type_counts}, gemiddelde berichtlengte: {avg_msg_len:.1f}"
+                )
+
+            if self.compact_schema:
+                compacted = compact_dtypes(
+                    self.altered_dataframe, flag_columns=self.classifier.names
+                )
+                self.memory_report = memory_report(self.altered_dataframe, compacted)
+                self.altered_dataframe = compacted
+                total = self.memory_report.loc["total"]
+                logger.info(
+                    f"Compacte dtypes: {total['bytes_before'] / 1e6:.1f} MB -> "
+                    f"{total['bytes_after'] / 1e6:.1f} MB ({total['pct_saved']}% bespaard)"
+                )
+                logger.debug("Geheugen per kolom:\n%s", self.memory_report)
 
             return self.altered_dataframe
 
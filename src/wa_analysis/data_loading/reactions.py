@@ -1,19 +1,42 @@
-from typing import List, Tuple
+import logging
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from wa_analysis.data_analysis.attribution import reply_candidates
+from wa_analysis.data_analysis.histogram import Histogram, merge_histograms
 from wa_analysis.data_loading.processor import DataProcessor
+from wa_analysis.settings.app_config import get_app_config
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 
 # Setup logger
 logger = Logger().get_logger()
 
 
+def reaction_histogram() -> Histogram:
+    """
+    Maak een leeg reactietijd-histogram met de grenzen uit [reactions].
+
+    Returns:
+        Histogram: Leeg histogram, logaritmisch als log_edges is ingesteld
+    """
+    settings = get_app_config().reactions
+    if settings.log_edges is not None:
+        return Histogram.log_spaced(*settings.log_edges)
+    return Histogram(settings.edges)
+
+
 class ReactionsAdder(DataProcessor):
     def __init__(self, config: dict, df: pd.DataFrame) -> None:
         logger.info("Initialiseren ReactionsAdder")
         self.df: pd.DataFrame = df
-        logger.debug(f"DataFrame geladen met vorm: {df.shape}")
+        self.histogram: Histogram = reaction_histogram()
+        # Met [attribution] mode = "window" alle kandidaten per reactie
+        self.attribution: str = get_app_config().attribution.mode
+        self.candidates: Optional[pd.DataFrame] = None
+        logger.debug("DataFrame geladen met vorm: %s", df.shape)
 
     def create_reaction_dataframe(self) -> pd.DataFrame:
         """
@@ -23,6 +46,8 @@ class ReactionsAdder(DataProcessor):
             pd.DataFrame: Gefilterd DataFrame met alleen reacties
         """
         logger.info("Filteren van berichten die geen antwoord zijn")
+        if self.attribution == "window":
+            return self.create_window_reaction_dataframe()
         try:
             original_shape = self.df.shape
 
@@ -30,14 +55,18 @@ class ReactionsAdder(DataProcessor):
             self.df = self.df[self.df["prev_author"].notna()]
             na_filtered_shape = self.df.shape
             logger.debug(
-                f"Na filteren op notna: {na_filtered_shape[0]} rijen (verwijderd: {original_shape[0] - na_filtered_shape[0]})"
+                "Na filteren op notna: %s rijen (verwijderd: %s)",
+                na_filtered_shape[0],
+                original_shape[0] - na_filtered_shape[0],
             )
 
             # Filter berichten waar dezelfde persoon reageert op zichzelf
             self.df = self.df[self.df["author"] != self.df["prev_author"]].copy()
             self_filtered_shape = self.df.shape
             logger.debug(
-                f"Na filteren op zelf-reacties: {self_filtered_shape[0]} rijen (verwijderd: {na_filtered_shape[0] - self_filtered_shape[0]})"
+                "Na filteren op zelf-reacties: %s rijen (verwijderd: %s)",
+                self_filtered_shape[0],
+                na_filtered_shape[0] - self_filtered_shape[0],
             )
 
             # Log percentage behouden berichten
@@ -52,27 +81,83 @@ class ReactionsAdder(DataProcessor):
             logger.error(f"Fout bij het maken van reactie-dataframe: {str(e)}")
             raise
 
+    def create_window_reaction_dataframe(self) -> pd.DataFrame:
+        """
+        Houdt berichten over waarvoor een andere auteur binnen het venster schreef
+
+        Alle kandidaten per reactie komen in self.candidates (zie
+        reply_candidates), met source_position als de data rollen heeft.
+        prev_author, prev_timestamp en time_since_prev verwijzen daarna naar de meest recente andere auteur in het venster,
+        zodat de buckets de tijd tot die auteur meten.
+
+        Returns:
+            pd.DataFrame: Gefilterd DataFrame met alleen reacties
+        """
+        try:
+            original_rows = len(self.df)
+            self.candidates = reply_candidates(self.df)
+            if "Position" in self.df:
+                # De rol die de kandidaat had op het moment van zijn bericht
+                self.candidates["source_position"] = (
+                    self.df["Position"].loc[self.candidates["source"]].array
+                )
+
+            # Per reactie staat de meest recente kandidaat bovenaan
+            nearest = self.candidates[~self.candidates["reply"].duplicated()]
+            timestamps = self.df["timestamp"]
+            self.df = self.df[self.df.index.isin(nearest["reply"])].copy()
+            nearest = nearest.set_index("reply").reindex(self.df.index)
+
+            self.df["prev_author"] = nearest["candidate"]
+            if "prev_timestamp" in self.df:
+                self.df["prev_timestamp"] = timestamps.loc[nearest["source"]].to_numpy()
+            self.df["time_since_prev"] = nearest["minutes"].astype(
+                self.df["time_since_prev"].dtype
+            )
+
+            pct_behouden = (len(self.df) / original_rows) * 100
+            logger.info(
+                f"Reactiefiltering met venster voltooid, {pct_behouden:.1f}% van de "
+                f"berichten behouden, {len(self.candidates)} kandidaten"
+            )
+            return self.df
+
+        except Exception as e:
+            logger.error(f"Fout bij het maken van reactie-dataframe: {str(e)}")
+            raise
+
     def add_buckets(self) -> pd.DataFrame:
         """
         Voegt reactietijd buckets toe aan de dataframe
 
+        De grenzen komen uit [reactions] en hangen niet af van de data, zodat
+        het histogram van dit deel bij dat van andere delen is op te tellen.
+
         Returns:
             pd.DataFrame: DataFrame met toegevoegde reactietijd buckets
         """
         logger.info("Toevoegen van reactietijd buckets")
         try:
-            max_time = self.df["time_since_prev"].max()
-            buckets: List[float] = [0, 1, 5, 15, 30, 60, 120, 240, max_time]
-            logger.debug(f"Buckets: {buckets}")
+            edges: List[float] = self.histogram.edges.tolist()
+            logger.debug("Buckets: %s", edges)
 
-            self.df["reactietijd_bucket"] = pd.cut(self.df["time_since_prev"], buckets)
+            times = self.df["time_since_prev"].to_numpy(
+                dtype="float64", na_value=np.nan
+            )
+            self.histogram = reaction_histogram().add(times)
+            self.df["reactietijd_bucket"] = pd.Categorical.from_codes(
+                self.histogram.bin_codes(times),
+                categories=self.histogram.intervals,
+                ordered=True,
+            )
 
-            # Log aantal berichten per bucket
-            bucket_counts = self.df["reactietijd_bucket"].value_counts().sort_index()
-            logger.debug(f"Berichten per bucket: {bucket_counts}")
+            # Log aantal berichten per bucket (alleen als DEBUG aan staat)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Berichten per bucket: %s", self.histogram.to_series())
 
             logger.info(
-                f"Reactietijd buckets toegevoegd (max tijd: {max_time:.1f} min)"
+                f"Reactietijd buckets toegevoegd ({self.histogram.total} reacties, "
+                f"{self.histogram.underflow + self.histogram.overflow} buiten de grenzen)"
             )
             return self.df
 
@@ -80,26 +165,35 @@ class ReactionsAdder(DataProcessor):
             logger.error(f"Fout bij het toevoegen van buckets: {str(e)}")
             raise
 
-    def calculate_percentages(self) -> Tuple[pd.Series, pd.Series, pd.Series, int]:
+    def calculate_percentages(
+        self, histograms: Optional[Sequence[Histogram]] = None
+    ) -> Tuple[pd.Series, pd.Series, pd.Series, int]:
         """
         Bereken percentage van totaal en cumulatief percentage
 
+        Args:
+            histograms: Histogrammen om op te tellen, bijvoorbeeld per chunk
+                of per chat (standaard het histogram uit add_buckets)
+
         Returns:
             Tuple[pd.Series, pd.Series, pd.Series, int]: Tuple van (reactie_counts, percentage_counts,
                                                           cumulative_percentage, total_count)
         """
         logger.info("Berekenen van percentages en cumulatieve percentages")
         try:
-            reactie_counts = self.df["reactietijd_bucket"].value_counts().sort_index()
-            total_count = reactie_counts.sum()
-            logger.debug(f"Totaal aantal reacties: {total_count}")
+            histogram = (
+                self.histogram if histograms is None else merge_histograms(histograms)
+            )
+            reactie_counts = histogram.to_series()
+            total_count = histogram.total
+            logger.debug("Totaal aantal reacties: %s", total_count)
 
             percentage_counts = reactie_counts / total_count
-            logger.debug(f"Percentage per bucket: {percentage_counts}")
+            logger.debug("Percentage per bucket: %s", percentage_counts)
 
             # Bereken de werkelijke cumulatieve som
             cumulative_percentage = percentage_counts.cumsum()
-            logger.debug(f"Cumulatief percentage: {cumulative_percentage}")
+            logger.debug("Cumulatief percentage: %s", cumulative_percentage)
 
             logger.info(f"Percentages berekend voor {total_count} reacties")
             return reactie_counts, percentage_counts, cumulative_percentage, total_count
@@ -108,6 +202,7 @@ class ReactionsAdder(DataProcessor):
             logger.error(f"Fout bij het berekenen van percentages: {str(e)}")
             raise
 
+    @profiled("process_data")
     def process_data(self) -> Tuple[pd.DataFrame, pd.Series, pd.Series, pd.Series, int]:
         """
         Voert alle bewerkingen uit en geeft de dataframe terug
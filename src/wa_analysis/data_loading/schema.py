@@ -0,0 +1,132 @@
+### This module converts the enriched message frame to a compact dtype layout ###
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+WEEKDAYS: List[str] = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+MONTHS: List[str] = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+# Compacte dtypes per kolom. Kolommen die niet in de DataFrame staan worden
+# overgeslagen, zodat dit ook werkt na een kolomprojectie of na de Merger.
+COMPACT_DTYPES: Dict[str, object] = {
+    "message": pd.StringDtype("pyarrow"),
+    "day_of_month": np.int8,
+    "month_number": np.int8,
+    "year": np.int16,
+    "day": pd.CategoricalDtype(WEEKDAYS, ordered=True),
+    "month_name": pd.CategoricalDtype(MONTHS, ordered=True),
+    "has_image": bool,
+    "has_tikkie": bool,
+    "message_length": pd.Int32Dtype(),
+    "time_since_prev": np.float32,
+    "Position": "category",
+    "Function": "category",
+}
+
+# Kolommen met auteursnamen delen één set categorieën, zodat ze onderling
+# vergelijkbaar blijven (bijvoorbeeld author != prev_author)
+AUTHOR_COLUMNS: List[str] = ["author", "prev_author"]
+
+
+def compact_dtypes(
+    df: pd.DataFrame, flag_columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Zet de kolommen van de (verrijkte) berichten-DataFrame om naar compacte dtypes.
+
+    Args:
+        df: DataFrame uit DataProcessor.add_columns of de Merger
+        flag_columns: Extra 0/1-kolommen die bool worden (zoals de berichttypen)
+
+    Returns:
+        pd.DataFrame: DataFrame met dezelfde waarden in compactere dtypes
+    """
+    logger.info("Omzetten naar compacte dtypes")
+    try:
+        result = df.copy(deep=False)
+
+        present = [column for column in AUTHOR_COLUMNS if column in result]
+        if present:
+            names = np.unique(
+                np.concatenate(
+                    [
+                        np.asarray(result[column].dropna().unique(), dtype=str)
+                        for column in present
+                    ]
+                )
+            )
+            author_dtype = pd.CategoricalDtype(names)
+            for column in present:
+                result[column] = result[column].astype(author_dtype)
+
+        for column, dtype in COMPACT_DTYPES.items():
+            if column in result:
+                result[column] = result[column].astype(dtype)
+
+        for column in flag_columns or []:
+            if column in result:
+                result[column] = result[column].astype(bool)
+
+        return result
+
+    except Exception as e:
+        logger.error(f"Fout bij het omzetten naar compacte dtypes: {str(e)}")
+        raise
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vergelijk het geheugengebruik per kolom voor en na compact_dtypes.
+
+    Args:
+        before: DataFrame met de oorspronkelijke dtypes
+        after: DataFrame met de compacte dtypes
+
+    Returns:
+        pd.DataFrame: Per kolom de dtypes, bytes voor en na en de besparing,
+            met een totaalregel
+    """
+    bytes_before = before.memory_usage(index=False, deep=True)
+    bytes_after = after.memory_usage(index=False, deep=True)
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.astype(str),
+            "dtype_after": after.dtypes.astype(str),
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+        }
+    )
+    report.loc["total"] = ["", "", bytes_before.sum(), bytes_after.sum()]
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["pct_saved"] = (
+        100 * report["bytes_saved"] / report["bytes_before"].replace(0, np.nan)
+    ).round(1)
+    return report
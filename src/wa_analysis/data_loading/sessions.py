@@ -0,0 +1,305 @@
+### Split the message stream into conversations (sessions) on an inactivity gap ###
+
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.app_config import get_app_config
+from wa_analysis.settings.logger import HOTPATH, Logger
+from wa_analysis.settings.profiler import profiled
+
+# Setup logger
+logger = Logger().get_logger()
+
+# Kolommen van de sessietabel, geïndexeerd op session_id
+SESSION_COLUMNS: List[str] = [
+    "chat",
+    "start",
+    "end",
+    "duration_minutes",
+    "messages",
+    "participants",
+]
+
+
+class Sessionizer:
+    """
+    Deelt berichten in gesprekken (sessies) in, chunk voor chunk.
+
+    Een nieuwe sessie begint bij het eerste bericht van een chat en na een
+    stilte van meer dan gap_minutes. Binnen een chunk gebeurt dat zonder
+    Python-lussen: een vlag per bericht, een cumsum over de vlaggen voor de
+    nummers en een forward fill voor de berichten daartussen. De laatste,
+    nog open sessie van elke chat gaat mee naar de volgende chunk, zodat een
+    gesprek over een chunkgrens heen één sessie blijft. Berichten moeten per
+    chat op tijd gesorteerd zijn, ook over de chunks heen.
+    """
+
+    def __init__(self, gap_minutes: Optional[float] = None) -> None:
+        """
+        Args:
+            gap_minutes: Stilte in minuten waarna een nieuwe sessie begint
+                (standaard [sessions] gap_minutes)
+        """
+        if gap_minutes is None:
+            gap_minutes = get_app_config().sessions.gap_minutes
+        self.gap = pd.to_timedelta(gap_minutes, unit="min")
+        self.next_id: int = 0
+        # Afgesloten sessies en per chat de open sessie met haar auteurs
+        self.closed: List[pd.DataFrame] = []
+        self.open: pd.DataFrame = pd.DataFrame(
+            {
+                "chat": pd.Series(dtype=object),
+                "start": pd.Series(dtype="datetime64[ns]"),
+                "end": pd.Series(dtype="datetime64[ns]"),
+                "messages": pd.Series(dtype="int64"),
+            },
+            index=pd.Index([], dtype="int64", name="session_id"),
+        )
+        self.open_authors: pd.DataFrame = pd.DataFrame(
+            {
+                "session_id": pd.Series(dtype="int64"),
+                "author": pd.Series(dtype=object),
+            }
+        )
+
+    def update(self, chunk: pd.DataFrame) -> pd.Series:
+        """
+        Ken de berichten van een chunk een session_id toe.
+
+        Args:
+            chunk: Berichten met timestamp en author, eventueel met chat
+
+        Returns:
+            pd.Series: session_id per bericht, op de index van de chunk
+        """
+        if chunk.empty:
+            return pd.Series(dtype="int64", index=chunk.index, name="session_id")
+
+        timestamps = chunk["timestamp"]
+        # Zonder chatkolom hoort alles bij één chat
+        chats = (
+            chunk["chat"].astype(object)
+            if "chat" in chunk
+            else pd.Series("", index=chunk.index, dtype=object)
+        )
+        first = ~chats.duplicated()
+        open_by_chat = pd.Series(self.open.index, index=self.open["chat"])
+        end_by_chat = pd.Series(self.open["end"].to_numpy(), index=self.open["chat"])
+
+        # Het vorige bericht van dezelfde chat; voor het eerste bericht van een
+        # chat in deze chunk is dat het einde van de open sessie
+        if "chat" in chunk:
+            previous = timestamps.groupby(chats, sort=False).shift(1)
+        else:
+            previous = timestamps.shift(1)
+        previous[first] = chats[first].map(end_by_chat)
+        new_session = (previous.isna() | (timestamps - previous > self.gap)).to_numpy()
+
+        # Nieuwe sessies krijgen oplopende nummers, de andere berichten het
+        # nummer van de sessie ervoor in dezelfde chat
+        starts = int(new_session.sum())
+        ids = np.full(len(chunk), np.nan)
+        ids[new_session] = np.arange(self.next_id, self.next_id + starts)
+        self.next_id += starts
+        session_ids = pd.Series(ids, index=chunk.index)
+        if "chat" in chunk:
+            session_ids = session_ids.groupby(chats, sort=False).ffill()
+        else:
+            session_ids = session_ids.ffill()
+        carried = session_ids.isna()
+        if carried.any():
+            session_ids[carried] = chats[carried].map(open_by_chat)
+        session_ids = session_ids.astype("int64").rename("session_id")
+        logger.log(
+            HOTPATH,
+            "Chunk van %s berichten: %s nieuwe sessies, %s doorlopend",
+            len(chunk),
+            starts,
+            int(carried.sum()),
+        )
+
+        self._aggregate(
+            pd.DataFrame(
+                {
+                    "session_id": session_ids.to_numpy(),
+                    "chat": chats.to_numpy(),
+                    "timestamp": timestamps.to_numpy(),
+                    "author": chunk["author"].astype(object).to_numpy(),
+                }
+            )
+        )
+        return session_ids
+
+    def _aggregate(self, frame: pd.DataFrame) -> None:
+        """Voeg de berichten van een chunk toe aan de sessies en sluit af wat klaar is."""
+        sessions = frame.groupby("session_id").agg(
+            chat=("chat", "first"),
+            start=("timestamp", "min"),
+            end=("timestamp", "max"),
+            messages=("timestamp", "size"),
+        )
+        authors = frame[["session_id", "author"]].drop_duplicates()
+        if not self.open.empty:
+            # Open sessies uit eerdere chunks lopen mogelijk door in deze chunk
+            sessions = (
+                pd.concat([self.open, sessions])
+                .groupby(level=0)
+                .agg(
+                    chat=("chat", "first"),
+                    start=("start", "min"),
+                    end=("end", "max"),
+                    messages=("messages", "sum"),
+                )
+            )
+            authors = pd.concat([self.open_authors, authors]).drop_duplicates()
+
+        # Per chat blijft alleen de laatste sessie open
+        is_open = ~sessions["chat"].duplicated(keep="last")
+        closed = sessions[~is_open.to_numpy()]
+        open_authors = authors["session_id"].isin(sessions.index[is_open.to_numpy()])
+        if not closed.empty:
+            self.closed.append(self._finish(closed, authors[~open_authors]))
+        self.open = sessions[is_open.to_numpy()]
+        self.open_authors = authors[open_authors]
+
+    @staticmethod
+    def _finish(sessions: pd.DataFrame, authors: pd.DataFrame) -> pd.DataFrame:
+        """Voeg duur en aantal deelnemers toe aan sessies."""
+        sessions = sessions.copy()
+        sessions["duration_minutes"] = (
+            sessions["end"] - sessions["start"]
+        ).dt.total_seconds() / 60
+        sessions["participants"] = (
+            authors.groupby("session_id")
+            .size()
+            .reindex(sessions.index, fill_value=0)
+            .astype("int64")
+        )
+        return sessions[SESSION_COLUMNS]
+
+    def sessions(self) -> pd.DataFrame:
+        """
+        Alle sessies tot nu toe, inclusief de open sessie per chat.
+
+        Returns:
+            pd.DataFrame: Per session_id de chat, start, einde, duur in
+                minuten, het aantal berichten en het aantal deelnemers
+        """
+        parts = [*self.closed, self._finish(self.open, self.open_authors)]
+        return pd.concat(parts).sort_index()
+
+
+@profiled("sessionize")
+def sessionize(
+    df: pd.DataFrame,
+    gap_minutes: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Voeg session_id toe aan een DataFrame en maak de sessietabel.
+
+    Met chunk_size wordt de DataFrame in delen verwerkt; de uitkomst is
+    dezelfde als in één keer.
+
+    Args:
+        df: Berichten met timestamp en author, eventueel met chat
+        gap_minutes: Stilte in minuten (standaard [sessions] gap_minutes)
+        chunk_size: Aantal berichten per chunk (standaard alles in één keer)
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: De berichten met session_id en de
+            sessietabel (zie Sessionizer.sessions)
+    """
+    logger.info(f"Sessies bepalen voor {len(df)} berichten")
+    try:
+        sessionizer = Sessionizer(gap_minutes)
+        step = chunk_size or max(len(df), 1)
+        session_ids = [
+            sessionizer.update(df.iloc[position : position + step])
+            for position in range(0, len(df), step)
+        ]
+        df = df.assign(
+            session_id=(
+                pd.concat(session_ids)
+                if session_ids
+                else pd.Series(dtype="int64", index=df.index)
+            )
+        )
+        sessions = sessionizer.sessions()
+        if "chat" not in df:
+            sessions = sessions.drop(columns="chat")
+        logger.info(
+            f"{len(sessions)} sessies, gemiddeld "
+            f"{sessions['messages'].mean():.1f} berichten per sessie"
+        )
+        return df, sessions
+
+    except Exception as e:
+        logger.error(f"Fout bij het bepalen van de sessies: {str(e)}")
+        raise
+
+
+def sessionize_file(
+    datafile: Union[str, Path],
+    gap_minutes: Optional[float] = None,
+    batch_size: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Maak de sessietabel van een parquetbestand, batch voor batch.
+
+    Alleen timestamp, author en (als die er is) chat worden gelezen, en nooit
+    meer dan één batch tegelijk.
+
+    Args:
+        datafile: Pad naar het parquetbestand
+        gap_minutes: Stilte in minuten (standaard [sessions] gap_minutes)
+        batch_size: Rijen per batch (standaard [parser] batch_size)
+
+    Returns:
+        pd.DataFrame: De sessietabel (zie Sessionizer.sessions)
+    """
+    logger.info(f"Sessies bepalen voor bestand: {datafile}")
+    try:
+        parquet_file = pq.ParquetFile(datafile)
+        columns = [
+            column
+            for column in ("timestamp", "author", "chat")
+            if column in parquet_file.schema_arrow.names
+        ]
+        sessionizer = Sessionizer(gap_minutes)
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_size or get_app_config().parser.batch_size,
+            columns=columns,
+        ):
+            sessionizer.update(batch.to_pandas())
+        sessions = sessionizer.sessions()
+        if "chat" not in columns:
+            sessions = sessions.drop(columns="chat")
+        logger.info(f"{len(sessions)} sessies gevonden")
+        return sessions
+
+    except Exception as e:
+        logger.error(f"Fout bij het bepalen van de sessies: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering sessions.py")
+
+    try:
+        config_loader = ConfigLoader()
+        logger.info("Configuratie geladen")
+
+        sessions = sessionize_file(config_loader.datafile_hockeyteam)
+        logger.info(
+            f"Samenvatting van {len(sessions)} sessies:\n{sessions.describe().T.to_string()}"
+        )
+        logger.info("Einde uitvoering sessions.py - Succesvol")
+
+    except Exception as e:
+        logger.error(f"Fout bij uitvoeren van sessions.py: {str(e)}")
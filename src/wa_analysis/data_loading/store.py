@@ -0,0 +1,259 @@
+### This module keeps all chats in one hive-partitioned dataset store ###
+
+import json
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+CATALOG_NAME = "_catalog.json"
+PARTITION_SCHEMA = pa.schema(
+    [("chat", pa.string()), ("year", pa.int16()), ("month", pa.int8())]
+)
+
+
+class DatasetStore:
+    """
+    Eén logische tabel met de berichten van alle chats.
+
+    De store staat onder data/processed/<store.folder>/ en is hive-gepartitioneerd
+    als chat=<naam>/year=<jaar>/month=<maand>/. Bij het lezen worden alleen de
+    mappen van de gevraagde chats en maanden geopend. De catalogus
+    (_catalog.json) houdt per chat de bron, het aantal berichten en de periode bij.
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        logger.info("Initialiseren van DatasetStore")
+        store_config: Dict[str, Any] = config.get("store", {})
+        self.root = Path(config["processed"]).resolve() / store_config.get(
+            "folder", "store"
+        )
+        self.catalog_path = self.root / CATALOG_NAME
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+        logger.debug("Store map: %s", self.root)
+
+    def load_catalog(self) -> Dict[str, Any]:
+        """
+        Laad de catalogus van de store.
+
+        Returns:
+            Dict[str, Any]: Catalogus met per chat de metadata
+        """
+        if not self.catalog_path.exists():
+            return {"chats": {}}
+        with self.catalog_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_catalog(self, catalog: Dict[str, Any]) -> None:
+        """Schrijf de catalogus atomisch weg."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_path.with_name("." + CATALOG_NAME + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+        tmp_path.replace(self.catalog_path)
+
+    def chats(self) -> List[str]:
+        """Namen van alle chats in de store."""
+        return sorted(self.load_catalog()["chats"])
+
+    def add_chat(self, chat: str, source: Path) -> int:
+        """
+        Voeg een chat toe aan de store, of vervang de bestaande partities.
+
+        Args:
+            chat: Naam van de chat (wordt de waarde van de chat-partitie)
+            source: Parquet-bestand, dataset-map of Arrow IPC-bestand
+
+        Returns:
+            int: Aantal opgeslagen berichten
+        """
+        logger.info(f"Toevoegen van chat '{chat}' uit {source}")
+        try:
+            source = Path(source)
+            file_format = (
+                "ipc" if source.suffix in (".arrow", ".feather") else "parquet"
+            )
+            table = ds.dataset(source, format=file_format).to_table()
+
+            timestamps = table.column("timestamp")
+            table = (
+                table.append_column(
+                    "chat", pa.array([chat] * table.num_rows, type=pa.string())
+                )
+                .append_column("year", pc.year(timestamps).cast(pa.int16()))
+                .append_column("month", pc.month(timestamps).cast(pa.int8()))
+            )
+
+            # Oude partities van deze chat eerst weg, anders blijven maanden hangen
+            chat_dir = self.root / f"chat={chat}"
+            if chat_dir.exists():
+                shutil.rmtree(chat_dir)
+
+            ds.write_dataset(
+                table,
+                self.root,
+                format="parquet",
+                partitioning=self.partitioning,
+                basename_template="part-{i}.parq",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+
+            catalog = self.load_catalog()
+            catalog["chats"][chat] = {
+                "source": str(source),
+                "rows": table.num_rows,
+                "min": (
+                    str(pd.Timestamp(pc.min(timestamps).as_py()))
+                    if table.num_rows
+                    else None
+                ),
+                "max": (
+                    str(pd.Timestamp(pc.max(timestamps).as_py()))
+                    if table.num_rows
+                    else None
+                ),
+                "updated": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.save_catalog(catalog)
+            logger.info(f"Chat '{chat}' opgeslagen met {table.num_rows} berichten")
+            return table.num_rows
+
+        except Exception as e:
+            logger.error(f"Fout bij het toevoegen van chat aan de store: {str(e)}")
+            raise
+
+    def build_expression(
+        self,
+        chats: Optional[Sequence[str]] = None,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        authors: Optional[Sequence[str]] = None,
+    ) -> Optional[ds.Expression]:
+        """
+        Bouw het filter, inclusief voorwaarden op de partitiekolommen.
+
+        De voorwaarden op chat, year en month laten pyarrow hele mappen
+        overslaan; de voorwaarden op timestamp filteren daarbinnen op rijniveau.
+
+        Args:
+            chats: Alleen deze chats
+            start: Alleen berichten vanaf dit tijdstip (inclusief)
+            end: Alleen berichten tot dit tijdstip (exclusief)
+            authors: Alleen berichten van deze auteurs
+
+        Returns:
+            Optional[ds.Expression]: Filter, of None zonder filter
+        """
+        conditions: List[ds.Expression] = []
+        year, month = ds.field("year"), ds.field("month")
+        if chats is not None:
+            conditions.append(ds.field("chat").isin(list(chats)))
+        if start is not None:
+            conditions.append(
+                (year > start.year) | ((year == start.year) & (month >= start.month))
+            )
+            conditions.append(
+                ds.field("timestamp") >= pa.scalar(start, type=pa.timestamp("ns"))
+            )
+        if end is not None:
+            conditions.append(
+                (year < end.year) | ((year == end.year) & (month <= end.month))
+            )
+            conditions.append(
+                ds.field("timestamp") < pa.scalar(end, type=pa.timestamp("ns"))
+            )
+        if authors is not None:
+            conditions.append(ds.field("author").isin(list(authors)))
+
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
+
+    def read(
+        self,
+        chats: Optional[Sequence[str]] = None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        authors: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Lees (een deel van) de store als één DataFrame.
+
+        Args:
+            chats: Alleen deze chats (standaard alle)
+            columns: Alleen deze kolommen (standaard alle); 'chat' komt altijd mee
+            start: Alleen berichten vanaf dit tijdstip (inclusief)
+            end: Alleen berichten tot dit tijdstip (exclusief)
+            authors: Alleen berichten van deze auteurs
+
+        Returns:
+            pd.DataFrame: Berichten gesorteerd op chat en timestamp
+        """
+        logger.info(f"Lezen uit store: chats={chats}, periode={start} - {end}")
+        try:
+            dataset = ds.dataset(
+                self.root, format="parquet", partitioning=self.partitioning
+            )
+            if columns is None:
+                selected = [
+                    name
+                    for name in dataset.schema.names
+                    if name not in ("year", "month")
+                ]
+            else:
+                # chat blijft altijd mee: zonder chat lopen prev_author en
+                # time_since_prev van de ene chat door in de volgende
+                selected = list(columns) + (["chat"] if "chat" not in columns else [])
+            # Sorteren heeft timestamp nodig, ook buiten de projectie
+            read_columns = selected + [
+                name for name in ("chat", "timestamp") if name not in selected
+            ]
+
+            table = dataset.to_table(
+                columns=read_columns,
+                filter=self.build_expression(chats, start, end, authors),
+            )
+            # Partities worden niet in tijdsvolgorde gelezen (month=10 vóór month=8)
+            table = table.sort_by([("chat", "ascending"), ("timestamp", "ascending")])
+            df = table.select(selected).to_pandas()
+            logger.info(f"{len(df)} berichten gelezen uit de store")
+            return df
+
+        except Exception as e:
+            logger.error(f"Fout bij het lezen uit de store: {str(e)}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering store.py")
+    try:
+        config_loader = ConfigLoader()
+        store = DatasetStore(config_loader.config)
+        if len(sys.argv) == 3:
+            store.add_chat(sys.argv[1], Path(sys.argv[2]))
+        else:
+            # Zonder argumenten: de datasets uit config.toml, op naam van het bestand
+            for datafile in (
+                config_loader.datafile_hockeyteam,
+                config_loader.datafile_wife,
+            ):
+                store.add_chat(datafile.stem, datafile)
+        logger.info("Einde uitvoering store.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering store.py - Fout: {str(e)}")
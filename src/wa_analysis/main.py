@@ -1,18 +1,19 @@
 ### Code for running the project ###
 
 # Import packages
+import argparse
+import multiprocessing
+import os
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 # Import modules
+from wa_analysis.settings.app_config import get_app_config
 from wa_analysis.settings.logger import Logger
-from wa_analysis.visualisation.clustering import make_clustering
-from wa_analysis.visualisation.comparing_categories import \
-    make_comparing_categories
-from wa_analysis.visualisation.distribution import make_distribution
-from wa_analysis.visualisation.relationships import make_relationships
-from wa_analysis.visualisation.time_series import make_timeseries
+from wa_analysis.settings.profiler import Profiler
+from wa_analysis.visualisation import registry
 
 
 def setup_logging():
@@ -45,7 +46,8 @@ def run_visualization(name, func, logger):
 
     try:
         # Voer de visualisatiefunctie uit
-        func()
+        with Profiler().stage(f"visualisation:{name}"):
+            func()
 
         elapsed = datetime.now() - start_time
         logger.info(
@@ -62,48 +64,250 @@ def run_visualization(name, func, logger):
         return False
 
 
-def run_project():
+def lazy_visualization(name):
+    """
+    Geef een functie die de visualisatie pas bij aanroep importeert en maakt.
+
+    Args:
+        name: Naam van de visualisatie in de registry
+
+    Returns:
+        Functie zonder argumenten die de visualisatie maakt
+    """
+
+    def make():
+        registry.load(name)()
+
+    return make
+
+
+def init_worker(log_queue=None):
+    """
+    Initialiseer een workerproces: geen schermen, alleen bestanden.
+
+    Args:
+        log_queue: Queue van Logger().worker_queue(); de worker logt dan via
+            het hoofdproces in plaats van zelf naar het logbestand te schrijven
+    """
+    # Pas hier importeren: matplotlib laden kost tijd die main niet altijd nodig heeft
+    import matplotlib
+
+    from wa_analysis.data_loading.cache import enable_copy_on_write
+
+    matplotlib.use("Agg")
+    if log_queue is not None:
+        Logger.configure_worker(log_queue)
+    # Met spawn erft de worker de instelling van het hoofdproces niet
+    enable_copy_on_write()
+    # Metingen van het vooraf laden zijn al in het hoofdproces vastgelegd
+    Profiler().clear()
+
+
+def run_visualization_in_worker(name):
+    """
+    Maak één visualisatie in een workerproces.
+
+    Args:
+        name: Naam van de visualisatie in de registry
+
+    Returns:
+        Success status (True/False) en de metingen van de worker
+    """
+    success = run_visualization(name, lazy_visualization(name), setup_logging())
+    records = Profiler().export()
+    Profiler().clear()
+    return success, records
+
+
+def preload(names, logger):
+    """
+    Laad gedeelde datasets en de visualisatiemodules in het hoofdproces.
+
+    Workers die met fork worden gestart erven de verrijkte datasets uit de
+    DatasetCache en de geïmporteerde modules, zodat ze niet elk opnieuw laden.
+    Zonder fork (Windows, macOS) heeft dit geen zin en wordt het overgeslagen.
+
+    Args:
+        names: Namen van de visualisaties die worden gemaakt
+        logger: Logger voor log berichten
+    """
+    from wa_analysis.data_loading.cache import DatasetCache
+    from wa_analysis.data_loading.config import ConfigLoader
+
+    start_time = datetime.now()
+    config_loader = ConfigLoader()
+    for datafile in (config_loader.datafile_hockeyteam, config_loader.datafile_wife):
+        DatasetCache().get_enriched(config=config_loader.config, datafile=datafile)
+    for name in names:
+        registry.load(name)
+
+    elapsed = datetime.now() - start_time
+    logger.info(
+        f"Datasets en modules vooraf geladen in {elapsed.total_seconds():.2f} seconden"
+    )
+
+
+def run_parallel(names, workers, use_preload, logger):
+    """
+    Maak de visualisaties tegelijk, elk in een eigen workerproces.
+
+    Elke worker gebruikt de Agg-backend en roept run_visualization aan, zodat
+    een fout in één visualisatie de andere niet tegenhoudt.
+
+    Args:
+        names: Namen van de visualisaties
+        workers: Maximaal aantal workerprocessen
+        use_preload: Datasets eerst in het hoofdproces laden (alleen met fork)
+        logger: Logger voor log berichten
+
+    Returns:
+        Aantal succesvol gemaakte visualisaties
+    """
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    logger.info(
+        f"Parallel uitvoeren met {workers} workers ({context.get_start_method()})"
+    )
+
+    if use_preload and fork:
+        # De workers erven de backend van de modules die preload importeert
+        import matplotlib
+
+        matplotlib.use("Agg")
+        try:
+            preload(names, logger)
+        except Exception as e:
+            # De workers laden dan zelf; de fout komt daar opnieuw naar boven
+            logger.error(f"Fout bij het vooraf laden van de datasets: {e}")
+
+    success_count = 0
+    with (
+        Logger().worker_queue(context) as log_queue,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(log_queue,),
+        ) as executor,
+    ):
+        # De zwaarste visualisaties (t-SNE bij clustering) eerst starten
+        ordered = sorted(names, key=lambda name: -registry.VISUALIZATIONS[name].cost)
+        futures = {
+            executor.submit(run_visualization_in_worker, name): name for name in ordered
+        }
+        for future in as_completed(futures):
+            try:
+                success, records = future.result()
+                Profiler().add_records(records)
+                if success:
+                    success_count += 1
+            except Exception as e:
+                # Bijvoorbeeld een worker die is gecrasht
+                logger.error(f"Worker van visualisatie {futures[future]} mislukt: {e}")
+    return success_count
+
+
+def report_profile(logger, name):
+    """
+    Toon de metingen per stap en dataset en schrijf het JSON-rapport.
+
+    Args:
+        logger: Logger voor log berichten
+        name: Begin van de bestandsnaam van het rapport
+    """
+    profiler = Profiler()
+    try:
+        report = profiler.write_report(name)
+    except Exception as e:
+        logger.error(f"Fout bij het schrijven van het profielrapport: {str(e)}")
+        return
+    if report is not None:
+        logger.info(f"Metingen per stap en dataset:\n{profiler.format_table()}")
+        logger.info(f"Profielrapport opgeslagen in {report}")
+
+
+def run_project(names=None, workers=None):
     """
     Voer het volledige project uit.
+
+    Alleen de modules van de gekozen visualisaties worden geïmporteerd.
+
+    Args:
+        names: Namen van de visualisaties (standaard alle, zie registry.names())
+        workers: Aantal workerprocessen; 1 is sequentieel, 0 is aantal cores
+            (standaard [run] workers uit config.toml)
     """
+    from wa_analysis.data_loading.cache import enable_copy_on_write
+
     # Setup logging
     logger = setup_logging()
     logger.info("Start WhatsApp Analyse project")
+    start_time = datetime.now()
+    enable_copy_on_write()
 
-    # Maak een lijst van alle visualisaties
-    visualizations = [
-        ("comparing_categories", make_comparing_categories),
-        ("timeseries", make_timeseries),
-        ("distribution", make_distribution),
-        ("relationships", make_relationships),
-        ("clustering", make_clustering),
-    ]
+    # Maak een lijst van de gekozen visualisaties
+    names = [visualization.name for visualization in registry.select(names)]
+    run_config = get_app_config().run
+    if workers is None:
+        workers = run_config.workers
+    workers = min(workers or os.cpu_count() or 1, len(names))
 
-    # Houd bij welke visualisaties succesvol waren
-    success_count = 0
+    if workers > 1:
+        success_count = run_parallel(names, workers, run_config.preload, logger)
+    else:
+        # Houd bij welke visualisaties succesvol waren
+        success_count = 0
 
-    # Voer elke visualisatie uit met foutafhandeling
-    for name, func in visualizations:
-        if run_visualization(name, func, logger):
-            success_count += 1
+        # Voer elke visualisatie uit met foutafhandeling
+        for name in names:
+            if run_visualization(name, lazy_visualization(name), logger):
+                success_count += 1
 
     # Rapporteer eindresultaat
-    total = len(visualizations)
+    total = len(names)
+    elapsed = datetime.now() - start_time
     logger.info(
-        f"Project voltooid: {success_count}/{total} visualisaties succesvol gemaakt"
+        f"Project voltooid: {success_count}/{total} visualisaties succesvol gemaakt "
+        f"in {elapsed.total_seconds():.2f} seconden"
     )
 
     if success_count < total:
         logger.warning(
             "Niet alle visualisaties konden worden gemaakt. Zie bovenstaande fouten."
         )
+    report_profile(logger, "run_project")
 
     return success_count == total
 
 
 if __name__ == "__main__":
-    # Voer het project uit
-    success = run_project()
+    parser = argparse.ArgumentParser(description="Maak de visualisaties.")
+    parser.add_argument(
+        "names", nargs="*", help=f"Visualisaties (standaard alle): {registry.names()}"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Aantal workerprocessen; 1 is sequentieel, 0 is aantal cores",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Via de pipeline: gedeelde stappen één keer, met plan en tijden",
+    )
+    args = parser.parse_args()
+
+    # Voer het project uit, eventueel alleen voor de opgegeven visualisaties
+    if args.pipeline:
+        from wa_analysis.pipeline import DEFAULT_WORKERS, run_pipeline
+
+        success = run_pipeline(
+            args.names or None,
+            DEFAULT_WORKERS if args.workers is None else args.workers,
+        )
+    else:
+        success = run_project(args.names or None, args.workers)
 
     # Stel juiste exit code in
     sys.exit(0 if success else 1)
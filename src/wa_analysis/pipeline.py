@@ -0,0 +1,441 @@
+### Declarative pipeline: every shared stage runs once, independent branches concurrently ###
+
+# Import packages
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+# Import modules
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import Profiler
+from wa_analysis.visualisation import registry
+
+# Setup logger
+logger = Logger().get_logger()
+
+PLOT_PREFIX = "plot:"
+DEFAULT_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Eén stap in de pipeline.
+
+    func krijgt de uitvoer van de stappen in inputs, in die volgorde.
+    Plotstappen gebruiken pyplot, dat niet thread-safe is, en draaien daarom
+    één voor één in de hoofdthread; de overige stappen draaien in threads.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    plot: bool = False
+
+
+@dataclass
+class StageResult:
+    """Uitkomst en tijdmeting van een uitgevoerde stap."""
+
+    name: str
+    success: bool
+    seconds: float = 0.0
+    thread: str = ""
+    error: Optional[str] = None
+
+
+def load_config() -> ConfigLoader:
+    """Stap 'config'. Maakt ook de gedeelde DatasetCache aan, vóór de threads."""
+    from wa_analysis.data_loading.cache import DatasetCache
+
+    DatasetCache()
+    return ConfigLoader()
+
+
+def load_enriched(config_loader: ConfigLoader, datafile_attribute: str) -> pd.DataFrame:
+    """
+    Laad een dataset en verrijk hem met DataProcessor.add_columns.
+
+    Args:
+        config_loader: Uitvoer van de stap 'config'
+        datafile_attribute: Attribuut van ConfigLoader met het pad naar de dataset
+
+    Returns:
+        pd.DataFrame: De verrijkte DataFrame
+    """
+    from wa_analysis.data_loading.cache import DatasetCache
+
+    return DatasetCache().get_enriched(
+        config=config_loader.config,
+        datafile=getattr(config_loader, datafile_attribute),
+    )
+
+
+def merge_roles(config_loader: ConfigLoader, altered_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Voeg de rollen van de spelers toe met Merger.
+
+    Args:
+        config_loader: Uitvoer van de stap 'config'
+        altered_df: Verrijkte DataFrame
+
+    Returns:
+        pd.DataFrame: DataFrame met rollen
+    """
+    from wa_analysis.data_loading.merger import Merger
+
+    merger = Merger(
+        config=config_loader.config,
+        altered_df=altered_df,
+        role_file=config_loader.role_file,
+    )
+    return merger.get_processed_data()
+
+
+def process_reactions(config_loader: ConfigLoader, df: pd.DataFrame) -> Any:
+    """
+    Filter de reacties en voeg de reactietijd-buckets toe.
+
+    Args:
+        config_loader: Uitvoer van de stap 'config'
+        df: Verrijkte DataFrame, met of zonder rollen
+
+    Returns:
+        ReactionsAdder: De ReactionsAdder na process_data
+    """
+    from wa_analysis.data_loading.reactions import ReactionsAdder
+
+    reactions_adder = ReactionsAdder(config_loader.config, df)
+    reactions_adder.process_data()
+    return reactions_adder
+
+
+def draw_visualization(name: str, *inputs: Any) -> Any:
+    """
+    Maak een visualisatie uit de uitvoer van de stappen in zijn inputs.
+
+    Args:
+        name: Naam van de visualisatie in de registry
+        *inputs: Uitvoer van de stappen, in de volgorde van Visualization.inputs
+
+    Returns:
+        Any: Wat de draw-functie van de visualisatie teruggeeft
+    """
+    import matplotlib.pyplot as plt
+
+    try:
+        return registry.load(name, "draw")(*inputs)
+    finally:
+        plt.close("all")
+
+
+def default_stages() -> Dict[str, Stage]:
+    """
+    Geef de stappen van het project: laden, verrijken, rollen, reacties en plots.
+
+    De plotstappen komen uit de registry; elke visualisatie noemt daar de
+    stappen waarvan hij de uitvoer nodig heeft.
+
+    Returns:
+        Dict[str, Stage]: Stappen op naam
+    """
+    stages: List[Stage] = [
+        Stage("config", load_config),
+        Stage(
+            "hockeyteam",
+            partial(load_enriched, datafile_attribute="datafile_hockeyteam"),
+            ("config",),
+        ),
+        Stage(
+            "wife",
+            partial(load_enriched, datafile_attribute="datafile_wife"),
+            ("config",),
+        ),
+        Stage("merged", merge_roles, ("config", "hockeyteam")),
+        Stage("reactions_wife", process_reactions, ("config", "wife")),
+        Stage("reactions_merged", process_reactions, ("config", "merged")),
+    ]
+    for visualization in registry.VISUALIZATIONS.values():
+        stages.append(
+            Stage(
+                PLOT_PREFIX + visualization.name,
+                partial(draw_visualization, visualization.name),
+                visualization.inputs,
+                plot=True,
+            )
+        )
+    return {stage.name: stage for stage in stages}
+
+
+class Pipeline:
+    """
+    Voert stappen uit in de volgorde van hun afhankelijkheden (een DAG).
+
+    Elke stap draait hooguit één keer per Pipeline: de uitvoer wordt bewaard
+    en gedeeld met alle stappen die hem nodig hebben, ook bij een volgende
+    aanroep van run. Stappen waarvan de invoer klaar is draaien tegelijk in
+    een thread pool. Mislukt een stap, dan worden de stappen die ervan
+    afhangen overgeslagen; de andere takken gaan door.
+    """
+
+    def __init__(
+        self,
+        stages: Optional[Dict[str, Stage]] = None,
+        workers: int = DEFAULT_WORKERS,
+    ) -> None:
+        logger.info("Initialiseren van Pipeline")
+        self.stages: Dict[str, Stage] = (
+            stages if stages is not None else default_stages()
+        )
+        # 0 betekent: een thread per core, zoals --workers 0 bij main
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.outputs: Dict[str, Any] = {}
+        self.results: Dict[str, StageResult] = {}
+        # Dataset per stap voor de profielmetingen, afgeleid van de invoer
+        self.datasets: Dict[str, Optional[str]] = {}
+
+    def plan(self, targets: List[str]) -> List[str]:
+        """
+        Bepaal welke stappen nodig zijn, in een volgorde die afhankelijkheden respecteert.
+
+        Args:
+            targets: Namen van de gewenste stappen
+
+        Returns:
+            List[str]: Alle benodigde stappen, elke stap één keer
+
+        Raises:
+            ValueError: Bij een onbekende stap of een cyclus
+        """
+        order: List[str] = []
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if name in done:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Onbekende stap: {name} (nodig voor {path})")
+            if name in visiting:
+                raise ValueError(
+                    f"Cyclus in de pipeline: {' -> '.join(path + (name,))}"
+                )
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency, path + (name,))
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target, ())
+        return order
+
+    def consumers(self, targets: List[str]) -> Dict[str, List[str]]:
+        """
+        Geef per stap de doelen die (direct of indirect) van zijn uitvoer afhangen.
+
+        Args:
+            targets: Namen van de gewenste stappen
+
+        Returns:
+            Dict[str, List[str]]: Stap en de doelen die hem gebruiken
+        """
+        used_by: Dict[str, List[str]] = {}
+        for target in targets:
+            for name in self.plan([target]):
+                used_by.setdefault(name, []).append(target)
+        return used_by
+
+    def format_plan(self, targets: List[str]) -> str:
+        """Het plan als tabel: stap, invoer en de doelen die hem delen."""
+        used_by = self.consumers(targets)
+        lines = [f"{'stap':<30} {'invoer':<26} gebruikt door"]
+        for name in self.plan(targets):
+            inputs = ", ".join(self.stages[name].inputs) or "-"
+            users = [user.removeprefix(PLOT_PREFIX) for user in used_by[name]]
+            memo = " (al berekend)" if name in self.outputs else ""
+            lines.append(f"{name:<30} {inputs:<26} {', '.join(users)}{memo}")
+        return "\n".join(lines)
+
+    def format_timings(self, names: List[str]) -> str:
+        """De tijden per stap als tabel."""
+        lines = [f"{'stap':<30} {'status':<8} {'seconden':>9}  thread"]
+        for name in names:
+            result = self.results.get(name)
+            if result is None:
+                continue
+            status = "OK" if result.success else "FOUT"
+            lines.append(
+                f"{name:<30} {status:<8} {result.seconds:>9.2f}  {result.thread}"
+            )
+        return "\n".join(lines)
+
+    def _execute(self, name: str) -> Tuple[StageResult, Any]:
+        """Voer één stap uit met tijdmeting en foutafhandeling."""
+        stage = self.stages[name]
+        thread = threading.current_thread().name
+        logger.info(f"Start stap {name} ({thread})")
+        start = time.perf_counter()
+        datasets = {self.datasets.get(dep) for dep in stage.inputs} - {None}
+        try:
+            with Profiler().stage(
+                f"pipeline:{name}", ",".join(sorted(datasets)) or None
+            ) as record:
+                output = stage.func(*(self.outputs[dep] for dep in stage.inputs))
+            self.datasets[name] = record.dataset
+            seconds = time.perf_counter() - start
+            logger.info(f"Stap {name} voltooid in {seconds:.2f} seconden")
+            return StageResult(name, True, seconds, thread), output
+        except Exception as e:
+            seconds = time.perf_counter() - start
+            logger.error(f"Fout in stap {name} na {seconds:.2f} seconden: {e}")
+            logger.error(traceback.format_exc())
+            return StageResult(name, False, seconds, thread, str(e)), None
+
+    def run(self, targets: List[str]) -> Dict[str, StageResult]:
+        """
+        Voer de stappen uit die nodig zijn voor de doelen.
+
+        Args:
+            targets: Namen van de gewenste stappen
+
+        Returns:
+            Dict[str, StageResult]: Resultaat per stap uit het plan
+        """
+        order = self.plan(targets)
+        pending: List[str] = [name for name in order if name not in self.outputs]
+        failed: Set[str] = set()
+        running: Dict[Future, str] = {}
+
+        def finish(name: str, result: StageResult, output: Any) -> None:
+            self.results[name] = result
+            if result.success:
+                self.outputs[name] = output
+            else:
+                failed.add(name)
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="pipeline"
+        ) as executor:
+            while pending or running:
+                # Verwerk stappen die klaar zijn, zonder te wachten
+                for future in [future for future in running if future.done()]:
+                    finish(running.pop(future), *future.result())
+
+                # Stappen met mislukte invoer worden overgeslagen
+                for name in list(pending):
+                    missing = [dep for dep in self.stages[name].inputs if dep in failed]
+                    if missing:
+                        pending.remove(name)
+                        logger.warning(
+                            f"Stap {name} overgeslagen, invoer mislukt: {missing}"
+                        )
+                        finish(
+                            name,
+                            StageResult(
+                                name, False, error=f"invoer mislukt: {missing}"
+                            ),
+                            None,
+                        )
+
+                ready = [
+                    name
+                    for name in pending
+                    if all(dep in self.outputs for dep in self.stages[name].inputs)
+                ]
+                for name in ready:
+                    if not self.stages[name].plot:
+                        pending.remove(name)
+                        running[executor.submit(self._execute, name)] = name
+
+                plots = [name for name in ready if self.stages[name].plot]
+                if plots:
+                    # Plot in de hoofdthread terwijl de threads doorrekenen
+                    pending.remove(plots[0])
+                    finish(plots[0], *self._execute(plots[0]))
+                elif running:
+                    wait(running, return_when=FIRST_COMPLETED)
+                elif pending:
+                    raise RuntimeError(f"Pipeline loopt vast bij: {pending}")
+
+        return {name: self.results[name] for name in order if name in self.results}
+
+
+def run_pipeline(
+    names: Optional[List[str]] = None,
+    workers: int = DEFAULT_WORKERS,
+    plan_only: bool = False,
+) -> bool:
+    """
+    Maak de gekozen visualisaties via de pipeline en log het plan en de tijden.
+
+    Args:
+        names: Namen van de visualisaties (standaard alle, zie registry.names())
+        workers: Aantal threads voor de niet-plotstappen; 0 is aantal cores
+        plan_only: Alleen het plan loggen
+
+    Returns:
+        bool: True als alle visualisaties gemaakt zijn
+    """
+    from wa_analysis.data_loading.cache import enable_copy_on_write
+
+    targets = [
+        PLOT_PREFIX + visualization.name for visualization in registry.select(names)
+    ]
+    enable_copy_on_write()
+    pipeline = Pipeline(workers=workers)
+    logger.info(f"Plan:\n{pipeline.format_plan(targets)}")
+    if plan_only:
+        return True
+
+    start = time.perf_counter()
+    results = pipeline.run(targets)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Tijden per stap:\n{pipeline.format_timings(list(results))}")
+    logger.info(
+        f"Totaal {elapsed:.2f} seconden, som van de stappen "
+        f"{sum(result.seconds for result in results.values()):.2f} seconden"
+    )
+
+    profiler = Profiler()
+    report = profiler.write_report("pipeline")
+    if report is not None:
+        logger.info(f"Metingen per stap en dataset:\n{profiler.format_table()}")
+        logger.info(f"Profielrapport opgeslagen in {report}")
+
+    success_count = sum(results[target].success for target in targets)
+    logger.info(
+        f"Pipeline voltooid: {success_count}/{len(targets)} visualisaties "
+        f"succesvol gemaakt in {elapsed:.2f} seconden"
+    )
+    return success_count == len(targets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Maak de visualisaties via de pipeline met gedeelde stappen."
+    )
+    parser.add_argument(
+        "names", nargs="*", help=f"Visualisaties (standaard alle): {registry.names()}"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--plan", action="store_true", help="Alleen het plan loggen, niets uitvoeren"
+    )
+    args = parser.parse_args()
+
+    success = run_pipeline(args.names or None, args.workers, args.plan)
+
+    # Stel juiste exit code in
+    sys.exit(0 if success else 1)
@@ -0,0 +1,367 @@
+### This module loads config.toml once per process and validates all sections ###
+
+# Let op: deze module mag Logger niet importeren, omdat Logger zelf de
+# configuratie via deze module laadt.
+
+import re
+import tomllib
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    NonNegativeFloat,
+    NonNegativeInt,
+    PositiveFloat,
+    PositiveInt,
+    ValidationError,
+    field_validator,
+)
+
+DEFAULT_CONFIG_PATH = "./config.toml"
+
+
+class ConfigError(ValueError):
+    """Configuratiebestand ontbreekt, is onleesbaar of ongeldig."""
+
+
+class FrozenDict(dict):
+    """Dict die niet kan worden aangepast: de gedeelde configuratiesnapshot."""
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError(
+            "De configuratie is alleen-lezen; maak een eigen dict om aan te passen"
+        )
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Dict[str, Any]]]:
+        # pickle en deepcopy vullen een dict anders via __setitem__
+        return FrozenDict, (dict(self),)
+
+
+def _freeze(value: Any) -> Any:
+    """Maak tabellen en lijsten uit TOML recursief alleen-lezen."""
+    if isinstance(value, dict):
+        return FrozenDict({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class SectionConfig(BaseModel):
+    """Basis van alle secties; de gedeelde snapshot mag niet worden aangepast."""
+
+    model_config = ConfigDict(frozen=True)
+
+
+class VisualConfig(SectionConfig):
+    """Instellingen van één visualisatie, bijvoorbeeld [comparing_categories]."""
+
+    model_config = ConfigDict(extra="allow")
+
+    suptitle: Optional[str] = None
+    suptitle_fontsize: Optional[int] = None
+    suptitle_fontweight: Optional[str] = None
+    title: str = "Untitled"
+    title_fontsize: int = 12
+    xlabel: str = "X"
+    xlabel_fontsize: int = 12
+    # Een lege string betekent: geen rotatie
+    xlabel_rotation: Union[int, str, None] = None
+    ylabel: str = "Y"
+    ylabel_fontsize: int = 12
+    figtext: Optional[str] = None
+    figtext_x: Optional[float] = None
+    figtext_y: Optional[float] = None
+    figtext_fontsize: int = 12
+    save_as: str = "Unnamed visual.png"
+
+
+def _visual_section(save_as: str) -> Any:
+    """Standaard voor een visualisatiesectie die in config.toml ontbreekt."""
+    return Field(default_factory=lambda: VisualConfig(save_as=save_as))
+
+
+class ParserConfig(SectionConfig):
+    """Sectie [parser]."""
+
+    batch_size: PositiveInt = 100_000
+    encoding: str = "utf-8"
+
+
+class ProcessingConfig(SectionConfig):
+    """Sectie [processing]."""
+
+    compact_schema: bool = False
+
+
+class StoreConfig(SectionConfig):
+    """Sectie [store]."""
+
+    folder: str = "store"
+
+
+class BatchConfig(SectionConfig):
+    """Sectie [batch]."""
+
+    workers: NonNegativeInt = 0
+    output_folder: str = "img/batch"
+    plots: Optional[List[str]] = None
+
+
+class GeneratorConfig(SectionConfig):
+    """Sectie [generator]."""
+
+    folder: str = "data/sim"
+    rows: PositiveInt = 100_000
+    authors: PositiveInt = 25
+    days: PositiveInt = 1825
+    start: str = "2019-01-01"
+    seed: int = 42
+    pool_size: PositiveInt = 50_000
+
+
+class BenchmarkConfig(SectionConfig):
+    """Sectie [benchmark]."""
+
+    folder: str = "benchmarks"
+    sizes: List[PositiveInt] = Field(default_factory=lambda: [10_000, 100_000])
+    repeats: PositiveInt = 3
+    threshold: NonNegativeFloat = 0.25
+    min_seconds: NonNegativeFloat = 0.005
+    max_parts: PositiveInt = 1000
+
+
+class CacheConfig(SectionConfig):
+    """Sectie [cache]."""
+
+    enabled: bool = True
+    folder: str = "data/cache"
+
+
+class StartupConfig(SectionConfig):
+    """Sectie [startup]."""
+
+    import_budget: PositiveFloat = 1.0
+
+
+class RunConfig(SectionConfig):
+    """Sectie [run]."""
+
+    workers: NonNegativeInt = 1
+    preload: bool = True
+
+
+class ReactionsConfig(SectionConfig):
+    """Sectie [reactions]."""
+
+    # Reactietijd in minuten; bins zijn rechts gesloten zoals bij pd.cut
+    edges: List[float] = [0, 1, 5, 15, 30, 60, 120, 240, float("inf")]
+    # [start, stop, bins]: logaritmische grenzen in plaats van edges
+    log_edges: Optional[Tuple[PositiveFloat, PositiveFloat, PositiveInt]] = None
+
+    @field_validator("edges")
+    @classmethod
+    def check_edges(cls, value: List[float]) -> List[float]:
+        """Minstens twee strikt oplopende grenzen."""
+        if len(value) < 2 or any(a >= b for a, b in zip(value, value[1:])):
+            raise ValueError(f"edges moeten strikt oplopen: {value}")
+        return value
+
+    @field_validator("log_edges")
+    @classmethod
+    def check_log_edges(
+        cls, value: Optional[Tuple[float, float, int]]
+    ) -> Optional[Tuple[float, float, int]]:
+        """Start moet kleiner zijn dan stop."""
+        if value is not None and value[0] >= value[1]:
+            raise ValueError(f"log_edges start moet kleiner zijn dan stop: {value}")
+        return value
+
+
+class SketchConfig(SectionConfig):
+    """Sectie [sketch]."""
+
+    relative_accuracy: float = Field(default=0.01, gt=0, lt=1)
+    quantiles: List[float] = [0.5, 0.9, 0.99]
+
+    @field_validator("quantiles")
+    @classmethod
+    def check_quantiles(cls, value: List[float]) -> List[float]:
+        """Quantiles liggen tussen 0 en 1."""
+        if not value or any(not 0 <= q <= 1 for q in value):
+            raise ValueError(f"quantiles moeten tussen 0 en 1 liggen: {value}")
+        return value
+
+
+class SessionsConfig(SectionConfig):
+    """Sectie [sessions]."""
+
+    # Een stilte langer dan dit (in minuten) begint een nieuw gesprek
+    gap_minutes: PositiveFloat = 60
+
+
+class AttributionConfig(SectionConfig):
+    """Sectie [attribution]."""
+
+    # previous: reactie op het vorige bericht; window: op elke andere auteur
+    # die binnen window_minutes ervoor schreef
+    mode: Literal["previous", "window"] = "previous"
+    window_minutes: PositiveFloat = 30
+    max_messages: PositiveInt = 50
+    # Zonder halfwaardetijd tellen alle kandidaten even zwaar
+    half_life_minutes: Optional[PositiveFloat] = None
+
+
+class LogConfig(SectionConfig):
+    """Sectie [log]."""
+
+    level: Literal["HOTPATH", "DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    queue: bool = True
+
+
+class ProfilingConfig(SectionConfig):
+    """Sectie [profiling]."""
+
+    enabled: bool = True
+    trace_memory: bool = False
+    deep_memory: bool = False
+    folder: str = "logs/profile"
+
+
+class AppConfig(SectionConfig):
+    """Volledige configuratie uit config.toml."""
+
+    model_config = ConfigDict(extra="allow")
+
+    raw: str
+    processed: str
+    input: str = "_chat.txt"
+    current: str
+    wife_file: str
+    role_file: str
+    datetime_format: str = "%d-%m-%Y %H:%M"
+    logging: str = "logs"
+    log_file: str = "whatsapp_analysis.log"
+    output_folder: str = "img"
+
+    parser: ParserConfig = Field(default_factory=ParserConfig)
+    processing: ProcessingConfig = Field(default_factory=ProcessingConfig)
+    store: StoreConfig = Field(default_factory=StoreConfig)
+    batch: BatchConfig = Field(default_factory=BatchConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    generator: GeneratorConfig = Field(default_factory=GeneratorConfig)
+    benchmark: BenchmarkConfig = Field(default_factory=BenchmarkConfig)
+    startup: StartupConfig = Field(default_factory=StartupConfig)
+    run: RunConfig = Field(default_factory=RunConfig)
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig)
+    log: LogConfig = Field(default_factory=LogConfig)
+    reactions: ReactionsConfig = Field(default_factory=ReactionsConfig)
+    sketch: SketchConfig = Field(default_factory=SketchConfig)
+    sessions: SessionsConfig = Field(default_factory=SessionsConfig)
+    attribution: AttributionConfig = Field(default_factory=AttributionConfig)
+    message_types: Optional[Dict[str, str]] = None
+
+    # Ontbrekende secties (bijvoorbeeld een oudere config.toml) krijgen standaarden
+    comparing_categories: VisualConfig = _visual_section("comparing_categories.png")
+    time_series: VisualConfig = _visual_section("time_series.png")
+    distribution: VisualConfig = _visual_section("distribution.png")
+    relationships: VisualConfig = _visual_section("relationships.png")
+    clustering: VisualConfig = _visual_section("clustering.png")
+    percentiles: VisualConfig = _visual_section("percentiles.png")
+
+    @field_validator("message_types")
+    @classmethod
+    def check_message_types(
+        cls, value: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, str]]:
+        """Kolomnamen moeten identifiers zijn en patronen geldige regexen."""
+        for name, pattern in (value or {}).items():
+            if not name.isidentifier():
+                raise ValueError(f"ongeldige kolomnaam voor berichttype: {name!r}")
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"ongeldige regex voor {name!r}: {e}")
+        return value
+
+
+# Per configuratiepad: (wijzigingstijd, grootte) en de gevalideerde configuratie
+_snapshots: Dict[Path, Tuple[Tuple[int, int], FrozenDict, AppConfig]] = {}
+
+
+def _snapshot(config_path: Union[str, Path]) -> Tuple[FrozenDict, AppConfig]:
+    """Laad en valideer de configuratie, of hergebruik de vorige als het bestand gelijk is."""
+    path = Path(config_path).resolve()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise ConfigError(f"Configuratiebestand niet gevonden: {path}")
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _snapshots.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+
+    try:
+        with path.open("rb") as f:
+            raw_config: Dict[str, Any] = tomllib.load(f)
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"Configuratiebestand {path} is geen geldige TOML: {e}")
+
+    try:
+        app_config = AppConfig.model_validate(raw_config)
+    except ValidationError as e:
+        raise ConfigError(f"Ongeldige configuratie in {path}:\n{e}")
+
+    # Ontbrekende visualisatiesecties ook in de dictionary, met de standaarden
+    for name, model_field in AppConfig.model_fields.items():
+        if model_field.annotation is VisualConfig and name not in raw_config:
+            raw_config[name] = getattr(app_config, name).model_dump(exclude_none=True)
+
+    frozen = _freeze(raw_config)
+    _snapshots[path] = (signature, frozen, app_config)
+    return frozen, app_config
+
+
+def load_config(config_path: Union[str, Path] = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """
+    Geef de configuratie als dictionary, zoals tomllib die zou teruggeven.
+
+    Het bestand wordt per proces één keer gelezen en gevalideerd, en pas
+    opnieuw als de wijzigingstijd of grootte verandert. Alle aanroepen delen
+    dezelfde alleen-lezen snapshot (tabellen als FrozenDict, lijsten als
+    tuple); wie iets wil aanpassen maakt een eigen dict.
+
+    Args:
+        config_path: Pad naar config.toml
+
+    Returns:
+        Dict[str, Any]: De gevalideerde configuratie (alleen-lezen)
+
+    Raises:
+        ConfigError: Als het bestand ontbreekt, onleesbaar of ongeldig is
+    """
+    raw_config, _ = _snapshot(config_path)
+    return raw_config
+
+
+def get_app_config(config_path: Union[str, Path] = DEFAULT_CONFIG_PATH) -> AppConfig:
+    """
+    Geef de getypeerde configuratie.
+
+    Args:
+        config_path: Pad naar config.toml
+
+    Returns:
+        AppConfig: De gevalideerde configuratie (frozen, wordt gedeeld)
+
+    Raises:
+        ConfigError: Als het bestand ontbreekt, onleesbaar of ongeldig is
+    """
+    _, app_config = _snapshot(config_path)
+    return app_config
@@ -40,7 +40,7 @@ class BasePlot:
                 figsize: Tuple[int, int] = (10, 6)
             else:
                 figsize = self.settings.figsize
-                logger.debug(f"Figsize uit settings: {figsize}")
+                logger.debug("Figsize uit settings: %s", figsize)
 
             self.fig, self.ax = plt.subplots(figsize=figsize)
             logger.debug("Figuur en assen aangemaakt")
@@ -52,7 +52,7 @@ class BasePlot:
                     fontsize=getattr(self.settings, "xlabel_fontsize", 12),
                     fontweight=getattr(self.settings, "xlabel_fontweight", "normal"),
                 )
-                logger.debug(f"X-label ingesteld: {self.settings.xlabel}")
+                logger.debug("X-label ingesteld: %s", self.settings.xlabel)
 
             # Y-as label instellen
             if hasattr(self.settings, "ylabel"):
@@ -61,17 +61,17 @@ class BasePlot:
                     fontsize=getattr(self.settings, "ylabel_fontsize", 12),
                     fontweight=getattr(self.settings, "ylabel_fontweight", "normal"),
                 )
-                logger.debug(f"Y-label ingesteld: {self.settings.ylabel}")
+                logger.debug("Y-label ingesteld: %s", self.settings.ylabel)
 
             # Titel instellen
             if hasattr(self.settings, "title"):
                 self.ax.set_title(self.settings.title)
-                logger.debug(f"Titel ingesteld: {self.settings.title}")
+                logger.debug("Titel ingesteld: %s", self.settings.title)
 
             # Suptitle instellen
             if hasattr(self.settings, "suptitle") and self.settings.suptitle:
                 self.fig.suptitle(self.settings.suptitle)
-                logger.debug(f"Suptitle ingesteld: {self.settings.suptitle}")
+                logger.debug("Suptitle ingesteld: %s", self.settings.suptitle)
 
             # Legenda instellen
             if (
@@ -79,7 +79,7 @@ class BasePlot:
                 and self.settings.legend_title is not None
             ):
                 self.ax.legend(title=self.settings.legend_title)
-                logger.debug(f"Legenda titel ingesteld: {self.settings.legend_title}")
+                logger.debug("Legenda titel ingesteld: %s", self.settings.legend_title)
 
             # Grid uitschakelen
             self.ax.grid(False)
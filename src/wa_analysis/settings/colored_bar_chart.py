@@ -39,7 +39,7 @@ class ColoredBarPlot(BasePlot):
         logger.info(f"Maken barplot met x={x_column}, y={y_column}, hue={hue_column}")
 
         try:
-            logger.debug(f"Data vorm: {data.shape}")
+            logger.debug("Data vorm: %s", data.shape)
 
             # Maak figuur aan als die nog niet bestaat
             if self.fig is None or self.ax is None:
@@ -50,7 +50,7 @@ class ColoredBarPlot(BasePlot):
             palette: Optional[Union[str, list]] = getattr(
                 self.settings, "color_palette", None
             )
-            logger.debug(f"Kleurenpalet: {palette}")
+            logger.debug("Kleurenpalet: %s", palette)
 
             # Maak barplot
             sns.barplot(
@@ -65,7 +65,7 @@ class ColoredBarPlot(BasePlot):
 
             # Pas rotatie toe op x-labels
             plt.xticks(rotation=self.rotation)
-            logger.debug(f"X-as labels geroteerd met {self.rotation} graden")
+            logger.debug("X-as labels geroteerd met %s graden", self.rotation)
 
             logger.info("Barplot succesvol gemaakt")
             return self.fig
@@ -1,7 +1,21 @@
+import atexit
 import logging
-import tomllib
+import logging.handlers
+import multiprocessing
+import queue
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+from wa_analysis.settings.app_config import ConfigError, get_app_config, load_config
+
+# Level below DEBUG for messages inside inner loops. It is off unless
+# [log] level = "HOTPATH"; guard expensive arguments with
+# logger.isEnabledFor(HOTPATH) so the call costs nothing in normal runs.
+HOTPATH = 5
+logging.addLevelName(HOTPATH, "HOTPATH")
+
+LOGGER_NAME = "whatsapp_analysis"
 
 
 class Logger:
@@ -10,6 +24,13 @@ class Logger:
 
     This class sets up a logger that can be imported and used across
     multiple Python modules in the WhatsApp visualization project.
+
+    With [log] queue enabled, the logger only puts records on a queue; a
+    QueueListener thread writes them to the log file and the console, so
+    slow I/O never blocks the caller. Worker processes send their records
+    to the main process through worker_queue() and configure_worker().
+    Use %-style arguments (logger.debug("Shape: %s", df.shape)) so messages
+    below the configured level are never formatted.
     """
 
     _instance: Optional["Logger"] = None  # Singleton pattern
@@ -22,30 +43,35 @@ class Logger:
         return cls._instance
 
     def __init__(
-        self, config_path: str = "./config.toml", log_level: int = logging.INFO
+        self, config_path: str = "./config.toml", log_level: Optional[int] = None
     ) -> None:
         """
         Initialize the logger using configuration from a TOML file.
 
         Args:
             config_path: Path to the TOML configuration file
-            log_level: The logging level (default: logging.INFO)
+            log_level: The logging level (default: [log] level, INFO)
         """
         # Only initialize once (singleton pattern)
         if getattr(self, "_initialized", False):
             return
 
-        self.logger: logging.Logger = logging.getLogger("whatsapp_analysis")
-        self.logger.setLevel(log_level)
-
         # Load configuration
         self.config_file: Path = Path(config_path).resolve()
         try:
-            with self.config_file.open("rb") as f:
-                self.config: Dict[str, Any] = tomllib.load(f)
-        except (FileNotFoundError, tomllib.TOMLDecodeError) as e:
+            self.config: Dict[str, Any] = load_config(self.config_file)
+            settings = get_app_config(self.config_file).log
+        except ConfigError as e:
             raise ValueError(f"Failed to load config file: {e}")
 
+        self.logger: logging.Logger = logging.getLogger(LOGGER_NAME)
+        self.logger.setLevel(
+            log_level
+            if log_level is not None
+            else logging.getLevelNamesMapping()[settings.level]
+        )
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
         # Set up log file
         root: Path = Path("./").resolve()
         log_folder: Path = root / Path(self.config.get("logging", "logs"))
@@ -68,13 +94,78 @@ class Logger:
         console_handler: logging.StreamHandler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
 
-        # Add handlers to logger
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-
-        self.logger.info(f"Logger initialized. Log file: {log_path}")
+        # Add handlers to logger, behind a queue if configured
+        self.handlers: List[logging.Handler] = [file_handler, console_handler]
+        if settings.queue:
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(
+                log_queue, *self.handlers, respect_handler_level=True
+            )
+            self.listener.start()
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        else:
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
+        atexit.register(self.stop)
+
+        self.logger.info("Logger initialized. Log file: %s", log_path)
         self._initialized = True
 
+    @contextmanager
+    def worker_queue(self, context: Optional[Any] = None) -> Iterator[Any]:
+        """
+        Let worker processes log via this process while the block runs.
+
+        Pass the queue to configure_worker() in the worker, for example as
+        initargs of a ProcessPoolExecutor, and leave the block after the pool
+        has shut down. A listener thread writes the records to the same
+        handlers as this process and is stopped when the block ends.
+
+        Args:
+            context: Multiprocessing context of the workers (default: the default context)
+
+        Returns:
+            Iterator[multiprocessing.Queue]: Queue for QueueHandlers in the workers
+        """
+        context = context or multiprocessing.get_context()
+        worker_queue = context.Queue()
+        listener = logging.handlers.QueueListener(
+            worker_queue, *self.handlers, respect_handler_level=True
+        )
+        listener.start()
+        try:
+            yield worker_queue
+        finally:
+            listener.stop()
+            worker_queue.close()
+
+    @classmethod
+    def configure_worker(cls, worker_queue: Any) -> None:
+        """
+        Send all records of this worker process to the main process.
+
+        Replaces the handlers inherited through fork (or created on import
+        with spawn), so workers never write to the log file themselves.
+
+        Args:
+            worker_queue: Queue from worker_queue() in the main process
+        """
+        instance = cls()
+        # With spawn this process started its own listener on import
+        if instance.listener is not None and instance.listener._thread is not None:
+            if instance.listener._thread.is_alive():
+                instance.listener.stop()
+        for handler in list(instance.logger.handlers):
+            instance.logger.removeHandler(handler)
+        instance.logger.addHandler(logging.handlers.QueueHandler(worker_queue))
+        # Threads do not survive fork; the main process owns the listeners
+        instance.listener = None
+
+    def stop(self) -> None:
+        """Write all queued records and stop the listener thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
     def get_logger(self) -> logging.Logger:
         """Get the configured logger instance."""
         return self.logger
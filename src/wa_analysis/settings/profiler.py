@@ -0,0 +1,365 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from wa_analysis.settings.app_config import get_app_config
+
+# pandas pas laden bij een samenvatting: de profiler wordt al bij het
+# importeren van main geladen, en dat moet snel blijven
+if TYPE_CHECKING:
+    import pandas as pd
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+MB = 1024 * 1024
+
+
+@dataclass
+class StageRecord:
+    """Meting van één uitgevoerde stap."""
+
+    stage: str
+    dataset: Optional[str] = None
+    parent: Optional[str] = None
+    started: str = ""
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    frame_mb: Optional[float] = None
+    success: bool = True
+    # Absolute piek van tracemalloc, intern voor geneste stappen
+    _peak_bytes: int = field(default=0, repr=False)
+    _start_bytes: int = field(default=0, repr=False)
+    # Waar als een andere thread tegelijk een stap had (piek niet toe te rekenen)
+    _shared: bool = field(default=False, repr=False)
+
+
+def _is_frame(value: Any) -> bool:
+    """Of value zich als een DataFrame gedraagt, zonder pandas te importeren."""
+    return hasattr(value, "columns") and hasattr(value, "memory_usage")
+
+
+def _frame(value: Any) -> Optional["pd.DataFrame"]:
+    """Geef de DataFrame in een resultaat: de waarde zelf of het eerste element."""
+    if _is_frame(value):
+        return value
+    if isinstance(value, tuple) and value and _is_frame(value[0]):
+        return value[0]
+    return None
+
+
+class Profiler:
+    """
+    Procesbrede verzameling van metingen per stap.
+
+    Een stap wordt gemeten met de context manager stage() of de decorator
+    profiled(). Per stap worden wandkloktijd, CPU-tijd van de thread, het
+    aantal rijen in en uit en het geheugen van de uitvoer-DataFrame
+    vastgelegd; met [profiling] trace_memory ook de piek van tracemalloc
+    (dat vertraagt allocaties merkbaar). Stappen mogen genest zijn en in
+    meerdere threads lopen; een stap zonder dataset neemt die van de
+    omliggende stap over.
+
+    tracemalloc meet het hele proces. De piek klopt dus alleen voor stappen
+    die alleen liepen; liep er in een andere thread tegelijk een stap (zoals
+    in de pipeline), dan blijft peak_mb leeg.
+    """
+
+    _instance: Optional["Profiler"] = None  # Singleton pattern
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "Profiler":
+        """Implement singleton pattern to ensure only one profiler exists."""
+        if cls._instance is None:
+            cls._instance = super(Profiler, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:
+        # Only initialize once (singleton pattern)
+        if getattr(self, "_initialized", False):
+            return
+
+        settings = get_app_config().profiling
+        self.enabled: bool = settings.enabled
+        self.trace_memory: bool = settings.trace_memory
+        self.deep_memory: bool = settings.deep_memory
+        self.folder = Path(settings.folder)
+
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Threads met een actieve stap, en hoe vaak er een bij kwam terwijl
+        # een andere al bezig was
+        self._busy_threads = 0
+        self._overlaps = 0
+        self._initialized = True
+
+    def _stack(self) -> List[StageRecord]:
+        """Actieve (geneste) stappen in de huidige thread."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def set_dataset(self, dataset: Any) -> None:
+        """
+        Koppel een dataset aan de actieve stappen die er nog geen hebben.
+
+        Args:
+            dataset: Pad of naam van de dataset
+        """
+        name = Path(str(dataset)).name
+        for record in self._stack():
+            if record.dataset is None:
+                record.dataset = name
+
+    def set_rows(
+        self, rows_in: Optional[int] = None, frame: Optional["pd.DataFrame"] = None
+    ) -> None:
+        """
+        Leg rijen in en de uitvoer-DataFrame vast voor de binnenste actieve stap.
+
+        Args:
+            rows_in: Aantal rijen in de invoer
+            frame: De uitvoer van de stap
+        """
+        stack = self._stack()
+        if not stack:
+            return
+        record = stack[-1]
+        if rows_in is not None:
+            record.rows_in = rows_in
+        if frame is not None:
+            record.rows_out = len(frame)
+            record.frame_mb = (
+                frame.memory_usage(index=True, deep=self.deep_memory).sum() / MB
+            )
+
+    @contextmanager
+    def stage(self, name: str, dataset: Any = None) -> Iterator[StageRecord]:
+        """
+        Meet een stap.
+
+        Args:
+            name: Naam van de stap, bijvoorbeeld 'add_columns'
+            dataset: Pad of naam van de dataset (standaard die van de omliggende stap)
+
+        Returns:
+            Iterator[StageRecord]: De meting, aan te vullen met set_rows
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        record = StageRecord(
+            stage=name,
+            dataset=(
+                Path(str(dataset)).name
+                if dataset is not None
+                else (parent.dataset if parent else None)
+            ),
+            parent=parent.stage if parent else None,
+            started=datetime.now().isoformat(timespec="milliseconds"),
+        )
+        if not self.enabled:
+            yield record
+            return
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            record._start_bytes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+        with self._lock:
+            if not stack:
+                self._busy_threads += 1
+                if self._busy_threads > 1:
+                    self._overlaps += 1
+            record._shared = self._busy_threads > 1
+            overlaps = self._overlaps
+        stack.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException:
+            record.success = False
+            raise
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.thread_time() - cpu_start
+            stack.pop()
+            with self._lock:
+                record._shared |= overlaps != self._overlaps
+                if not stack:
+                    self._busy_threads -= 1
+
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                # reset_peak van een geneste stap wist ook onze piek
+                record._peak_bytes = max(record._peak_bytes, peak)
+                if parent is not None:
+                    parent._peak_bytes = max(parent._peak_bytes, record._peak_bytes)
+                    parent._shared |= record._shared
+                if not record._shared:
+                    record.peak_mb = (record._peak_bytes - record._start_bytes) / MB
+
+            # Een geneste stap kan de dataset pas onderweg hebben ontdekt
+            if parent is not None and parent.dataset is None:
+                parent.dataset = record.dataset
+            with self._lock:
+                self.records.append(record)
+
+    def add_records(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Voeg metingen uit een ander proces toe (zie export).
+
+        Args:
+            records: Metingen als dictionaries
+        """
+        with self._lock:
+            self.records.extend(StageRecord(**record) for record in records)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Alle metingen als dictionaries, bijvoorbeeld om tussen processen te sturen."""
+        with self._lock:
+            return [asdict(record) for record in self.records]
+
+    def summary(self) -> "pd.DataFrame":
+        """
+        Vat de metingen samen per stap en dataset.
+
+        Returns:
+            pd.DataFrame: Aantal aanroepen, totale tijden, maximale piek en rijen
+        """
+        import pandas as pd
+
+        records = pd.DataFrame(self.export())
+        if records.empty:
+            return records
+        return (
+            records.groupby(["stage", "dataset"], dropna=False, sort=False)
+            .agg(
+                calls=("stage", "size"),
+                wall_seconds=("wall_seconds", "sum"),
+                cpu_seconds=("cpu_seconds", "sum"),
+                peak_mb=("peak_mb", "max"),
+                rows_in=("rows_in", "max"),
+                rows_out=("rows_out", "max"),
+                frame_mb=("frame_mb", "max"),
+                failed=("success", lambda success: int((~success).sum())),
+            )
+            .reset_index()
+        )
+
+    def format_table(self) -> str:
+        """De samenvatting als tabel voor de console."""
+        import pandas as pd
+
+        summary = self.summary()
+        if summary.empty:
+            return "Geen metingen"
+
+        def number(value: Any, fmt: str) -> str:
+            return "-" if pd.isna(value) else format(value, fmt)
+
+        lines = [
+            f"{'stap':<34} {'dataset':<16} {'n':>3} {'wand s':>8} {'cpu s':>8} "
+            f"{'piek MB':>8} {'rijen in':>10} {'rijen uit':>10} {'frame MB':>9}"
+        ]
+        for row in summary.itertuples(index=False):
+            dataset = "-" if pd.isna(row.dataset) else str(row.dataset)
+            lines.append(
+                f"{row.stage:<34} {dataset:<16} {row.calls:>3} "
+                f"{row.wall_seconds:>8.2f} {row.cpu_seconds:>8.2f} "
+                f"{number(row.peak_mb, '.1f'):>8} {number(row.rows_in, '.0f'):>10} "
+                f"{number(row.rows_out, '.0f'):>10} {number(row.frame_mb, '.1f'):>9}"
+                + ("  FOUT" if row.failed else "")
+            )
+        return "\n".join(lines)
+
+    def write_report(self, name: str = "run") -> Optional[Path]:
+        """
+        Schrijf alle metingen en de samenvatting als JSON.
+
+        Args:
+            name: Begin van de bestandsnaam
+
+        Returns:
+            Optional[Path]: Pad naar het rapport, of None zonder metingen
+        """
+        if not self.enabled or not self.records:
+            return None
+        self.folder.mkdir(parents=True, exist_ok=True)
+        created = datetime.now()
+        path = self.folder / f"{name}_{created:%Y%m%d_%H%M%S}.json"
+        summary = self.summary()
+        summary = summary.astype(object).where(summary.notna(), None)
+        report = {
+            "created": created.isoformat(timespec="seconds"),
+            "trace_memory": self.trace_memory,
+            "summary": summary.to_dict(orient="records"),
+            "records": self.export(),
+        }
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
+
+    def clear(self) -> None:
+        """Verwijder alle metingen."""
+        with self._lock:
+            self.records.clear()
+
+
+def profiled(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator die een functie of methode als stap meet.
+
+    Rijen in komen uit de eerste DataFrame in de argumenten, of uit self.df
+    of self.altered_dataframe; rijen uit uit de teruggegeven DataFrame (of
+    het eerste element van een tuple). Een methode van een object met een
+    datafile koppelt die als dataset.
+
+    Args:
+        name: Naam van de stap (standaard de naam van de functie)
+
+    Returns:
+        Callable[[F], F]: De decorator
+    """
+
+    def decorator(func: F) -> F:
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profiler = Profiler()
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            owner = args[0] if args else None
+            dataset = getattr(owner, "datafile", None)
+            frame_in = next((arg for arg in args if _is_frame(arg)), None)
+            if frame_in is None:
+                for attribute in ("altered_dataframe", "df"):
+                    candidate = getattr(owner, attribute, None)
+                    if _is_frame(candidate):
+                        frame_in = candidate
+                        break
+
+            with profiler.stage(stage_name, dataset):
+                result = func(*args, **kwargs)
+                profiler.set_rows(
+                    len(frame_in) if frame_in is not None else None, _frame(result)
+                )
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -1,4 +1,3 @@
-import tomllib
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
@@ -6,6 +5,7 @@ from typing import Any, Dict, List, Optional, Union
 import matplotlib.pyplot as plt
 from pydantic import BaseModel
 
+from wa_analysis.settings.app_config import load_config
 from wa_analysis.settings.logger import Logger
 
 # Setup logger
@@ -53,7 +53,7 @@ class PlotSettings:
         logger.info(f"Initialiseren PlotSettings voor sectie: {section}")
         self.config: Dict[str, Any] = {}
         self.settings: Settings = self.load_settings(section)
-        logger.debug(f"PlotSettings geladen voor sectie: {section}")
+        logger.debug("PlotSettings geladen voor sectie: %s", section)
 
     @property
     def legend_title(self) -> str:
@@ -69,7 +69,7 @@ class PlotSettings:
         """
         logger.info("Laden configuratie uit config.toml")
         configfile: Path = Path("config.toml").resolve()
-        logger.debug(f"Configuratiepad: {configfile}")
+        logger.debug("Configuratiepad: %s", configfile)
 
         # Controleer of het configuratiebestand bestaat
         if not configfile.exists():
@@ -78,10 +78,9 @@ class PlotSettings:
             raise FileNotFoundError(error_msg)
 
         try:
-            with configfile.open("rb") as f:
-                self.config = tomllib.load(f)
-                logger.debug(f"Configuratie geladen met {len(self.config)} secties")
-                return self.config
+            self.config = load_config(configfile)
+            logger.debug("Configuratie geladen met %s secties", len(self.config))
+            return self.config
         except Exception as e:
             error_msg: str = f"Fout bij het laden van configuratie: {e}"
             logger.error(error_msg)
@@ -111,7 +110,7 @@ class PlotSettings:
 
         config_visual: Dict[str, Any] = self.config[section]
         logger.debug(
-            f"Visuele configuratie gevonden met {len(config_visual)} instellingen"
+            "Visuele configuratie gevonden met %s instellingen", len(config_visual)
         )
 
         # Controleer of output_folder is gedefinieerd
@@ -119,10 +118,10 @@ class PlotSettings:
         output_folder_str: Optional[str] = self.config.get("output_folder")
         if output_folder_str:
             output_folder = Path(output_folder_str)
-            logger.debug(f"Output folder: {output_folder}")
+            logger.debug("Output folder: %s", output_folder)
             # Maak de output folder aan als deze niet bestaat
             output_folder.mkdir(parents=True, exist_ok=True)
-            logger.debug(f"Output folder aangemaakt/gecontroleerd: {output_folder}")
+            logger.debug("Output folder aangemaakt/gecontroleerd: %s", output_folder)
 
         # Maak Settings object
         settings = Settings(
@@ -176,7 +175,7 @@ class PlotSettings:
                 fontsize=self.settings.title_fontsize,
                 fontstyle=self.settings.title_fontstyle or "normal",
             )
-            logger.debug(f"Titel ingesteld: {self.settings.title}")
+            logger.debug("Titel ingesteld: %s", self.settings.title)
 
             # X-as labels
             ax.set_xlabel(
@@ -184,7 +183,7 @@ class PlotSettings:
                 fontsize=self.settings.xlabel_fontsize,
                 fontweight=self.settings.xlabel_fontweight,
             )
-            logger.debug(f"X-label ingesteld: {self.settings.xlabel}")
+            logger.debug("X-label ingesteld: %s", self.settings.xlabel)
 
             # Y-as labels
             ax.set_ylabel(
@@ -192,7 +191,7 @@ class PlotSettings:
                 fontsize=self.settings.ylabel_fontsize,
                 fontweight=self.settings.ylabel_fontweight,
             )
-            logger.debug(f"Y-label ingesteld: {self.settings.ylabel}")
+            logger.debug("Y-label ingesteld: %s", self.settings.ylabel)
 
             # As uitzetten indien gewenst
             if self.settings.axis_off:
@@ -208,7 +207,7 @@ class PlotSettings:
             if self.settings.legend_on and len(ax.get_legend_handles_labels()[0]) > 0:
                 ax.legend(title=self.settings.legend_title)
                 logger.debug(
-                    f"Legenda toegevoegd met titel: {self.settings.legend_title}"
+                    "Legenda toegevoegd met titel: %s", self.settings.legend_title
                 )
             else:
                 logger.debug(
@@ -224,7 +223,7 @@ class PlotSettings:
                     fontweight=self.settings.suptitle_fontweight or "normal",
                     y=0.94,
                 )
-                logger.debug(f"Suptitle ingesteld: {title_text}")
+                logger.debug("Suptitle ingesteld: %s", title_text)
 
             logger.info("Instellingen succesvol toegepast op axes")
 
@@ -232,6 +231,16 @@ class PlotSettings:
             logger.error(f"Fout bij het toepassen van instellingen: {str(e)}")
             raise
 
+    def set_output_folder(self, output_folder: Path) -> None:
+        """
+        Sla plots op in een andere map dan output_folder uit de configuratie.
+
+        Args:
+            output_folder: Map voor de plots, bijvoorbeeld per chat in batch-modus
+        """
+        self.settings.output_folder = Path(output_folder)
+        logger.debug("Output folder overschreven: %s", self.settings.output_folder)
+
     def save_plot(self, fig: plt.Figure, filename: Optional[str] = None) -> None:
         """
         Sla de plot op met geconfigureerde instellingen
@@ -245,19 +254,19 @@ class PlotSettings:
         try:
             # Gebruik de opgegeven filename of de naam uit configuratie
             save_filename: str = filename or self.settings.save_as
-            logger.debug(f"Bestandsnaam voor opslaan: {save_filename}")
+            logger.debug("Bestandsnaam voor opslaan: %s", save_filename)
 
             # Zorg dat de output folder bestaat
             if self.settings.output_folder:
                 save_path: Path = self.settings.output_folder / save_filename
-                logger.debug(f"Volledig pad voor opslaan: {save_path}")
+                logger.debug("Volledig pad voor opslaan: %s", save_path)
             else:
                 save_path = Path(save_filename)
-                logger.debug(f"Relatief pad voor opslaan: {save_path}")
+                logger.debug("Relatief pad voor opslaan: %s", save_path)
 
             # Maak de directory aan indien nodig
             save_path.parent.mkdir(parents=True, exist_ok=True)
-            logger.debug(f"Directory gecontroleerd: {save_path.parent}")
+            logger.debug("Directory gecontroleerd: %s", save_path.parent)
 
             # Sla de figuur op
             fig.savefig(save_path, bbox_inches="tight")
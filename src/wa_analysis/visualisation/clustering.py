@@ -1,4 +1,5 @@
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
@@ -7,14 +8,14 @@ import pandas as pd
 import seaborn as sns
 
 from wa_analysis.data_analysis.model import TextClustering
+from wa_analysis.data_loading.cache import DatasetCache
 from wa_analysis.data_loading.config import ConfigLoader
-from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 from wa_analysis.settings.settings import PlotSettings
 
 # Setup logger
 logger = Logger().get_logger()
-settings = PlotSettings("clustering")
 
 
 class Clustering:
@@ -29,22 +30,23 @@ class Clustering:
         logger.info("Initialiseren Clustering")
         self.plot_settings: PlotSettings = plot_settings
         self.df: pd.DataFrame = data
-        logger.debug(f"DataFrame geladen met vorm: {self.df.shape}")
+        logger.debug("DataFrame geladen met vorm: %s", self.df.shape)
 
         self.corpus: Dict[str, List[str]] = self._create_corpus()
-        logger.debug(f"Corpus gemaakt met {len(self.corpus)} auteurs")
+        logger.debug("Corpus gemaakt met %s auteurs", len(self.corpus))
 
         self.text: List[str] = [part for text in self.corpus.values() for part in text]
-        logger.debug(f"Tekstlengtes: {len(self.text)}")
+        logger.debug("Tekstlengtes: %s", len(self.text))
 
         self.wa_labels: List[str] = [
             k for k, v in self.corpus.items() for _ in range(len(v))
         ]
-        logger.debug(f"Labels maken voor {len(self.wa_labels)} items")
+        logger.debug("Labels maken voor %s items", len(self.wa_labels))
 
         self.custom_palette: Dict[str, str] = self._create_custom_palette()
-        logger.debug(f"Custom palette gemaakt voor {len(self.custom_palette)} auteurs")
+        logger.debug("Custom palette gemaakt voor %s auteurs", len(self.custom_palette))
 
+    @profiled("create_corpus")
     def _create_corpus(self) -> Dict[str, List[str]]:
         """
         Maak een corpus van berichten per auteur voor tekstanalyse.
@@ -55,11 +57,13 @@ class Clustering:
         logger.info("Maken van corpus voor tekstanalyse")
 
         # Filter auteurs met minimaal 351 berichten
-        self.df = self.df.groupby("author").filter(lambda x: len(x) > 350)
+        self.df = self.df.groupby("author", observed=True).filter(
+            lambda x: len(x) > 350
+        )
         logger.info("Gefilterd op auteurs met meer dan 350 berichten")
 
         authors: List[str] = list(np.unique(self.df.author))
-        logger.debug(f"Aantal auteurs na filtering: {len(authors)}")
+        logger.debug("Aantal auteurs na filtering: %s", len(authors))
 
         corpus: Dict[str, List[str]] = {}
         for author in authors:
@@ -68,9 +72,9 @@ class Clustering:
             parts = [longseq[i : i + 500] for i in range(0, len(longseq), 500)]
             if len(parts) > 2:
                 corpus[author] = parts
-                logger.debug(f"Auteur {author}: {len(parts)} tekstfragmenten")
+                logger.debug("Auteur %s: %s tekstfragmenten", author, len(parts))
 
-        logger.debug(f"Corpus gemaakt met {len(corpus)} auteurs")
+        logger.debug("Corpus gemaakt met %s auteurs", len(corpus))
         return corpus
 
     def _create_custom_palette(self) -> Dict[str, str]:
@@ -86,7 +90,7 @@ class Clustering:
             label: "red" if label == "motley-fox" else "silver"
             for label in unique_labels
         }
-        logger.debug(f"Kleurenpalet gemaakt voor {len(unique_labels)} unieke labels")
+        logger.debug("Kleurenpalet gemaakt voor %s unieke labels", len(unique_labels))
         return palette
 
     def plot_clustering(self) -> None:
@@ -223,6 +227,24 @@ class Clustering:
             raise
 
 
+def plot_clustering(
+    altered_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> None:
+    """
+    Maak de clustering visualisatie van een verrijkte DataFrame.
+
+    Args:
+        altered_df: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+    """
+    plot_settings: PlotSettings = PlotSettings("clustering")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+
+    visualizer: Clustering = Clustering(plot_settings, altered_df)
+    visualizer.plot_clustering()
+
+
 def make_clustering() -> None:
     """
     Hoofdfunctie om de clustering visualisatie te maken.
@@ -234,10 +256,9 @@ def make_clustering() -> None:
         config_loader: ConfigLoader = ConfigLoader()
         logger.debug("Configuratie geladen")
 
-        processor: DataProcessor = DataProcessor(
+        altered_df: pd.DataFrame = DatasetCache().get_enriched(
             config=config_loader.config, datafile=config_loader.datafile_hockeyteam
         )
-        altered_df: pd.DataFrame = processor.add_columns()
         logger.debug("Data verwerkt")
 
         # Extracteer DataFrame uit tuple indien nodig
@@ -246,8 +267,7 @@ def make_clustering() -> None:
             logger.debug("DataFrame geëxtraheerd uit tuple")
 
         # Maak visualisatie
-        visualizer: Clustering = Clustering(settings, altered_df)
-        visualizer.plot_clustering()
+        plot_clustering(altered_df)
         logger.info("Clustering visualisatie succesvol gemaakt")
 
     except Exception as e:
@@ -1,17 +1,16 @@
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from wa_analysis.data_loading.cache import DatasetCache
 from wa_analysis.data_loading.config import ConfigLoader
 from wa_analysis.data_loading.merger import Merger
-from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.settings.logger import Logger
-from wa_analysis.settings.settings import (MessageCalculations, PlotSettings,
-                                           Settings)
+from wa_analysis.settings.settings import MessageCalculations, PlotSettings, Settings
 
 logger = Logger().get_logger()
-settings = PlotSettings("comparing_categories")
 
 
 class HockeyBarChart:
@@ -22,7 +21,7 @@ class HockeyBarChart:
         self.plot_settings: Settings = settings
         self.hockeybar_settings: MessageCalculations = MessageCalculations()
         self.df: pd.DataFrame = df
-        logger.debug(f"DataFrame geladen met vorm: {df.shape}")
+        logger.debug("DataFrame geladen met vorm: %s", df.shape)
 
     def calculate_message_count(self) -> pd.DataFrame:
         """
@@ -33,7 +32,7 @@ class HockeyBarChart:
         """
         logger.info("Berekenen van gemiddelde berichtlengte per functie")
         average_message_length: pd.DataFrame = (
-            self.df.groupby(self.hockeybar_settings.function_column)[
+            self.df.groupby(self.hockeybar_settings.function_column, observed=True)[
                 self.hockeybar_settings.message_length_column
             ]
             .mean()
@@ -42,7 +41,7 @@ class HockeyBarChart:
                 by=self.hockeybar_settings.message_length_column, ascending=False
             )
         )
-        logger.debug(f"Resultaat berekening: {average_message_length}")
+        logger.debug("Resultaat berekening: %s", average_message_length)
         return average_message_length
 
     def plot_average_message_length(
@@ -141,6 +140,60 @@ class HockeyBarChart:
             raise
 
 
+def draw_comparing_categories(
+    merged_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> plt.Figure:
+    """
+    Maak de vergelijkende categorieëngrafiek van een DataFrame met rollen.
+
+    Args:
+        merged_df: DataFrame uit Merger.get_processed_data
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        plt.Figure: The generated figure
+    """
+    plot_settings: PlotSettings = PlotSettings("comparing_categories")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+
+    # Maak de grafiek met de samengevoegde data
+    chart: HockeyBarChart = HockeyBarChart(plot_settings, merged_df)
+
+    # Bereken de gemiddelde berichtlengte per functie
+    avg_message_length: pd.DataFrame = chart.calculate_message_count()
+
+    # Maak de grafiek van de gemiddelde berichtlengte
+    return chart.plot_average_message_length(avg_message_length)
+
+
+def plot_comparing_categories(
+    altered_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> plt.Figure:
+    """
+    Maak de vergelijkende categorieëngrafiek van een verrijkte DataFrame.
+
+    Args:
+        altered_df: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        plt.Figure: The generated figure
+    """
+    config_loader: ConfigLoader = ConfigLoader()
+
+    # Gebruik Merger om de data samen te voegen
+    merger: Merger = Merger(
+        config=config_loader.config,
+        altered_df=altered_df,
+        role_file=config_loader.role_file,
+    )
+    merged_df: pd.DataFrame = merger.get_processed_data()
+    logger.info("Data samengevoegd")
+
+    return draw_comparing_categories(merged_df, output_folder)
+
+
 def make_comparing_categories() -> plt.Figure:
     """
     Create a bar chart comparing message lengths by category.
@@ -155,29 +208,12 @@ def make_comparing_categories() -> plt.Figure:
         config_loader: ConfigLoader = ConfigLoader()
         logger.info("Configuratie geladen")
 
-        processor: DataProcessor = DataProcessor(
+        altered_df: pd.DataFrame = DatasetCache().get_enriched(
             config=config_loader.config, datafile=config_loader.datafile_hockeyteam
         )
-        altered_df: pd.DataFrame = processor.add_columns()
         logger.info("Data verwerkt")
 
-        # Gebruik Merger om de data samen te voegen
-        merger: Merger = Merger(
-            config=config_loader.config,
-            altered_df=altered_df,
-            role_file=config_loader.role_file,
-        )
-        merged_df: pd.DataFrame = merger.get_processed_data()
-        logger.info("Data samengevoegd")
-
-        # Maak de grafiek met de samengevoegde data
-        chart: HockeyBarChart = HockeyBarChart(settings, merged_df)
-
-        # Bereken de gemiddelde berichtlengte per functie
-        avg_message_length: pd.DataFrame = chart.calculate_message_count()
-
-        # Maak de grafiek van de gemiddelde berichtlengte
-        fig: plt.Figure = chart.plot_average_message_length(avg_message_length)
+        fig: plt.Figure = plot_comparing_categories(altered_df)
         logger.info("Vergelijkende categorieëngrafiek succesvol gemaakt")
 
         return fig
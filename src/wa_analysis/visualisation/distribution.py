@@ -1,18 +1,46 @@
-from typing import List, Tuple
+from pathlib import Path
+from typing import List, Optional
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from matplotlib.figure import Figure
 
+from wa_analysis.data_loading.cache import DatasetCache
 from wa_analysis.data_loading.config import ConfigLoader
-from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.data_loading.reactions import ReactionsAdder
 from wa_analysis.settings.logger import Logger
 from wa_analysis.settings.settings import PlotSettings
 
 # Setup logger
 logger = Logger().get_logger()
-settings = PlotSettings("distribution")
+
+
+def format_bucket_labels(intervals: pd.IntervalIndex) -> List[str]:
+    """
+    Maak leesbare labels voor reactietijd-bins in minuten.
+
+    Een bin vanaf 0 wordt '<1 min', een open laatste bin '>4 uur' en de rest
+    '5-15 min' of '1-2 uur'. Bins vanaf een uur worden in uren uitgedrukt.
+
+    Args:
+        intervals: Rechts gesloten bins in minuten
+
+    Returns:
+        List[str]: Een label per bin
+    """
+    labels: List[str] = []
+    for interval in intervals:
+        hours = interval.left >= 60 or (interval.left <= 0 and interval.right > 60)
+        scale, unit = (60, "uur") if hours else (1, "min")
+        left, right = f"{interval.left / scale:.3g}", f"{interval.right / scale:.3g}"
+        if interval.left <= 0:
+            labels.append(f"<{right} {unit}")
+        elif np.isinf(interval.right):
+            labels.append(f">{left} {unit}")
+        else:
+            labels.append(f"{left}-{right} {unit}")
+    return labels
 
 
 class ReactionPlotter:
@@ -30,7 +58,7 @@ class ReactionPlotter:
         self.plot_settings: PlotSettings = plot_settings
         self.data_processor: ReactionsAdder = data_processor
         self.df = data_processor.df
-        logger.debug(f"DataFrame geladen met vorm: {self.df.shape}")
+        logger.debug("DataFrame geladen met vorm: %s", self.df.shape)
 
     def create_plot(
         self, percentage_counts: pd.Series, cumulative_percentage: pd.Series
@@ -48,19 +76,9 @@ class ReactionPlotter:
         logger.info("Maken van distributieplot")
 
         try:
-            # Labels voor de buckets
-            bucket_labels: List[str] = [
-                "<1 min",
-                "1-5 min",
-                "5-15 min",
-                "15-30 min",
-                "30-60 min",
-                "1-2 uur",
-                "2-4 uur",
-                ">4 uur",
-            ]
-            bucket_labels = bucket_labels[: len(percentage_counts)]
-            logger.debug(f"Bucket labels: {bucket_labels}")
+            # Labels voor de buckets, afgeleid van de grenzen uit [reactions]
+            bucket_labels: List[str] = format_bucket_labels(percentage_counts.index)
+            logger.debug("Bucket labels: %s", bucket_labels)
 
             # Opbouw van de figuur
             fig: Figure
@@ -182,6 +200,61 @@ class ReactionPlotter:
             raise
 
 
+def draw_distribution(
+    reactions_adder: ReactionsAdder, output_folder: Optional[Path] = None
+) -> Figure:
+    """
+    Maak de distributie visualisatie van verwerkte reactiedata.
+
+    Args:
+        reactions_adder: ReactionsAdder waarop process_data is aangeroepen
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        Figure: Matplotlib figuur met de visualisatie
+    """
+    plot_settings: PlotSettings = PlotSettings("distribution")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+
+    _, percentage_counts, cumulative_percentage, _ = (
+        reactions_adder.calculate_percentages()
+    )
+    logger.debug("Percentage counts: %s", percentage_counts)
+    logger.debug("Cumulatieve percentages: %s", cumulative_percentage)
+
+    # Maak de chart aan met data processor
+    chart: ReactionPlotter = ReactionPlotter(plot_settings, reactions_adder)
+    return chart.create_plot(percentage_counts, cumulative_percentage)
+
+
+def plot_distribution(
+    altered_dataframe: pd.DataFrame, output_folder: Optional[Path] = None
+) -> Figure:
+    """
+    Maak de distributie visualisatie van een verrijkte DataFrame.
+
+    Args:
+        altered_dataframe: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        Figure: Matplotlib figuur met de visualisatie
+    """
+    config_loader: ConfigLoader = ConfigLoader()
+
+    # Initialiseer de ReactionsAdder en verwerk de data
+    reactions_adder: ReactionsAdder = ReactionsAdder(
+        config_loader.config, altered_dataframe
+    )
+    logger.info("ReactionsAdder geïnitialiseerd")
+
+    total_count: int = reactions_adder.process_data()[-1]
+    logger.info(f"Data verwerkt, {total_count} reacties geanalyseerd")
+
+    return draw_distribution(reactions_adder, output_folder)
+
+
 def make_distribution() -> Figure:
     """
     Maak de distributie visualisatie
@@ -196,40 +269,13 @@ def make_distribution() -> Figure:
         config_loader: ConfigLoader = ConfigLoader()
         logger.info("Configuratie geladen")
 
-        # Maak data processor aan
-        data_processor: DataProcessor = DataProcessor(
+        # Haal de verrijkte data op uit de gedeelde cache
+        altered_dataframe: pd.DataFrame = DatasetCache().get_enriched(
             config=config_loader.config, datafile=config_loader.datafile_wife
         )
-        logger.info("DataProcessor geïnitialiseerd")
+        logger.info("Verrijkte data opgehaald")
 
-        # Voeg kolommen toe
-        altered_dataframe: pd.DataFrame = data_processor.add_columns()
-        logger.info("Kolommen toegevoegd aan dataframe")
-
-        # Initialiseer de ReactionsAdder en verwerk de data
-        reactions_adder: ReactionsAdder = ReactionsAdder(
-            config_loader.config, altered_dataframe
-        )
-        logger.info("ReactionsAdder geïnitialiseerd")
-
-        result_tuple: Tuple[pd.DataFrame, pd.Series, pd.Series, pd.Series, int] = (
-            reactions_adder.process_data()
-        )
-        (
-            altered_df,
-            reactie_counts,
-            percentage_counts,
-            cumulative_percentage,
-            total_count,
-        ) = result_tuple
-
-        logger.info(f"Data verwerkt, {total_count} reacties geanalyseerd")
-        logger.debug(f"Percentage counts: {percentage_counts}")
-        logger.debug(f"Cumulatieve percentages: {cumulative_percentage}")
-
-        # Maak de chart aan met data processor
-        chart: ReactionPlotter = ReactionPlotter(settings, reactions_adder)
-        fig: Figure = chart.create_plot(percentage_counts, cumulative_percentage)
+        fig: Figure = plot_distribution(altered_dataframe)
         logger.info("Distributievisualisatie succesvol gemaakt")
 
         return fig
@@ -0,0 +1,347 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from wa_analysis.data_analysis.sketch import (
+    QuantileSketch,
+    quantile_table,
+    sketch_by_group,
+)
+from wa_analysis.data_loading.cache import DatasetCache
+from wa_analysis.data_loading.config import ConfigLoader
+from wa_analysis.data_loading.merger import Merger
+from wa_analysis.data_loading.reactions import ReactionsAdder
+from wa_analysis.settings.app_config import get_app_config
+from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.settings import MessageCalculations, PlotSettings
+
+# Setup logger
+logger = Logger().get_logger()
+
+# Alleen de auteurs met de meeste reacties passen leesbaar in de figuur
+MAX_AUTHORS = 15
+
+
+class PercentilePlotter:
+    def __init__(
+        self, plot_settings: PlotSettings, data_processor: ReactionsAdder
+    ) -> None:
+        """
+        Constructor voor PercentilePlotter
+
+        Args:
+            plot_settings: Plot configuratie
+            data_processor: ReactionsAdder met verwerkte data
+        """
+        logger.info("Initialiseren van PercentilePlotter")
+        self.plot_settings: PlotSettings = plot_settings
+        self.df: pd.DataFrame = data_processor.df
+        settings = get_app_config().sketch
+        self.relative_accuracy: float = settings.relative_accuracy
+        self.quantiles: List[float] = settings.quantiles
+        self.role_column: str = MessageCalculations().function_column
+        logger.debug("DataFrame geladen met vorm: %s", self.df.shape)
+
+    def calculate_sketches(self) -> Dict[str, Dict[object, QuantileSketch]]:
+        """
+        Bouw de sketches van de reactietijd per auteur, per rol en per maand.
+
+        Elke indeling kost één gevectoriseerde doorgang; de sketches zijn op te
+        tellen met die van andere chunks of chats (zie merge_sketch_groups).
+
+        Returns:
+            Dict[str, Dict[object, QuantileSketch]]: Sketches per indeling
+        """
+        logger.info("Berekenen van reactietijd-sketches")
+        try:
+            times = self.df["time_since_prev"]
+            sketches = {
+                "author": sketch_by_group(
+                    times, self.df["author"], self.relative_accuracy
+                ),
+                "month": sketch_by_group(
+                    times,
+                    self.df["timestamp"].dt.to_period("M"),
+                    self.relative_accuracy,
+                ),
+            }
+            if self.role_column in self.df:
+                sketches["role"] = sketch_by_group(
+                    times, self.df[self.role_column], self.relative_accuracy
+                )
+            else:
+                logger.warning(
+                    f"Kolom {self.role_column} ontbreekt, geen percentielen per rol"
+                )
+            logger.debug(
+                "Sketches: %s",
+                {name: len(groups) for name, groups in sketches.items()},
+            )
+            return sketches
+
+        except Exception as e:
+            logger.error(f"Fout bij het berekenen van de sketches: {str(e)}")
+            raise
+
+    def create_tables(
+        self, sketches: Dict[str, Dict[object, QuantileSketch]]
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Zet de sketches om naar tabellen met quantiles.
+
+        Args:
+            sketches: Sketches per indeling uit calculate_sketches
+
+        Returns:
+            Dict[str, pd.DataFrame]: Per indeling het aantal en p50, p90, ...
+        """
+        tables = {
+            name: quantile_table(groups, self.quantiles, names=[name])
+            for name, groups in sketches.items()
+        }
+        tables["author"] = (
+            tables["author"]
+            .nlargest(MAX_AUTHORS, "count")
+            .sort_values(tables["author"].columns[1])
+        )
+        tables["month"] = tables["month"].sort_index()
+        if "role" in tables:
+            tables["role"] = tables["role"].sort_values(tables["role"].columns[1])
+        return tables
+
+    def create_plot(self, tables: Dict[str, pd.DataFrame]) -> Figure:
+        """
+        Maakt de plot met quantiles per rol, per auteur en per maand
+
+        Args:
+            tables: Tabellen uit create_tables
+
+        Returns:
+            Figure: Matplotlib figuur met de visualisatie
+        """
+        logger.info("Maken van percentielplot")
+        settings = self.plot_settings.settings
+
+        try:
+            fig: Figure = plt.figure(figsize=(14, 10))
+            grid = fig.add_gridspec(2, 2, height_ratios=[1.2, 1])
+            ax_role: plt.Axes = fig.add_subplot(grid[0, 0])
+            ax_author: plt.Axes = fig.add_subplot(grid[0, 1])
+            ax_month: plt.Axes = fig.add_subplot(grid[1, :])
+            columns: List[str] = [f"p{q * 100:g}" for q in self.quantiles]
+            shades: List[str] = ["dimgray", "darkgray", "silver", "gainsboro"]
+
+            # Per rol: gegroepeerde staven per quantile
+            if "role" in tables:
+                role_table = tables["role"]
+                positions = np.arange(len(role_table))
+                width = 0.8 / len(columns)
+                for i, column in enumerate(columns):
+                    ax_role.bar(
+                        positions + (i - (len(columns) - 1) / 2) * width,
+                        role_table[column],
+                        width=width,
+                        color=shades[i % len(shades)],
+                        label=column,
+                    )
+                ax_role.set_xticks(positions, role_table.index.astype(str))
+                ax_role.legend(loc="upper left", frameon=False)
+            ax_role.set_title("Per rol", fontsize=settings.title_fontsize - 2)
+            ax_role.set_ylabel(
+                settings.ylabel,
+                fontsize=settings.ylabel_fontsize,
+                fontweight=settings.ylabel_fontweight,
+            )
+
+            # Per auteur: lijn van de laagste tot de hoogste quantile, punten per quantile
+            author_table = tables["author"]
+            positions = np.arange(len(author_table))
+            ax_author.hlines(
+                positions,
+                author_table[columns[0]],
+                author_table[columns[-1]],
+                color="silver",
+                linewidth=2,
+            )
+            for i, column in enumerate(columns):
+                ax_author.plot(
+                    author_table[column],
+                    positions,
+                    "o",
+                    color=shades[i % len(shades)],
+                    markersize=5,
+                    label=column,
+                )
+            ax_author.set_yticks(positions, author_table.index.astype(str))
+            ax_author.set_xscale("symlog", linthresh=1)
+            ax_author.set_title(
+                f"Per auteur (top {len(author_table)} naar aantal reacties)",
+                fontsize=settings.title_fontsize - 2,
+            )
+            ax_author.set_xlabel(
+                settings.ylabel,
+                fontsize=settings.xlabel_fontsize,
+                fontweight=settings.xlabel_fontweight,
+            )
+
+            # Per maand: een lijn per quantile
+            month_table = tables["month"]
+            months = month_table.index.to_timestamp()
+            for i, column in enumerate(columns):
+                ax_month.plot(
+                    months,
+                    month_table[column],
+                    color=shades[i % len(shades)],
+                    linewidth=2 if i == 0 else 1,
+                    label=column,
+                )
+            ax_month.set_title("Per maand", fontsize=settings.title_fontsize - 2)
+            ax_month.set_ylabel(
+                settings.ylabel,
+                fontsize=settings.ylabel_fontsize,
+                fontweight=settings.ylabel_fontweight,
+            )
+            ax_month.legend(loc="upper left", frameon=False)
+
+            for ax in (ax_role, ax_month):
+                ax.set_yscale("symlog", linthresh=1)
+                ax.yaxis.grid(True)
+                ax.set_axisbelow(True)
+            ax_author.xaxis.grid(True)
+            ax_author.set_axisbelow(True)
+            # Minuten als gewone getallen in plaats van machten van tien
+            minutes = FuncFormatter(lambda value, _: f"{value:g}")
+            ax_author.xaxis.set_major_formatter(minutes)
+            for ax in (ax_role, ax_month):
+                ax.yaxis.set_major_formatter(minutes)
+            for ax in (ax_role, ax_author, ax_month):
+                for spine in ("top", "right", "left"):
+                    ax.spines[spine].set_visible(False)
+                ax.tick_params(axis="both", which="both", length=0)
+
+            fig.suptitle(
+                settings.suptitle,
+                fontsize=settings.suptitle_fontsize,
+                fontweight=settings.suptitle_fontweight,
+            )
+            fig.text(
+                0.5,
+                0.93,
+                settings.title,
+                ha="center",
+                fontsize=settings.title_fontsize,
+                style=settings.title_fontstyle,
+            )
+            fig.tight_layout(rect=(0, 0.06, 1, 0.93))
+            fig.text(
+                settings.figtext_x,
+                settings.figtext_y,
+                settings.figtext,
+                ha=settings.figtext_ha,
+                fontsize=settings.figtext_fontsize,
+            )
+            logger.debug("Assen, titels en figtext ingesteld")
+
+            # Sla de plot op met de geconfigureerde instellingen
+            self.plot_settings.save_plot(fig)
+            logger.info("Percentielplot succesvol opgeslagen")
+
+            return fig
+
+        except Exception as e:
+            logger.error(f"Fout bij het maken van de percentielplot: {str(e)}")
+            raise
+
+
+def draw_percentiles(
+    reactions_adder: ReactionsAdder, output_folder: Optional[Path] = None
+) -> Figure:
+    """
+    Maak de percentielvisualisatie van verwerkte reactiedata.
+
+    Args:
+        reactions_adder: ReactionsAdder waarop process_data is aangeroepen
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        Figure: Matplotlib figuur met de visualisatie
+    """
+    plot_settings: PlotSettings = PlotSettings("percentiles")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+
+    chart: PercentilePlotter = PercentilePlotter(plot_settings, reactions_adder)
+    tables = chart.create_tables(chart.calculate_sketches())
+    return chart.create_plot(tables)
+
+
+def plot_percentiles(
+    altered_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> Figure:
+    """
+    Maak de percentielvisualisatie van een verrijkte DataFrame.
+
+    Args:
+        altered_df: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        Figure: Matplotlib figuur met de visualisatie
+    """
+    config_loader: ConfigLoader = ConfigLoader()
+
+    # Voeg de rollen toe, zodat er ook per rol kan worden ingedeeld
+    merger: Merger = Merger(
+        config=config_loader.config,
+        altered_df=altered_df,
+        role_file=config_loader.role_file,
+    )
+    merged_df: pd.DataFrame = merger.get_processed_data()
+    logger.info("Data samengevoegd met rollen")
+
+    reactions_adder: ReactionsAdder = ReactionsAdder(config_loader.config, merged_df)
+    reactions_adder.process_data()
+    logger.info("Reacties verwerkt")
+
+    return draw_percentiles(reactions_adder, output_folder)
+
+
+def make_percentiles() -> Figure:
+    """
+    Maak de percentielvisualisatie
+
+    Returns:
+        Figure: Matplotlib figuur met de visualisatie
+    """
+    logger.info("Start maken van percentielvisualisatie")
+
+    try:
+        config_loader: ConfigLoader = ConfigLoader()
+        logger.info("Configuratie geladen")
+
+        altered_df: pd.DataFrame = DatasetCache().get_enriched(
+            config=config_loader.config, datafile=config_loader.datafile_hockeyteam
+        )
+        logger.info("Verrijkte data opgehaald")
+
+        fig: Figure = plot_percentiles(altered_df)
+        logger.info("Percentielvisualisatie succesvol gemaakt")
+        return fig
+
+    except Exception as e:
+        logger.error(f"Fout bij het maken van percentielvisualisatie: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering percentiles.py")
+    try:
+        make_percentiles()
+        logger.info("Einde uitvoering percentiles.py - Succesvol")
+    except Exception as e:
+        logger.error(f"Einde uitvoering percentiles.py - Fout: {str(e)}")
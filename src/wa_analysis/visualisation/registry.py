@@ -0,0 +1,211 @@
+### Registry of the visualisations, imported only when a chart is selected ###
+
+import importlib
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from wa_analysis.settings.app_config import get_app_config
+from wa_analysis.settings.logger import Logger
+
+# Setup logger
+logger = Logger().get_logger()
+
+
+@dataclass(frozen=True)
+class Visualization:
+    """
+    Een visualisatie: de module en de namen van de functies daarin.
+
+    make laadt zelf de data, plot krijgt de verrijkte DataFrame en draw krijgt
+    de uitvoer van de pipeline-stappen in inputs (zie wa_analysis.pipeline).
+    cost is de relatieve rekentijd; parallel worden de zwaarste eerst gestart.
+    """
+
+    name: str
+    module: str
+    make: str
+    plot: str
+    draw: str
+    inputs: Tuple[str, ...]
+    cost: int = 1
+
+
+# Volgorde is de volgorde waarin run_project ze uitvoert
+VISUALIZATIONS: Dict[str, Visualization] = {
+    visualization.name: visualization
+    for visualization in [
+        Visualization(
+            "comparing_categories",
+            "wa_analysis.visualisation.comparing_categories",
+            "make_comparing_categories",
+            "plot_comparing_categories",
+            "draw_comparing_categories",
+            ("merged",),
+        ),
+        Visualization(
+            "timeseries",
+            "wa_analysis.visualisation.time_series",
+            "make_timeseries",
+            "plot_timeseries",
+            "plot_timeseries",
+            ("wife",),
+        ),
+        Visualization(
+            "distribution",
+            "wa_analysis.visualisation.distribution",
+            "make_distribution",
+            "plot_distribution",
+            "draw_distribution",
+            ("reactions_wife",),
+        ),
+        Visualization(
+            "relationships",
+            "wa_analysis.visualisation.relationships",
+            "make_relationships",
+            "plot_relationships",
+            "draw_relationships",
+            ("reactions_merged",),
+        ),
+        Visualization(
+            "percentiles",
+            "wa_analysis.visualisation.percentiles",
+            "make_percentiles",
+            "plot_percentiles",
+            "draw_percentiles",
+            ("reactions_merged",),
+        ),
+        Visualization(
+            "clustering",
+            "wa_analysis.visualisation.clustering",
+            "make_clustering",
+            "plot_clustering",
+            "plot_clustering",
+            ("hockeyteam",),
+            cost=3,
+        ),
+    ]
+}
+
+
+def import_budget() -> float:
+    """Importbudget per visualisatie in seconden, uit [startup] import_budget."""
+    return get_app_config().startup.import_budget
+
+
+def names() -> List[str]:
+    """Namen van alle geregistreerde visualisaties."""
+    return list(VISUALIZATIONS)
+
+
+def select(selected: Optional[List[str]] = None) -> List[Visualization]:
+    """
+    Geef de gekozen visualisaties, in de volgorde van de registry.
+
+    Args:
+        selected: Namen van visualisaties (standaard alle)
+
+    Returns:
+        List[Visualization]: De gekozen visualisaties
+
+    Raises:
+        ValueError: Bij een onbekende naam
+    """
+    if not selected:
+        return list(VISUALIZATIONS.values())
+    unknown = [name for name in selected if name not in VISUALIZATIONS]
+    if unknown:
+        raise ValueError(
+            f"Onbekende visualisaties: {unknown}. Kies uit: {', '.join(names())}"
+        )
+    return [VISUALIZATIONS[name] for name in VISUALIZATIONS if name in selected]
+
+
+def load(name: str, attribute: str = "make") -> Callable[..., Any]:
+    """
+    Importeer de module van een visualisatie en geef de gevraagde functie.
+
+    De module (met seaborn, sklearn, ...) wordt pas hier geïmporteerd. Duurt
+    de import langer dan het budget, dan wordt een waarschuwing gelogd.
+
+    Args:
+        name: Naam van de visualisatie
+        attribute: 'make' (laadt zelf de data), 'plot' (krijgt een DataFrame)
+            of 'draw' (krijgt de uitvoer van de pipeline-stappen)
+
+    Returns:
+        Callable[..., Any]: De gevraagde functie
+    """
+    visualization = VISUALIZATIONS[name]
+    already_loaded = visualization.module in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(visualization.module)
+    elapsed = time.perf_counter() - start
+
+    if not already_loaded:
+        budget = import_budget()
+        if elapsed > budget:
+            logger.warning(
+                f"Import van {visualization.module} duurde {elapsed:.2f}s "
+                f"(budget {budget:.2f}s)"
+            )
+        else:
+            logger.debug("Import van %s in %.2fs", visualization.module, elapsed)
+    return getattr(module, getattr(visualization, attribute))
+
+
+def measure_cold_import(name: str) -> float:
+    """
+    Meet de importtijd van een visualisatie in een nieuw Python-proces.
+
+    Args:
+        name: Naam van de visualisatie
+
+    Returns:
+        float: Importtijd in seconden, inclusief alle afhankelijkheden
+    """
+    module = VISUALIZATIONS[name].module
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def check_import_budget(selected: Optional[List[str]] = None) -> bool:
+    """
+    Controleer per visualisatie of de koude importtijd binnen het budget blijft.
+
+    Args:
+        selected: Namen van visualisaties (standaard alle)
+
+    Returns:
+        bool: True als alle visualisaties binnen het budget blijven
+    """
+    budget = import_budget()
+    within_budget = True
+    for visualization in select(selected):
+        elapsed = measure_cold_import(visualization.name)
+        status = "OK" if elapsed <= budget else "TE TRAAG"
+        within_budget = within_budget and elapsed <= budget
+        logger.info(
+            f"Importtijd {visualization.name:<22} {elapsed:>6.2f}s  {status} "
+            f"(budget {budget:.2f}s)"
+        )
+    return within_budget
+
+
+if __name__ == "__main__":
+    logger.info("Start uitvoering registry.py")
+    try:
+        ok = check_import_budget(sys.argv[1:] or None)
+        logger.info("Einde uitvoering registry.py - Succesvol")
+        sys.exit(0 if ok else 1)
+    except Exception as e:
+        logger.error(f"Einde uitvoering registry.py - Fout: {str(e)}")
+        sys.exit(1)
@@ -1,24 +1,30 @@
-from typing import List, Tuple, Union
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
+from scipy import sparse
 
+from wa_analysis.data_analysis.reply_matrix import reply_counts, sparse_reply_counts
+from wa_analysis.data_loading.cache import DatasetCache
 from wa_analysis.data_loading.config import ConfigLoader
 from wa_analysis.data_loading.merger import Merger
-from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.data_loading.reactions import ReactionsAdder
 from wa_analysis.settings.logger import Logger
+from wa_analysis.settings.profiler import profiled
 from wa_analysis.settings.settings import PlotSettings
 
 # Setup logger
 logger = Logger().get_logger()
-settings = PlotSettings("relationships")
 
 
 class Replier:
     def __init__(
-        self, plot_settings: PlotSettings, data: Union[pd.DataFrame, Tuple]
+        self,
+        plot_settings: PlotSettings,
+        data: Union[pd.DataFrame, Tuple],
+        candidates: Optional[pd.DataFrame] = None,
     ) -> None:
         """
         Initialiseert de Replier klasse met een DataFrame of een tuple met een DataFrame.
@@ -26,9 +32,12 @@ class Replier:
         Args:
             plot_settings: Plot configuratie
             data: DataFrame of tuple met DataFrame op eerste positie
+            candidates: Reactiekandidaten uit ReactionsAdder (met source_position);
+                zonder telt alleen het vorige bericht
         """
         logger.info("Initialiseren van Replier")
         self.plot_settings: PlotSettings = plot_settings
+        self.candidates: Optional[pd.DataFrame] = candidates
 
         # Controleer of data een tuple is en extraheer het DataFrame indien nodig
         if isinstance(data, tuple):
@@ -39,7 +48,7 @@ class Replier:
             self.df = data
             logger.debug("DataFrame direct gebruikt")
 
-        logger.debug(f"DataFrame geladen met vorm: {self.df.shape}")
+        logger.debug("DataFrame geladen met vorm: %s", self.df.shape)
 
         self.desired_order: List[str] = [
             "Keeper",
@@ -48,12 +57,14 @@ class Replier:
             "Aanvaller",
             "Staff",
         ]
-        logger.debug(f"Gewenste volgorde voor visualisatie: {self.desired_order}")
+        logger.debug("Gewenste volgorde voor visualisatie: %s", self.desired_order)
 
-        # Voeg de 'prev_position' kolom toe die de positie van de vorige berichtauteur aangeeft
-        self.df["prev_position"] = self.df["Position"].shift(1)
+        # Voeg de 'prev_position' kolom toe die de positie van de vorige berichtauteur aangeeft;
+        # assign geeft een nieuw frame, zodat het gedeelde reactieframe ongewijzigd blijft
+        self.df = self.df.assign(prev_position=self.df["Position"].shift(1))
         logger.debug("Kolom 'prev_position' toegevoegd")
 
+    @profiled("prepare_data")
     def prepare_data(self) -> "Replier":
         """
         Bereid de data voor voor analyse.
@@ -62,22 +73,32 @@ class Replier:
             Replier: Self voor method chaining
         """
         logger.info("Voorbereiden data voor analyse")
-        filtered_df: pd.DataFrame = self.df[
-            self.df["author"] != self.df["prev_author"]
-        ].copy()
+        different_author = self.df["author"] != self.df["prev_author"]
         logger.debug(
-            f"Gefilterd op verschillende auteurs: {filtered_df.shape[0]} rijen"
+            "Gefilterd op verschillende auteurs: %s rijen", int(different_author.sum())
         )
 
-        # Maak een pivot table om het aantal berichten van de ene auteur naar de vorige auteur te tellen
-        author_matrix: pd.DataFrame = filtered_df.pivot_table(
-            index="Position",
-            columns="prev_position",
-            values="message",
-            aggfunc="count",
-            fill_value=0,
-        )
-        logger.debug(f"Pivot table gemaakt met vorm: {author_matrix.shape}")
+        # Tel het aantal berichten van de ene positie naar de vorige positie,
+        # met één bincount op de codes in plaats van een pivot table
+        if self.candidates is None:
+            author_matrix: pd.DataFrame = reply_counts(
+                self.df["Position"],
+                self.df["prev_position"],
+                mask=different_author & self.df["message"].notna(),
+            )
+        else:
+            # Elke reactie wordt verdeeld over de posities van alle kandidaten,
+            # elk met de rol op het moment van het eigen bronbericht
+            author_matrix = reply_counts(
+                self.df["Position"]
+                .reindex(self.candidates["reply"])
+                .reset_index(drop=True),
+                self.candidates["source_position"]
+                .astype(self.df["Position"].dtype)
+                .rename("prev_position"),
+                weights=self.candidates["share"],
+            )
+        logger.debug("Matrix geteld met vorm: %s", author_matrix.shape)
 
         # Bewaar de originele matrix met aantallen
         self.author_matrix_counts: pd.DataFrame = author_matrix.copy()
@@ -98,11 +119,17 @@ class Replier:
         # Groeperen op 'Position' en tellen van unieke 'author' en het aantal berichten
         self.overzicht_df: pd.DataFrame = pd.DataFrame(
             {
-                "Aantal authors": self.df.groupby("Position")["author"].nunique(),
-                "Aantal berichten": self.df.groupby("Position")["message"].count(),
+                "Aantal authors": self.df.groupby("Position", observed=True)[
+                    "author"
+                ].nunique(),
+                "Aantal berichten": self.df.groupby("Position", observed=True)[
+                    "message"
+                ].count(),
             }
         )
-        logger.debug(f"Overzicht DataFrame gemaakt met vorm: {self.overzicht_df.shape}")
+        logger.debug(
+            "Overzicht DataFrame gemaakt met vorm: %s", self.overzicht_df.shape
+        )
 
         # Reindex het DataFrame op basis van de gewenste volgorde
         self.overzicht_df = self.overzicht_df.reindex(self.desired_order)
@@ -110,6 +137,35 @@ class Replier:
 
         return self
 
+    def author_reply_matrix(self) -> Tuple[sparse.csr_matrix, pd.Index]:
+        """
+        Tel per auteur op welke andere auteur gereageerd wordt.
+
+        Voor groepen met duizenden leden is een dichte auteur × auteur matrix
+        te groot; de sparse matrix bewaart alleen paren die voorkomen.
+
+        Returns:
+            Tuple[sparse.csr_matrix, pd.Index]: Cel (i, j) is het aantal
+                reacties van auteur i op auteur j, en de auteurs
+        """
+        logger.info("Tellen van reacties per auteur")
+        if self.candidates is not None:
+            matrix, authors = sparse_reply_counts(
+                self.candidates["author"],
+                self.candidates["candidate"],
+                weights=self.candidates["share"],
+            )
+        else:
+            matrix, authors = sparse_reply_counts(
+                self.df["author"],
+                self.df["prev_author"],
+                mask=self.df["author"] != self.df["prev_author"],
+            )
+        logger.debug(
+            "Auteursmatrix van %s auteurs met %s paren", len(authors), matrix.nnz
+        )
+        return matrix, authors
+
     def plot_heatmap(self) -> "Replier":
         """
         Plot een heatmap van de percentages.
@@ -194,6 +250,64 @@ class Replier:
             raise
 
 
+def draw_relationships(
+    reactions_adder: ReactionsAdder, output_folder: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Maak de heatmap van wie op wie reageert, van verwerkte reactiedata met rollen.
+
+    Args:
+        reactions_adder: ReactionsAdder op de samengevoegde data, na process_data
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        pd.DataFrame: De reacties waarop de heatmap is gebaseerd
+    """
+    plot_settings: PlotSettings = PlotSettings("relationships")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+
+    # Voer de analyse uit en maak de visualisatie
+    replier: Replier = Replier(
+        plot_settings, reactions_adder.df, reactions_adder.candidates
+    )
+    replier.prepare_data().plot_heatmap()
+    return reactions_adder.df
+
+
+def plot_relationships(
+    altered_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.Series, pd.Series, pd.Series, int]]:
+    """
+    Voer de Replier analyse uit op een verrijkte DataFrame.
+
+    Args:
+        altered_df: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+
+    Returns:
+        Union[pd.DataFrame, Tuple]: De verwerkte data
+    """
+    config_loader: ConfigLoader = ConfigLoader()
+
+    # Gebruik Merger om de data samen te voegen
+    merger: Merger = Merger(
+        config=config_loader.config,
+        altered_df=altered_df,
+        role_file=config_loader.role_file,
+    )
+    merged_df: pd.DataFrame = merger.get_processed_data()
+    logger.info("Data samengevoegd met rollen")
+
+    # Voeg reacties toe
+    reactions_adder: ReactionsAdder = ReactionsAdder(config_loader.config, merged_df)
+    processed_df = reactions_adder.process_data()
+    logger.info("Reacties verwerkt")
+
+    draw_relationships(reactions_adder, output_folder)
+    return processed_df
+
+
 def make_relationships() -> (
     Union[pd.DataFrame, Tuple[pd.DataFrame, pd.Series, pd.Series, pd.Series, int]]
 ):
@@ -210,31 +324,12 @@ def make_relationships() -> (
         config_loader: ConfigLoader = ConfigLoader()
         logger.info("Configuratie geladen")
 
-        processor: DataProcessor = DataProcessor(
+        altered_df: pd.DataFrame = DatasetCache().get_enriched(
             config=config_loader.config, datafile=config_loader.datafile_hockeyteam
         )
-        altered_df: pd.DataFrame = processor.add_columns()
         logger.info("Data verwerkt en kolommen toegevoegd")
 
-        # Gebruik Merger om de data samen te voegen
-        merger: Merger = Merger(
-            config=config_loader.config,
-            altered_df=altered_df,
-            role_file=config_loader.role_file,
-        )
-        merged_df: pd.DataFrame = merger.get_processed_data()
-        logger.info("Data samengevoegd met rollen")
-
-        # Voeg reacties toe
-        reactions_adder: ReactionsAdder = ReactionsAdder(
-            config_loader.config, merged_df
-        )
-        processed_df = reactions_adder.process_data()
-        logger.info("Reacties verwerkt")
-
-        # Voer de analyse uit en maak de visualisatie
-        replier: Replier = Replier(settings, processed_df)
-        replier.prepare_data().plot_heatmap()
+        processed_df = plot_relationships(altered_df)
         logger.info("Relatievisualisatie succesvol gemaakt")
 
         return processed_df
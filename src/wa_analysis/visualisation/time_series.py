@@ -1,33 +1,42 @@
-from typing import List, Optional
+from pathlib import Path
+from typing import List, Optional, Union
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from wa_analysis.data_loading.cache import DatasetCache
 from wa_analysis.data_loading.config import ConfigLoader
 from wa_analysis.data_loading.processor import DataProcessor
 from wa_analysis.settings.logger import Logger
 from wa_analysis.settings.settings import PlotSettings
 
 logger = Logger().get_logger()
-settings: PlotSettings = PlotSettings("time_series")
 
 
 class PhotoPlotter:
     def __init__(
-        self, plot_settings: PlotSettings, data_processor: DataProcessor
+        self,
+        plot_settings: PlotSettings,
+        data_processor: Union[DataProcessor, pd.DataFrame],
     ) -> None:
         """
         Constructor voor PhotoPlotter
 
         Args:
             plot_settings: Plot configuratie
-            data_processor: Data processor met DataFrame
+            data_processor: Data processor met DataFrame, of de verrijkte DataFrame zelf
         """
         logger.info("Initialiseren PhotoPlotter")
         self.plot_settings: PlotSettings = plot_settings
-        self.data_processor: DataProcessor = data_processor
-        self.df: pd.DataFrame = data_processor.altered_dataframe
-        logger.debug(f"DataFrame geladen met vorm: {self.df.shape}")
+
+        # Controleer of er een DataProcessor of direct een DataFrame is meegegeven
+        if isinstance(data_processor, pd.DataFrame):
+            self.df: pd.DataFrame = data_processor
+            logger.debug("DataFrame direct gebruikt")
+        else:
+            self.df = data_processor.altered_dataframe
+            logger.debug("DataFrame uit DataProcessor gebruikt")
+        logger.debug("DataFrame geladen met vorm: %s", self.df.shape)
 
     def photo_percentage_per_quarter(self) -> pd.Series:
         """
@@ -41,7 +50,7 @@ class PhotoPlotter:
             self.df.groupby(pd.Grouper(key="timestamp", freq="QE"))["has_image"].mean()
             * 100
         )
-        logger.debug(f"Berekend over {len(photos_per_quarter)} kwartalen")
+        logger.debug("Berekend over %s kwartalen", len(photos_per_quarter))
         return photos_per_quarter
 
     def plot_photos_percentage_per_quarter(self) -> None:
@@ -81,7 +90,7 @@ class PhotoPlotter:
                 )
                 for period in photos_percentage_per_quarter.index
             ]
-            logger.debug(f"Kleuren bepaald voor {len(colors)} waarden")
+            logger.debug("Kleuren bepaald voor %s waarden", len(colors))
 
             # Plot de data
             photos_percentage_per_quarter.plot(
@@ -136,7 +145,7 @@ class PhotoPlotter:
 
             # Zoek index van 2022 Q4 voor annotatie
             target_quarter: pd.Period = pd.Period("2022-Q4", freq="Q")
-            logger.debug(f"Zoeken naar {target_quarter} voor annotatie")
+            logger.debug("Zoeken naar %s voor annotatie", target_quarter)
 
             # Vind de index van 2022 Q4 in de data
             q4_2022_idx: Optional[int] = None
@@ -149,7 +158,7 @@ class PhotoPlotter:
 
             if q4_2022_idx is not None:
                 logger.debug(
-                    f"Kwartaal {target_quarter} gevonden op index {q4_2022_idx}"
+                    "Kwartaal %s gevonden op index %s", target_quarter, q4_2022_idx
                 )
                 # Bepaal de maximale hoogte voor de plot
                 y_max: float = ax.get_ylim()[1]
@@ -199,6 +208,30 @@ class PhotoPlotter:
             raise
 
 
+def plot_timeseries(
+    altered_df: pd.DataFrame, output_folder: Optional[Path] = None
+) -> None:
+    """
+    Maak de tijdreeks visualisatie van een verrijkte DataFrame.
+
+    Args:
+        altered_df: DataFrame uit DataProcessor.add_columns
+        output_folder: Map voor de plot (standaard output_folder uit de configuratie)
+    """
+    # Maak plot settings aan
+    plot_settings: PlotSettings = PlotSettings("time_series")
+    if output_folder is not None:
+        plot_settings.set_output_folder(output_folder)
+    logger.debug("PlotSettings geïnitialiseerd")
+
+    # Maak de chart aan met data processor
+    chart: PhotoPlotter = PhotoPlotter(plot_settings, altered_df)
+    logger.debug("PhotoPlotter geïnitialiseerd")
+
+    # Plot de foto percentage per maand
+    chart.plot_photos_percentage_per_quarter()
+
+
 def make_timeseries() -> None:
     """
     Maak de tijdreeks visualisatie
@@ -209,26 +242,16 @@ def make_timeseries() -> None:
         config_loader: ConfigLoader = ConfigLoader()
         logger.debug("Configuratie geladen")
 
-        # Maak data processor aan
-        data_processor: DataProcessor = DataProcessor(
-            config=config_loader.config, datafile=config_loader.datafile_wife
+        # Haal de verrijkte data op uit de gedeelde cache; alleen timestamp en
+        # bericht zijn nodig voor het fotopercentage per kwartaal
+        altered_df: pd.DataFrame = DatasetCache().get_enriched(
+            config=config_loader.config,
+            datafile=config_loader.datafile_wife,
+            columns=["timestamp", "message"],
         )
-        logger.debug("DataProcessor geïnitialiseerd")
-
-        # Voeg kolommen toe
-        data_processor.altered_dataframe = data_processor.add_columns()
-        logger.debug("Kolommen toegevoegd aan dataframe")
-
-        # Maak plot settings aan
-        plot_settings: PlotSettings = PlotSettings("time_series")
-        logger.debug("PlotSettings geïnitialiseerd")
-
-        # Maak de chart aan met data processor
-        chart: PhotoPlotter = PhotoPlotter(plot_settings, data_processor)
-        logger.debug("PhotoPlotter geïnitialiseerd")
+        logger.debug("Verrijkte data opgehaald")
 
-        # Plot de foto percentage per maand
-        chart.plot_photos_percentage_per_quarter()
+        plot_timeseries(altered_df)
         logger.info("Tijdreeks visualisatie succesvol gemaakt")
 
     except Exception as e: